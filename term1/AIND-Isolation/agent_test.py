@@ -3,14 +3,61 @@ tests to run and debug your minimax and alphabeta agents locally.  The test
 cases used by the project assistant are not public.
 """
 
+import asyncio
+import io
+import json
+import os
+import random
+import sys
+import time
+import tempfile
+import timeit
 import unittest
 
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 import isolation
+import competition_agent
 import game_agent
+import match_server
+import opening_book
+import rating
+import selective
+import selfplay
+import tournament
+import tuning
 
+from endgame import EndgameSolver
+from isolation.geometry import get_geometry
+from isolation.zobrist import get_zobrist_keys
+from move_ordering import KillerHistoryOrderer
+import sample_players
+from sample_players import RandomPlayer, center_score
+from search_stats import MoveTimes, SearchStats
+from time_manager import TimeManager
 from importlib import reload
 
 
+def minimax_value(game, player, depth):
+    """Plain minimax value of a position from the point of view of player"""
+    moves = game.get_legal_moves()
+    if depth == 0 or not moves:
+        return player.score(game, player)
+    values = [minimax_value(game.forecast_move(m), player, depth - 1) for m in moves]
+    return max(values) if game.active_player == player else min(values)
+
+
+def timer(time_limit):
+    """Return a time_left function for a turn of time_limit milliseconds"""
+    move_end = 1000 * timeit.default_timer() + time_limit
+    return lambda: move_end - 1000 * timeit.default_timer()
+
+
 class IsolationTest(unittest.TestCase):
     """Unit tests for isolation agents"""
 
@@ -21,5 +68,983 @@ class IsolationTest(unittest.TestCase):
         self.game = isolation.Board(self.player1, self.player2)
 
 
+class BitBoardTest(unittest.TestCase):
+    """Unit tests for the bitboard and sparse implementations of the game board"""
+
+    def setUp(self):
+        self.player1 = "Player1"
+        self.player2 = "Player2"
+
+    def play_random_game(self, width, height):
+        """Play the same random game on a Board and a BitBoard, checking
+        that both report identical game states after every move.
+        """
+        board = isolation.Board(self.player1, self.player2, width, height)
+        others = [isolation.BitBoard(self.player1, self.player2, width, height),
+                  isolation.SparseBoard(self.player1, self.player2, width, height)]
+        while True:
+            for other in others:
+                for player in (self.player1, self.player2):
+                    self.assertEqual(board.get_player_location(player),
+                                     other.get_player_location(player))
+                    self.assertEqual(sorted(board.get_legal_moves(player)),
+                                     sorted(other.get_legal_moves(player)))
+                    self.assertEqual(board.mobility(player), other.mobility(player))
+                    self.assertEqual(board.utility(player), other.utility(player))
+                self.assertEqual(board.get_blank_spaces(), other.get_blank_spaces())
+                self.assertEqual(board.get_blank_mask(), other.get_blank_mask())
+                self.assertEqual(board.to_string(), other.to_string())
+                self.assertEqual(board.hash(), other.hash())
+
+            moves = board.get_legal_moves()
+            if not moves:
+                break
+            move = random.choice(moves)
+            for other in others:
+                self.assertTrue(other.move_is_legal(move))
+            board.apply_move(move)
+            others = [other.forecast_move(move) for other in others]
+
+        for board_class in (isolation.BitBoard, isolation.SparseBoard):
+            for source in [board] + others:
+                self.assertEqual(board.to_string(), board_class.from_board(source).to_string())
+
+    def test_matches_board(self):
+        for _ in range(20):
+            self.play_random_game(7, 7)
+        for _ in range(5):
+            self.play_random_game(5, 9)
+        self.play_random_game(15, 15)
+
+    def test_copy_is_independent(self):
+        game = isolation.BitBoard(self.player1, self.player2)
+        game.apply_move((2, 3))
+        game.apply_move((0, 5))
+        new_game = game.forecast_move((0, 2))
+        self.assertNotEqual(game.hash(), new_game.hash())
+        self.assertEqual(self.player1, game.active_player)
+        self.assertEqual(self.player2, new_game.active_player)
+        self.assertTrue(game.move_is_legal((0, 2)))
+        self.assertFalse(new_game.move_is_legal((0, 2)))
+
+
+class PushPopTest(unittest.TestCase):
+    """Unit tests for in-place make/undo move support on both board types"""
+
+    def check_push_pop(self, board_class):
+        game = board_class("Player1", "Player2")
+        snapshots = []
+        while True:
+            moves = game.get_legal_moves()
+            if not moves:
+                break
+            snapshots.append((game.to_string(), game.hash(), game.move_count,
+                              game.active_player, sorted(moves)))
+            game.push_move(random.choice(moves))
+
+        while snapshots:
+            game.pop_move()
+            self.assertEqual(snapshots.pop(),
+                             (game.to_string(), game.hash(), game.move_count,
+                              game.active_player, sorted(game.get_legal_moves())))
+        self.assertRaises(RuntimeError, game.pop_move)
+
+    def test_board_push_pop(self):
+        for _ in range(10):
+            self.check_push_pop(isolation.Board)
+
+    def test_bitboard_push_pop(self):
+        for _ in range(10):
+            self.check_push_pop(isolation.BitBoard)
+
+    def test_sparseboard_push_pop(self):
+        for _ in range(10):
+            self.check_push_pop(isolation.SparseBoard)
+
+    def test_search_restores_board(self):
+        reload(game_agent)
+        for player in (game_agent.MinimaxPlayer(), game_agent.AlphaBetaPlayer()):
+            game = isolation.BitBoard(player, "Player2")
+            game.apply_move((2, 3))
+            game.apply_move((0, 5))
+            before = game.to_string()
+            time_limit = 1000 * timeit.default_timer() + 150
+            move = player.get_move(
+                game, lambda: time_limit - 1000 * timeit.default_timer())
+            self.assertIn(move, game.get_legal_moves())
+            self.assertEqual(before, game.to_string())
+
+
+class ZobristTest(unittest.TestCase):
+    """Unit tests for incremental Zobrist hashing and the transposition table"""
+
+    def test_incremental_hash(self):
+        for board_class in (isolation.Board, isolation.BitBoard):
+            game = board_class("Player1", "Player2")
+            keys = get_zobrist_keys(game.width, game.height)
+            seen = {}
+            while game.get_legal_moves():
+                game.push_move(random.choice(game.get_legal_moves()))
+                blocked = [game.height * c + r for r, c in
+                           set(get_geometry(7, 7).coords) - set(game.get_blank_spaces())]
+                loc_1, loc_2 = [None if loc is None else loc[0] + loc[1] * game.height
+                                for loc in (game.get_player_location("Player1"),
+                                            game.get_player_location("Player2"))]
+                self.assertEqual(game.hash(), keys.compute(blocked, loc_1, loc_2,
+                                                           game.move_count % 2))
+                self.assertNotIn(game.hash(), seen)
+                seen[game.hash()] = game.to_string()
+            while game.move_count:
+                game.pop_move()
+            self.assertEqual(0, game.hash())
+
+    def test_canonical_hash(self):
+        for board_class in (isolation.Board, isolation.BitBoard, isolation.SparseBoard):
+            for width, height in ((7, 7), (6, 5)):
+                game = board_class("Player1", "Player2", width, height, seed=width)
+                for _ in range(5):
+                    if game.get_legal_moves():
+                        game.apply_move(random.choice(game.get_legal_moves()))
+                key, transform = game.canonical_hash()
+                self.assertEqual(key, game.symmetric_copy(transform).hash())
+                for image_transform in range(len(get_geometry(width, height).symmetries)):
+                    image = game.symmetric_copy(image_transform)
+                    self.assertEqual(key, image.canonical_hash()[0])
+                    self.assertLessEqual(key, image.hash())
+                    self.assertEqual(
+                        sorted(game.canonical_move(move, image_transform)
+                               for move in game.get_legal_moves()),
+                        sorted(image.get_legal_moves()))
+                    for move in game.get_legal_moves():
+                        self.assertEqual(move, game.original_move(
+                            game.canonical_move(move, image_transform), image_transform))
+
+    def test_transposition_table_keeps_minimax_value(self):
+        reload(game_agent)
+        player = game_agent.AlphaBetaPlayer(score_fn=game_agent.custom_score_3)
+        player.time_left = lambda: float("inf")
+        for _ in range(5):
+            game = isolation.BitBoard(player, "Player2")
+            for _ in range(6):
+                if game.get_legal_moves():
+                    game.apply_move(random.choice(game.get_legal_moves()))
+            if not game.get_legal_moves():
+                continue
+            for depth in (1, 2, 3, 4):
+                move = player.alphabeta(game, depth)
+                _, bound, value, tt_move = player.tt.probe(game.hash())
+                self.assertEqual((game_agent.EXACT, move), (bound, tt_move))
+                self.assertEqual(value, minimax_value(game, player, depth))
+                self.assertEqual(value, minimax_value(
+                    game.forecast_move(move), player, depth - 1))
+
+
+class SearchWindowTest(unittest.TestCase):
+    """Unit tests for the negamax search with aspiration windows and PVS"""
+
+    def setUp(self):
+        reload(game_agent)
+
+    def test_aspiration_keeps_minimax_value(self):
+        rng = random.Random(11)
+        for _ in range(5):
+            player = game_agent.AlphaBetaPlayer(endgame=False)
+            player.time_left = lambda: float("inf")
+            game = isolation.BitBoard(player, "Player2", seed=rng.getrandbits(16))
+            for _ in range(6):
+                game.apply_move(rng.choice(game.get_legal_moves()))
+            if not game.get_legal_moves():
+                continue
+            player.root_score = None
+            for depth in (1, 2, 3, 4):
+                move = player.aspiration_search(game, depth)
+                value = minimax_value(game, player, depth)
+                self.assertEqual(value, player.root_score)
+                self.assertEqual(value, minimax_value(
+                    game.forecast_move(move), player, depth - 1))
+
+    def test_lost_position_plays_on(self):
+        rng = random.Random(2)
+        lost = 0
+        while lost < 3:
+            player = game_agent.AlphaBetaPlayer(endgame=False)
+            game = isolation.BitBoard(player, RandomPlayer(), seed=rng.getrandbits(16))
+            while game.get_legal_moves():
+                if game.active_player is player and game.move_count > 20:
+                    player.time_left = lambda: float("inf")
+                    player.alphabeta(game, 8)
+                    if player.root_score == float("-inf"):
+                        lost += 1
+                        self.assertIn(player.get_move(game.copy(), timer(150.)),
+                                      game.get_legal_moves())
+                        break
+                game.apply_move(rng.choice(game.get_legal_moves()))
+
+
+class MoveOrderingTest(unittest.TestCase):
+    """Unit tests for the alpha-beta move ordering strategies"""
+
+    def test_priorities(self):
+        orderer = KillerHistoryOrderer()
+        orderer.cutoff((3, 3), 2, 4, 3)
+        orderer.cutoff((1, 2), 5, 3, 0)
+        orderer.cutoff((4, 4), 5, 1, 1)
+        moves = [(0, 0), (1, 2), (2, 2), (3, 3), (4, 4)]
+        self.assertEqual([(2, 2), (4, 4), (1, 2), (3, 3), (0, 0)],
+                         orderer.order(moves, 5, tt_move=(2, 2)))
+        self.assertEqual((3, 3), orderer.order(moves, 4, side=0)[0])
+        self.assertEqual((0, 0), orderer.order(moves, 4, tt_move=(0, 0), side=1)[0])
+        stats = orderer.stats()
+        self.assertEqual((3, 3, 1), (stats["nodes"], stats["cutoffs"],
+                                     stats["first_move_cutoffs"]))
+
+    def test_search_reports_cutoffs(self):
+        reload(game_agent)
+        player = game_agent.AlphaBetaPlayer(score_fn=game_agent.custom_score_3)
+        game = isolation.BitBoard(player, "Player2")
+        game.apply_move((3, 3))
+        game.apply_move((2, 4))
+        time_limit = 1000 * timeit.default_timer() + 100
+        player.get_move(game, lambda: time_limit - 1000 * timeit.default_timer())
+        stats = player.orderer.stats()
+        self.assertGreater(stats["cutoffs"], 0)
+        self.assertGreater(stats["first_move_rate"], 0.5)
+
+
+class SelectiveSearchTest(unittest.TestCase):
+    """Unit tests for the late move reductions and mobility extensions"""
+
+    def setUp(self):
+        reload(game_agent)
+        self.positions = selective.random_positions(6, 8, seed=3)
+
+    def test_uniform_depth_is_unchanged(self):
+        results = [selective.search_nodes(self.positions, 5, lambda: game_agent.AlphaBetaPlayer(
+            endgame=False, selector=selector)) for selector in (None, selective.UniformDepth())]
+        self.assertEqual(results[0][:2], results[1][:2])
+
+    def test_selective_depth(self):
+        for verify in (True, False):
+            moves, _, _, counters = selective.search_nodes(
+                self.positions, 6, lambda: game_agent.AlphaBetaPlayer(
+                    endgame=False, selector=selective.SelectiveDepth(extend_mobility=2,
+                                                                     verify=verify)))
+            self.assertGreater(counters["reductions"], 0)
+            self.assertGreater(counters["extensions"], 0)
+            for moves_played, move in zip(self.positions, moves):
+                game = isolation.BitBoard("Player1", "Player2")
+                for played in moves_played:
+                    game.apply_move(played)
+                self.assertIn(move, game.get_legal_moves())
+
+    def test_stats_report_counters(self):
+        stats = SearchStats()
+        player = game_agent.AlphaBetaPlayer(stats=stats, selector=selective.SelectiveDepth())
+        game = isolation.BitBoard(player, "Player2")
+        game.apply_move((3, 3))
+        game.apply_move((2, 4))
+        player.get_move(game, timer(100.))
+        self.assertEqual(player.selector.stats(),
+                         {name: stats.moves[0][name] for name in player.selector.stats()})
+        self.assertGreater(stats.moves[0]["reductions"], 0)
+
+
+class DeterministicMoveTest(unittest.TestCase):
+    """Unit tests for seeded and unshuffled move generation"""
+
+    def search_nodes(self, board_class, **kwargs):
+        player = game_agent.AlphaBetaPlayer(score_fn=game_agent.custom_score_3)
+        player.time_left = lambda: float("inf")
+        game = board_class(player, "Player2", **kwargs)
+        game.apply_move((3, 3))
+        game.apply_move((2, 4))
+        moves = [player.alphabeta(game, depth) for depth in range(1, 6)]
+        return moves, player.orderer.stats()
+
+    def test_reproducible_search(self):
+        reload(game_agent)
+        for board_class in (isolation.Board, isolation.BitBoard):
+            self.assertEqual(self.search_nodes(board_class, seed=42),
+                             self.search_nodes(board_class, seed=42))
+            self.assertEqual(self.search_nodes(board_class, shuffle=False),
+                             self.search_nodes(board_class, shuffle=False))
+
+    def test_unshuffled_order(self):
+        for board_class in (isolation.Board, isolation.BitBoard):
+            game = board_class("Player1", "Player2", shuffle=False)
+            game.apply_move((3, 3))
+            game.apply_move((0, 0))
+            moves = game.get_legal_moves()
+            self.assertEqual(8, len(moves))
+            self.assertEqual(moves, game.copy().get_legal_moves())
+
+
+class ParallelTournamentTest(unittest.TestCase):
+    """Unit tests for playing tournament games in worker processes"""
+
+    def test_parallel_matches_sequential(self):
+        cpu_agent = tournament.Agent(RandomPlayer(), "Random")
+        test_agents = [tournament.Agent(RandomPlayer(), "Random_{}".format(i))
+                       for i in range(4)]
+
+        def run(executor):
+            wins = {agent.player: 0 for agent in test_agents + [cpu_agent]}
+            counts = tournament.play_round(cpu_agent, test_agents, wins, 3,
+                                           seed=7, executor=executor)
+            return counts, [wins[agent.player] for agent in test_agents + [cpu_agent]]
+
+        sequential = run(None)
+        with ProcessPoolExecutor(2) as executor:
+            self.assertEqual(sequential, run(executor))
+        self.assertEqual(24, sum(sequential[1]))
+
+
+class RatingTest(unittest.TestCase):
+    """Unit tests for the tournament rating statistics"""
+
+    def test_bradley_terry_recovers_ratings(self):
+        true_elo = {"A": 200., "B": 0., "C": -200.}
+        results = {}
+        for a in true_elo:
+            for b in true_elo:
+                if a != b:
+                    p = rating.elo_to_probability(true_elo[a] - true_elo[b])
+                    results[(a, b)] = 10000 * p
+        fitted = rating.fit_bradley_terry(sorted(true_elo), results, prior=0.)
+        for name, elo in true_elo.items():
+            self.assertAlmostEqual(elo, fitted[name], places=3)
+
+    def test_sprt(self):
+        self.assertEqual("H1", rating.sprt(40, 10)[1])
+        self.assertEqual("H0", rating.sprt(10, 40)[1])
+        self.assertIsNone(rating.sprt(5, 5)[1])
+
+    def test_intervals_contain_estimate(self):
+        results = {("A", "B"): 30, ("B", "A"): 10}
+        totals = {("A", "B"): 40}
+        ratings = rating.fit_bradley_terry(["A", "B"], results)
+        intervals = rating.bootstrap_intervals(["A", "B"], results, totals, seed=0)
+        for name in ratings:
+            low, high = intervals[name]
+            self.assertTrue(low <= ratings[name] <= high)
+        self.assertEqual(intervals, rating.bootstrap_intervals(
+            ["A", "B"], results, totals, seed=0))
+
+
+class SearchStatsTest(unittest.TestCase):
+    """Unit tests for the opt-in search statistics collector"""
+
+    def test_records_per_move(self):
+        reload(game_agent)
+        for player_class in (game_agent.MinimaxPlayer, game_agent.AlphaBetaPlayer):
+            stats = SearchStats()
+            player = player_class(score_fn=game_agent.custom_score_3, stats=stats)
+            game = isolation.BitBoard(player, RandomPlayer())
+            game.apply_move((3, 3))
+            game.apply_move((0, 0))
+            for _ in range(3):
+                game.apply_move(player.get_move(game.copy(), timer(150)))
+                game.apply_move(random.choice(game.get_legal_moves()))
+            self.assertEqual(3, len(stats.moves))
+            first = stats.moves[0]
+            self.assertGreater(first["nodes"], 0)
+            if player_class is game_agent.MinimaxPlayer:
+                self.assertEqual(3, first["depth"])
+            else:
+                self.assertEqual(first["depth"], len(first["depth_times"]))
+                self.assertGreater(first["depth"], 1)
+                # The search runs until the timer aborts it, unless the next
+                # iteration was not expected to finish in time
+                if first["time_left_at_abort"] is None:
+                    self.assertLess(first["elapsed"], 150 - player.TIMER_THRESHOLD)
+
+    def test_game_log(self):
+        stream = io.StringIO()
+        agents = [tournament.Agent(game_agent.AlphaBetaPlayer(stats=SearchStats()), "AB"),
+                  tournament.Agent(RandomPlayer(), "Random")]
+        game = isolation.BitBoard(agents[0].player, agents[1].player)
+        tournament.apply_opening([game], random)
+        tournament.play_games([game], random, log=tournament.GameLog(stream, agents))
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(1, len(records))
+        self.assertEqual(("AB", "Random", 0), (records[0]["agent"],
+                                              records[0]["opponent"],
+                                              records[0]["seat"]))
+        self.assertTrue(records[0]["moves"])
+
+        twins = [tournament.Agent(RandomPlayer(), "Random") for _ in range(2)]
+        times = MoveTimes(150)
+        log = tournament.GameLog(None, twins, times)
+        log.write([agent.player for agent in twins], twins[0].player, "illegal move",
+                  [None, None], [[(1., 1.)], [(2., 2.)]])
+        self.assertEqual({"Random": [1.], "Random#2": [2.]}, dict(times.wall))
+
+    def test_move_times(self):
+        game = isolation.BitBoard(sample_players.GreedyPlayer(), RandomPlayer())
+        game.apply_move((3, 3))
+        timings = []
+        _, history, _ = game.play(timings=timings)
+        # The loser is asked for a move once more than it makes
+        self.assertEqual(len(history) + 1, len(timings))
+        self.assertEqual([idx % 2 for idx in range(len(timings))],
+                         [seat for seat, _, _ in timings])
+        self.assertTrue(all(0 <= wall < 150 and cpu >= 0 for _, wall, cpu in timings))
+
+        times = MoveTimes(150, margin=5)
+        times.add("AB", [(float(t), 1.) for t in range(1, 101)],
+                  [{"depth": 3, "depth_times": [2., 5., 9.]},
+                   {"depth": 7, "depth_times": [90.]}])
+        summary = times.summary("AB")
+        self.assertEqual([50., 95., 99.], summary["wall"])
+        self.assertEqual((100, 100., 0), (summary["moves"], summary["max"],
+                                          summary["close_calls"]))
+        self.assertEqual({1: [2.], 2: [5.], 3: [9.], 7: [90.]}, times.depth_times["AB"])
+
+
+class TimeManagerTest(unittest.TestCase):
+    """Unit tests for the search clock"""
+
+    def test_interval_follows_node_rate(self):
+        # A fake clock losing 0.01 ms per node, read by expired() only
+        clock = {"now": 100.}
+        time_left = lambda: clock["now"]
+        manager = TimeManager(10., check_ms=0.5, timer=lambda: -clock["now"] / 1000.)
+        manager.start(time_left)
+        nodes = 0
+        while not manager.expired(time_left):
+            clock["now"] -= 0.01
+            nodes += 1
+        self.assertLess(clock["now"], 10.)
+        self.assertGreater(clock["now"], 10. - 0.5)
+        self.assertLess(manager.checks, nodes / 10)
+        # The clock is read at every node close to the deadline
+        self.assertEqual(1, manager.interval)
+
+    def test_skips_iteration_that_cannot_finish(self):
+        clock = {"now": 100.}
+        time_left = lambda: clock["now"]
+        manager = TimeManager(10., timer=lambda: -clock["now"] / 1000.)
+        manager.start(time_left)
+        for spent in (1., 4., 16.):
+            clock["now"] -= spent
+            manager.iteration_done()
+        self.assertEqual(64., manager.predict_next())
+        self.assertTrue(manager.can_start_next())
+        clock["now"] -= 40.
+        manager.iteration_done()
+        self.assertFalse(manager.can_start_next())
+
+    def test_search_stops_early(self):
+        reload(game_agent)
+        stats = SearchStats()
+        player = game_agent.AlphaBetaPlayer(score_fn=game_agent.custom_score_3,
+                                            stats=stats, endgame=False)
+        game = isolation.BitBoard(player, RandomPlayer(), seed=7)
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        time_left = timer(150.)
+        move = player.get_move(game, time_left)
+        self.assertIn(move, game.get_legal_moves())
+        self.assertGreater(time_left(), 0.)
+        record = stats.moves[0]
+        if record["time_left_at_abort"] is None:
+            self.assertEqual(record["depth"], len(player.clock.iteration_times))
+
+
+class GeometryHeuristicTest(unittest.TestCase):
+    """Unit tests for the heuristics reading the cached board geometry"""
+
+    @staticmethod
+    def weight(move):
+        """Layer weight of a move on a 7x7 board"""
+        if move == (3, 3):
+            return 1.5
+        if 0 in move or 6 in move:
+            return 0.5
+        return 1.
+
+    def test_scores_match_definitions(self):
+        reload(game_agent)
+        for _ in range(20):
+            game = isolation.BitBoard("Player1", "Player2")
+            for _ in range(random.randint(2, 20)):
+                moves = game.get_legal_moves()
+                if not moves:
+                    break
+                game.apply_move(random.choice(moves))
+            if not game.get_legal_moves():
+                continue
+            player, opponent = game.active_player, game.inactive_player
+            own, opp = game.get_legal_moves(player), game.get_legal_moves(opponent)
+            expected = (sum(map(self.weight, own)) - sum(map(self.weight, opp)) +
+                        len(own) - len(opp))
+            self.assertEqual(expected, game_agent.custom_score(game, player))
+
+            (y, x), (oy, ox) = (game.get_player_location(player),
+                                game.get_player_location(opponent))
+            self.assertEqual((3.5 - y) ** 2 + (3.5 - x) ** 2 - (3.5 - oy) ** 2 - (3.5 - ox) ** 2,
+                             game_agent.custom_score_2(game, player))
+            self.assertEqual((3.5 - y) ** 2 + (3.5 - x) ** 2, center_score(game, player))
+
+
+class MoveCacheTest(unittest.TestCase):
+    """Unit tests for the cached legal moves and mobility queries"""
+
+    def test_cache_follows_position(self):
+        for board_class in (isolation.Board, isolation.BitBoard):
+            game = board_class("Player1", "Player2", seed=5)
+            rng = random.Random(5)
+            for _ in range(40):
+                for player in ("Player1", "Player2"):
+                    moves = game.get_legal_moves(player)
+                    self.assertEqual(len(moves), game.mobility(player))
+                    moves.append((-1, -1))
+                    self.assertNotIn((-1, -1), game.get_legal_moves(player))
+                    opponent = game.get_opponent(player)
+                    self.assertEqual((game.utility(player), game.mobility(player),
+                                      game.mobility(opponent)),
+                                     game.outcome_and_mobility(player))
+                moves = game.get_legal_moves()
+                if not moves:
+                    self.assertEqual(float("-inf"), game.outcome_and_mobility(game.active_player)[0])
+                    break
+                if rng.random() < 0.3:
+                    game.push_move(moves[0])
+                    game.pop_move()
+                    self.assertEqual(sorted(moves), sorted(game.get_legal_moves()))
+                game.push_move(rng.choice(moves))
+
+    def test_rejects_unknown_player(self):
+        for board_class in (isolation.Board, isolation.BitBoard):
+            game = board_class("Player1", "Player2")
+            game.get_legal_moves("Player2")
+            with self.assertRaises(RuntimeError):
+                game.get_legal_moves("Player3")
+
+
+class ParallelSearchTest(unittest.TestCase):
+    """Unit tests for the root-parallel alpha-beta search"""
+
+    def setUp(self):
+        reload(game_agent)
+
+    def test_replace_player(self):
+        for board_class in (isolation.Board, isolation.BitBoard):
+            game = board_class("Player1", "Player2")
+            game.apply_move((3, 3))
+            board = game.replace_player("Player2", "Substitute")
+            self.assertEqual("Substitute", board.active_player)
+            self.assertEqual(sorted(game.get_legal_moves("Player2")),
+                             sorted(board.get_legal_moves("Substitute")))
+            self.assertEqual(game.hash(), board.hash())
+            with self.assertRaises(RuntimeError):
+                game.replace_player("Player3", "Substitute")
+
+    def test_worker_search_matches_serial(self):
+        player = game_agent.AlphaBetaPlayer()
+        game = isolation.Board(player, RandomPlayer(), shuffle=False)
+        game.apply_move((3, 3))
+        game.apply_move((2, 4))
+        board = game.replace_player(player, game_agent.SEARCHER)
+        board = board.replace_player(board.inactive_player, game_agent.OPPONENT)
+        game_agent.init_search_worker(game_agent.AlphaBetaPlayer().worker_settings())
+        results, _ = game_agent.search_root_worker(board, game.get_legal_moves(),
+                                                   time.monotonic() + 0.2)
+        depth, move, score = results[-1]
+        player.time_left = timer(1000.)
+        player.alphabeta(game, depth)
+        self.assertEqual(score, player.root_score)
+        # The searches may settle ties between moves of equal value apart
+        player.alphabeta(game, depth, root_moves=[move])
+        self.assertEqual(score, player.root_score)
+
+    def test_merge_proven_results(self):
+        inf = float("inf")
+        merge = game_agent.AlphaBetaPlayer.merge_worker_results
+        lost = [(1, (0, 0), 1.), (2, (0, 0), 0.5), (3, (0, 0), -inf)]
+        deep = [[(d, (1, 1), 2. + d) for d in range(1, 6)],
+                [(d, (2, 2), 6. - d) for d in range(1, 6)]]
+        self.assertEqual((5, (1, 1)), merge([lost] + deep))
+        won = [(1, (3, 3), 0.), (2, (3, 3), inf)]
+        self.assertEqual((5, (3, 3)), merge(deep + [won]))
+        self.assertEqual((3, None), merge([lost]))
+        self.assertEqual((0, None), merge([]))
+
+    def test_parallel_move_in_time(self):
+        player = game_agent.AlphaBetaPlayer(workers=2, stats=SearchStats())
+        game = isolation.Board(player, RandomPlayer())
+        game.apply_move((3, 3))
+        game.apply_move((2, 4))
+        try:
+            for _ in range(2):
+                time_left = timer(150.)
+                move = player.get_move(game.copy(), time_left)
+                self.assertGreater(time_left(), 0)
+                self.assertIn(move, game.get_legal_moves())
+        finally:
+            player.close()
+        self.assertGreater(player.stats.moves[-1]["depth"], 0)
+
+
+class PonderTest(unittest.TestCase):
+    """Unit tests for searching on the opponent's time"""
+
+    def test_ponder_hit_and_miss(self):
+        reload(game_agent)
+        player = game_agent.AlphaBetaPlayer(score_fn=center_score, ponder=True)
+        try:
+            game = isolation.BitBoard(player, RandomPlayer(), seed=3)
+            game.apply_move((3, 3))
+            game.apply_move((2, 2))
+            move = player.get_move(game.copy(), timer(100.))
+            for expect_hit in (False, True):
+                game.apply_move(move)
+                replies = game.get_legal_moves()
+                predicted = [reply for reply in replies
+                             if game.forecast_move(reply).hash() == player.ponder_key]
+                self.assertEqual(1, len(predicted))
+                others = [reply for reply in replies if reply not in predicted]
+                game.apply_move(predicted[0] if expect_hit else others[0])
+
+                hits = player.ponder_hits
+                time_left = timer(100.)
+                move = player.get_move(game.copy(), time_left)
+                self.assertGreater(time_left(), 0.)
+                self.assertIn(move, game.get_legal_moves())
+                self.assertEqual(hits + expect_hit, player.ponder_hits)
+        finally:
+            player.close()
+
+    def test_play_to_the_end(self):
+        for board_class in (isolation.Board, isolation.BitBoard):
+            # Both ponder processes share the processor with the game, so
+            # keep a wide margin to the deadline
+            players = [game_agent.AlphaBetaPlayer(score_fn=center_score, timeout=40.,
+                                                  ponder=True) for _ in range(2)]
+            try:
+                game = board_class(*players, seed=5)
+                game.apply_move((3, 3))
+                game.apply_move((2, 2))
+                winner, _, termination = game.play(time_limit=100)
+                self.assertIn(winner, players)
+                # play() reports a loser left without legal moves this way
+                self.assertEqual("illegal move", termination)
+            finally:
+                for player in players:
+                    player.close()
+
+
+class OpeningBookTest(unittest.TestCase):
+    """Unit tests for the opening book builder and lookup"""
+
+    def test_symmetric_positions_share_entries(self):
+        geometry = get_geometry(7, 7)
+        game = isolation.BitBoard("Player1", "Player2")
+        game.apply_move((1, 2))
+        game.apply_move((3, 4))
+        key = game.canonical_hash()[0]
+        for perm in geometry.symmetries:
+            image = isolation.Board("Player1", "Player2")
+            for r, c in ((1, 2), (3, 4)):
+                image.apply_move(geometry.coords[perm[r + c * 7]])
+            self.assertEqual(key, image.canonical_hash()[0])
+
+    def test_build_save_and_lookup(self):
+        book = opening_book.build_book(plies=2, depth=2, width=5, height=5)
+        self.assertEqual(7, len(book))  # the empty board and 6 first moves
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.bin")
+            book.save(path)
+            loaded = opening_book.OpeningBook.load(path)
+        self.assertEqual(book.entries, loaded.entries)
+
+        geometry = get_geometry(5, 5)
+        player = game_agent.AlphaBetaPlayer(book=loaded)
+        for perm in geometry.symmetries:
+            game = isolation.Board(RandomPlayer(), player, width=5, height=5)
+            game.apply_move(geometry.coords[perm[5]])
+            expected = opening_book.search_position(((0, 1),), 2, game_agent.custom_score,
+                                                    5, 5)[1]
+            self.assertEqual(geometry.coords[perm[expected[0] + expected[1] * 5]],
+                             player.get_move(game, timer(150.)))
+            game.apply_move(game.get_legal_moves()[0])
+            game.apply_move(game.get_legal_moves()[0])
+            self.assertIsNone(loaded.lookup(game))
+
+
+class SelfPlayTest(unittest.TestCase):
+    """Unit tests for the self-play generator and the game record format"""
+
+    def test_generate_and_read(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.bin")
+            agents = ["Random", "Greedy_Improved", "AB_Improved"]
+            self.assertEqual(12, selfplay.generate(path, 12, agents, depth=2, seed=5,
+                                                   batch=5, width=5, height=5))
+            self.assertEqual(3, selfplay.generate(path, 3, agents, depth=2, seed=6,
+                                                  width=5, height=5))
+            self.assertEqual(selfplay.HEADER.size + 15 * (3 + 25), os.path.getsize(path))
+            with selfplay.GameRecords(path) as records:
+                self.assertEqual(15, len(records))
+                for record in records:
+                    self.assertEqual("illegal move", record.termination)
+                    game = isolation.BitBoard("Player1", "Player2", 5, 5)
+                    for move in record.moves:
+                        self.assertIn(move, game.get_legal_moves())
+                        game.apply_move(move)
+                    self.assertFalse(game.get_legal_moves())
+                    self.assertEqual(1 - len(record.moves) % 2, record.winner)
+                if numpy is not None:
+                    array = records.as_array()
+                    self.assertEqual([len(record.moves) for record in records],
+                                     array["length"].tolist())
+                first = records[0]
+
+            # The same seed plays the same games
+            copy = os.path.join(directory, "copy.bin")
+            selfplay.generate(copy, 5, agents, depth=2, seed=5, width=5, height=5)
+            with selfplay.GameRecords(copy) as records:
+                self.assertEqual(first, records[0])
+            with self.assertRaises(ValueError):
+                selfplay.open_games(path, 7, 7)
+
+    def test_large_board(self):
+        # The players must come from selfplay, which other tests do not reload
+        players = [selfplay.AGENTS["AB_Improved"]() for _ in range(2)]
+        game = isolation.SparseBoard(*players, width=25, height=25, seed=5)
+        moves, winner, termination = selfplay.play_game(game, [], depth=2)
+        self.assertEqual("illegal move", termination)
+        self.assertGreater(max(moves), 0xff)
+        self.assertGreater(sum(player.endgame.solved for player in players), 0)
+
+        book = opening_book.OpeningBook(25, 25, 1)
+        book.add(isolation.SparseBoard("Player1", "Player2", 25, 25), (20, 20), 3)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.bin")
+            with selfplay.open_games(path, 25, 25) as f:
+                f.write(selfplay.encode_game(moves, winner, termination, 25, 25))
+            with selfplay.GameRecords(path) as records:
+                self.assertEqual([(idx % 25, idx // 25) for idx in moves], records[0].moves)
+                self.assertEqual(winner, records[0].winner)
+                if numpy is not None:
+                    self.assertEqual(len(moves), records.as_array()["length"][0])
+            path = os.path.join(directory, "book.bin")
+            book.save(path)
+            self.assertEqual(book.entries, opening_book.OpeningBook.load(path).entries)
+
+    def test_rejects_other_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.bin")
+            opening_book.OpeningBook(5, 5, 1).save(path)
+            with self.assertRaises(ValueError):
+                selfplay.GameRecords(path)
+
+
+class MatchServerTest(unittest.TestCase):
+    """Unit tests for the match server and the agent protocol"""
+
+    # Accepts games, then never answers a move request
+    STALLED_AGENT = ("import sys\n"
+                     "for line in sys.stdin:\n"
+                     "    if line.startswith('game'):\n"
+                     "        print('ok', flush=True)\n")
+
+    def test_serve(self):
+        requests = io.StringIO("game 5 5 1\nmove 150 12\nquit\nmove 150\n")
+        replies = io.StringIO()
+        match_server.serve(sample_players.GreedyPlayer(), requests, replies)
+        reply, move = replies.getvalue().split()
+        self.assertEqual("ok", reply)
+        self.assertIn(int(move), set(range(25)) - {12})
+
+        replies = io.StringIO()
+        match_server.serve(sample_players.GreedyPlayer(), io.StringIO("move 150 12\nquit\n"),
+                           replies)
+        self.assertEqual("error no game in progress\n", replies.getvalue())
+
+    def test_deadlines_between_processes(self):
+        agents = dict([match_server.agent_command("Greedy_Open"),
+                       ("Stalled", [sys.executable, "-c", self.STALLED_AGENT])])
+        results = asyncio.run(match_server.run_tournament(agents, 2, time_limit=100, seed=1))
+        self.assertEqual([("Greedy_Open", "timeout")] * 2, results[("Greedy_Open", "Stalled")])
+
+
+class TuningTest(unittest.TestCase):
+    """Unit tests for the custom_score weight tuner"""
+
+    def test_features_match_custom_score(self):
+        rng = random.Random(4)
+        game = isolation.BitBoard("Player1", "Player2", seed=4)
+        moves = []
+        while game.get_legal_moves():
+            moves.append(rng.choice(game.get_legal_moves()))
+            game.apply_move(moves[-1])
+        winner = game.move_count % 2 ^ 1
+
+        game = isolation.BitBoard("Player1", "Player2")
+        weights = [w + 1. for w in game_agent.CUSTOM_SCORE_WEIGHTS]
+        positions = list(tuning.game_features(moves, winner, 7, 7))
+        self.assertTrue(positions)
+        for features, won in positions:
+            while game.move_count < len(moves):
+                game.apply_move(moves[game.move_count])
+                if (game.get_legal_moves() and game.get_legal_moves(game.inactive_player) and
+                        game.move_count >= 2):
+                    break
+            self.assertAlmostEqual(game_agent.custom_score(game, game.active_player),
+                                   sum(w * f for w, f in zip(weights, features)))
+            self.assertEqual(game.move_count % 2 == winner, won)
+
+    def test_fit_recovers_coefficients(self):
+        true = [0.4, -0.2, 0.1]
+        rows = []
+        for x in range(-4, 5):
+            for y in range(-4, 5):
+                p = tuning.sigmoid(true[0] * x + true[1] * y + true[2])
+                rows.append(([x, y, 1.], 1000 * p, 1000))
+        for fitted, expected in zip(tuning.fit_logistic(rows), true):
+            self.assertAlmostEqual(expected, fitted, places=6)
+
+
+class EndgameTest(unittest.TestCase):
+    """Unit tests for the partitioned endgame solver"""
+
+    def exact_value(self, game):
+        """Value of the position for the active player by exhaustive search"""
+        best = float("-inf")
+        for move in game.get_legal_moves():
+            game.push_move(move)
+            best = max(best, -self.exact_value(game))
+            game.pop_move()
+            if best == float("inf"):
+                break
+        return best
+
+    def partitioned_positions(self, count, max_blanks=20):
+        rng = random.Random(3)
+        solver = EndgameSolver()
+        positions = []
+        while len(positions) < count:
+            game = isolation.BitBoard("Player1", "Player2", seed=rng.getrandbits(16))
+            while game.get_legal_moves():
+                game.apply_move(rng.choice(game.get_legal_moves()))
+                solution = solver.solve(game)
+                if solution and bin(game.get_blank_mask()).count("1") <= max_blanks:
+                    positions.append((game, solution))
+                    break
+        return positions
+
+    def test_solver_matches_exhaustive_search(self):
+        for game, (value, move) in self.partitioned_positions(15):
+            self.assertEqual(self.exact_value(game), value)
+            if value == float("inf"):
+                game.apply_move(move)
+                self.assertEqual(float("-inf"), self.exact_value(game))
+
+    def test_search_plays_solution(self):
+        reload(game_agent)
+        for game, (value, move) in self.partitioned_positions(5):
+            if move is None:
+                continue
+            player = game_agent.AlphaBetaPlayer()
+            board = game.replace_player(game.active_player, player)
+            self.assertEqual(move, player.get_move(board, timer(150.)))
+            self.assertEqual(value, player.root_score)
+
+    def test_large_board(self):
+        knight_masks = get_geometry(25, 25).knight_masks
+        solver = EndgameSolver()
+        self.assertEqual((1, 597), solver.longest_path(knight_masks, 1 << 597, 624))
+        self.assertEqual((2, 597), solver.longest_path(knight_masks, 1 << 597 | 1 << 570, 624))
+        self.assertEqual((0, None), solver.longest_path(knight_masks, 1 << 570, 624))
+
+
+class MCTSTest(unittest.TestCase):
+    """Unit tests for the Monte Carlo tree search player"""
+
+    def setUp(self):
+        self.player = competition_agent.MCTSPlayer(seed=1)
+        self.game = isolation.Board(self.player, RandomPlayer(), seed=1)
+        self.game.apply_move((3, 3))
+        self.game.apply_move((2, 4))
+
+    def test_legal_move_in_time(self):
+        for policy in (competition_agent.random_playout_move,
+                       competition_agent.mobility_playout_move):
+            self.player.playout_policy = policy
+            time_left = timer(100.)
+            move = self.player.get_move(self.game.copy(), time_left)
+            self.assertGreater(time_left(), 0)
+            self.assertIn(move, self.game.get_legal_moves())
+            self.assertGreater(self.player.playouts, 0)
+            self.assertGreater(self.player.playouts_per_second, 0)
+
+    def test_reuses_subtree(self):
+        move = self.player.get_move(self.game.copy(), timer(100.))
+        self.game.apply_move(move)
+        reply = max(self.player.root.children, key=lambda child: child.visits)
+        visits = reply.visits
+        self.game.apply_move(reply.move)
+        self.player.get_move(self.game.copy(), timer(50.))
+        self.assertIn(self.player.root, reply.children)
+        self.assertGreater(reply.visits, visits)
+
+    def test_custom_player(self):
+        player = competition_agent.CustomPlayer()
+        game = isolation.Board(player, RandomPlayer())
+        game.apply_move((3, 3))
+        game.apply_move((2, 4))
+        self.assertIn(player.get_move(game.copy(), timer(50.)), game.get_legal_moves())
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class BatchEvalTest(unittest.TestCase):
+    """Unit tests for the vectorized leaf evaluation"""
+
+    HEURISTICS = ("custom_score", "custom_score_2", "custom_score_3", "null_score",
+                  "open_move_score", "improved_score", "center_score")
+
+    def setUp(self):
+        reload(game_agent)
+        self.heuristics = [getattr(game_agent, name, None) or getattr(sample_players, name)
+                           for name in self.HEURISTICS]
+
+    def test_batch_matches_scalar_scores(self):
+        from batch_eval import BatchScorer
+        rng = random.Random(7)
+        for _ in range(30):
+            game = isolation.BitBoard("Player1", "Player2")
+            for _ in range(rng.randint(2, 30)):
+                moves = game.get_legal_moves()
+                if not moves:
+                    break
+                game.apply_move(rng.choice(moves))
+            moves = game.get_legal_moves()
+            if not moves:
+                continue
+            for score_fn in self.heuristics:
+                scorer = BatchScorer(score_fn)
+                for player in (game.active_player, game.inactive_player):
+                    expected = [score_fn(game.forecast_move(m), player) for m in moves]
+                    for value, target in zip(scorer(game, moves, player), expected):
+                        self.assertAlmostEqual(target, value)
+
+    def test_search_is_unchanged(self):
+        for depth in (1, 2, 3, 4):
+            moves = []
+            for flag in (False, True):
+                player = game_agent.AlphaBetaPlayer(batch_eval=flag)
+                game = isolation.BitBoard(player, "Player2", seed=3)
+                game.apply_move((2, 3))
+                game.apply_move((4, 4))
+                player.time_left = timer(1000.)
+                moves.append(player.alphabeta(game, depth))
+            self.assertEqual(moves[0], moves[1])
+
+    def test_unsupported_heuristic(self):
+        with self.assertRaises(ValueError):
+            game_agent.AlphaBetaPlayer(score_fn=lambda game, player: 0., batch_eval=True)
+
+
 if __name__ == '__main__':
     unittest.main()
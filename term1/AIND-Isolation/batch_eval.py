@@ -0,0 +1,231 @@
+"""This file contains vectorized counterparts of the heuristics in
+sample_players.py and game_agent.py that score every child of a search node
+in one NumPy pass.  `AlphaBetaPlayer(batch_eval=True)` uses them at the last
+ply of the search instead of applying and scoring each move separately.
+
+A batch of positions is described by
+
+    free : bool array of shape (N, size + 1)
+        True for every blank cell of each position.  The extra last column is
+        always False and is the target of the padding in the neighbour table,
+        so off-board knight moves are never counted.
+
+    own_loc, opp_loc : int arrays of shape (N,)
+        The cell index of the evaluated player and of its opponent.
+
+    own_to_move : bool array of shape (N,)
+        True where the evaluated player is the one to move.
+
+NumPy is an optional dependency: importing this module raises ImportError
+when it is not installed.
+"""
+import numpy as np
+
+from isolation import Board
+from isolation.geometry import get_geometry
+
+
+class BatchTables(object):
+    """NumPy versions of the `isolation.geometry.Geometry` tables for a board
+    of the specified size.
+
+    Attributes
+    ----------
+    size : int
+        The number of cells on the board.
+
+    neighbours : int array of shape (size + 1, 8)
+        The knight moves of each cell index, padded with `size`.
+
+    center_distance : float array of shape (size,)
+        The squared distance of each cell index from the center of the board.
+    """
+
+    def __init__(self, width, height):
+        geometry = get_geometry(width, height)
+        self.size = geometry.size
+        self.neighbours = np.full((self.size + 1, 8), self.size, dtype=np.intp)
+        for idx, moves in enumerate(geometry.knight_moves):
+            self.neighbours[idx, :len(moves)] = moves
+        self.center_distance = np.array(geometry.center_distance)
+        self._geometry = geometry
+        self._layer_weights = {}
+
+    def layer_weights(self, weights):
+        """Return the layer weight of each cell index as an array of shape
+        (size + 1,), with a zero weight for the padding cell.
+        """
+        table = self._layer_weights.get(weights)
+        if table is None:
+            table = np.append(self._geometry.layer_weights(weights), 0.)
+            self._layer_weights[weights] = table
+        return table
+
+    def open_cells(self, free, loc):
+        """Return a bool array of shape (N, 8) marking the legal moves from
+        the location of each position.
+        """
+        return free[np.arange(len(loc))[:, None], self.neighbours[loc]]
+
+
+_TABLES = {}
+
+
+def get_tables(width, height):
+    """Return the shared `BatchTables` instance for a board of the given
+    size.
+    """
+    tables = _TABLES.get((width, height))
+    if tables is None:
+        tables = _TABLES[(width, height)] = BatchTables(width, height)
+    return tables
+
+
+def _terminal(values, own_open, opp_open, own_to_move):
+    """Replace the values of finished games with +/-inf, as `is_winner()`
+    and `is_loser()` do in the scalar heuristics.
+    """
+    own_moves = own_open.sum(axis=1)
+    opp_moves = opp_open.sum(axis=1)
+    values = np.where(own_to_move & (own_moves == 0), -np.inf, values)
+    return np.where(~own_to_move & (opp_moves == 0), np.inf, values)
+
+
+def batch_null_score(tables, free, own_loc, opp_loc, own_to_move):
+    """Batch version of `sample_players.null_score`. """
+    own_open = tables.open_cells(free, own_loc)
+    opp_open = tables.open_cells(free, opp_loc)
+    return _terminal(np.zeros(len(own_loc)), own_open, opp_open, own_to_move)
+
+
+def batch_open_move_score(tables, free, own_loc, opp_loc, own_to_move):
+    """Batch version of `sample_players.open_move_score`. """
+    own_open = tables.open_cells(free, own_loc)
+    opp_open = tables.open_cells(free, opp_loc)
+    values = own_open.sum(axis=1).astype(float)
+    return _terminal(values, own_open, opp_open, own_to_move)
+
+
+def batch_improved_score(tables, free, own_loc, opp_loc, own_to_move):
+    """Batch version of `sample_players.improved_score` and
+    `game_agent.custom_score_3`.
+    """
+    own_open = tables.open_cells(free, own_loc)
+    opp_open = tables.open_cells(free, opp_loc)
+    values = (own_open.sum(axis=1) - opp_open.sum(axis=1)).astype(float)
+    return _terminal(values, own_open, opp_open, own_to_move)
+
+
+def batch_center_score(tables, free, own_loc, opp_loc, own_to_move):
+    """Batch version of `sample_players.center_score`. """
+    own_open = tables.open_cells(free, own_loc)
+    opp_open = tables.open_cells(free, opp_loc)
+    values = tables.center_distance[own_loc]
+    return _terminal(values, own_open, opp_open, own_to_move)
+
+
+def batch_custom_score(tables, free, own_loc, opp_loc, own_to_move):
+    """Batch version of `game_agent.custom_score`. """
+    from game_agent import CUSTOM_SCORE_WEIGHTS
+    weights = tables.layer_weights(CUSTOM_SCORE_WEIGHTS)
+    own_open = tables.open_cells(free, own_loc)
+    opp_open = tables.open_cells(free, opp_loc)
+    own_weight = (own_open * weights[tables.neighbours[own_loc]]).sum(axis=1)
+    opp_weight = (opp_open * weights[tables.neighbours[opp_loc]]).sum(axis=1)
+    values = (own_weight - opp_weight) + (own_open.sum(axis=1) - opp_open.sum(axis=1))
+    return _terminal(values, own_open, opp_open, own_to_move)
+
+
+def batch_custom_score_2(tables, free, own_loc, opp_loc, own_to_move):
+    """Batch version of `game_agent.custom_score_2`. """
+    own_open = tables.open_cells(free, own_loc)
+    opp_open = tables.open_cells(free, opp_loc)
+    values = tables.center_distance[own_loc] - tables.center_distance[opp_loc]
+    return _terminal(values, own_open, opp_open, own_to_move)
+
+
+# Batch version of each supported heuristic, by (module, function name)
+BATCH_SCORES = {
+    ("sample_players", "null_score"): batch_null_score,
+    ("sample_players", "open_move_score"): batch_open_move_score,
+    ("sample_players", "improved_score"): batch_improved_score,
+    ("sample_players", "center_score"): batch_center_score,
+    ("game_agent", "custom_score"): batch_custom_score,
+    ("game_agent", "custom_score_2"): batch_custom_score_2,
+    ("game_agent", "custom_score_3"): batch_improved_score,
+}
+
+
+def children_arrays(game, moves, player):
+    """Describe the positions reached by each of the active player's moves
+    as a batch.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The parent position.
+
+    moves : list<(int, int)>
+        Legal moves of the active player in `game`.
+
+    player : object
+        The player the children are evaluated for.
+
+    Returns
+    -------
+    (BatchTables, array, array, array, array) or None
+        The tables for the board size and the (free, own_loc, opp_loc,
+        own_to_move) arrays of the children, or None if the inactive player
+        has not been placed on the board yet.
+    """
+    waiting = game.inactive_player
+    waiting_loc = game.get_player_location(waiting)
+    if waiting_loc == Board.NOT_MOVED:
+        return None
+
+    height = game.height
+    tables = get_tables(game.width, height)
+    count = len(moves)
+    move_idx = np.array([r + c * height for r, c in moves], dtype=np.intp)
+    blank_idx = [r + c * height for r, c in game.get_blank_spaces()]
+
+    free = np.zeros((count, tables.size + 1), dtype=bool)
+    free[:, blank_idx] = True
+    free[np.arange(count), move_idx] = False
+
+    waiting_idx = np.full(count, waiting_loc[0] + waiting_loc[1] * height, dtype=np.intp)
+    if player is waiting:
+        return tables, free, waiting_idx, move_idx, np.ones(count, dtype=bool)
+    return tables, free, move_idx, waiting_idx, np.zeros(count, dtype=bool)
+
+
+class BatchScorer(object):
+    """Score all the children of a node with the batch version of a
+    heuristic.
+
+    Parameters
+    ----------
+    score_fn : callable
+        One of the heuristics listed in `BATCH_SCORES`.
+
+    Raises
+    ------
+    ValueError
+        If the heuristic has no batch version.
+    """
+
+    def __init__(self, score_fn):
+        name = (score_fn.__module__, score_fn.__name__)
+        if name not in BATCH_SCORES:
+            raise ValueError("No batch version of the heuristic {}.{}".format(*name))
+        self.batch_fn = BATCH_SCORES[name]
+
+    def __call__(self, game, moves, player):
+        """Return the heuristic value of applying each move to `game` from
+        the point of view of `player`, as a list of floats, or None if the
+        position cannot be batched (see `children_arrays`).
+        """
+        arrays = children_arrays(game, moves, player)
+        if arrays is None:
+            return None
+        return self.batch_fn(*arrays).tolist()
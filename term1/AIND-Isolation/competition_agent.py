@@ -4,7 +4,11 @@ champions) in a tournament.
 
          COMPLETING AND SUBMITTING A COMPETITION AGENT IS OPTIONAL
 """
+import math
 import random
+import timeit
+
+from isolation import BitBoard
 
 
 class SearchTimeout(Exception):
@@ -36,6 +40,228 @@ def custom_score(game, player):
     raise NotImplementedError
 
 
+def random_playout_move(board, moves, rng):
+    """Playout policy choosing uniformly among the legal moves. """
+    return rng.choice(moves)
+
+
+def mobility_playout_move(board, moves, rng):
+    """Playout policy choosing the move that leaves the mover with the most
+    moves relative to its opponent, breaking ties at random.
+    """
+    best_moves = []
+    best_score = float("-inf")
+    for move in moves:
+        board.push_move(move)
+        score = board.mobility(board.inactive_player) - board.mobility(board.active_player)
+        board.pop_move()
+        if score > best_score:
+            best_moves = [move]
+            best_score = score
+        elif score == best_score:
+            best_moves.append(move)
+    return rng.choice(best_moves)
+
+
+class TreeNode:
+    """A node of the Monte Carlo search tree.
+
+    Parameters
+    ----------
+    move : (int, int)
+        The move leading to the node from its parent, or None at the root.
+
+    player : object
+        The player who made `move`; `wins` are counted for this player.
+
+    key : int
+        The hash of the position at the node (see `isolation.Board.hash()`).
+
+    moves : list<(int, int)>
+        The legal moves of the player to move at the node.
+
+    parent : TreeNode (optional)
+        The parent node, or None at the root.
+    """
+
+    def __init__(self, move, player, key, moves, parent=None):
+        self.move = move
+        self.player = player
+        self.key = key
+        self.parent = parent
+        self.children = []
+        self.untried = moves
+        self.visits = 0
+        self.wins = 0
+
+    def select(self, exploration):
+        """Return the child maximizing the UCT (UCB1) score. """
+        log_visits = math.log(self.visits)
+        best_child = None
+        best_score = float("-inf")
+        for child in self.children:
+            score = (child.wins / child.visits +
+                     exploration * math.sqrt(log_visits / child.visits))
+            if score > best_score:
+                best_child = child
+                best_score = score
+        return best_child
+
+
+class MCTSPlayer:
+    """Game-playing agent that chooses a move using Monte Carlo tree search
+    with UCT selection.
+
+    Each iteration descends the tree with the UCB1 rule, adds one node,
+    plays the game out to the end with the playout policy and updates the
+    win counts along the path. Iterations run on a `BitBoard` copy of the
+    game until `time_left()` drops below the threshold, and the most visited
+    root move is played. The subtree below the opponent's reply is kept for
+    the next turn.
+
+    Parameters
+    ----------
+    exploration : float (optional)
+        The exploration constant of the UCB1 rule.
+
+    playout_policy : callable (optional)
+        A function (board, moves, rng) -> move choosing the moves of the
+        playouts, e.g., `random_playout_move` or `mobility_playout_move`.
+
+    timeout : float (optional)
+        Time remaining (in milliseconds) when search is aborted.
+
+    seed : int (optional)
+        Seed for the random number generator of the playouts.
+
+    Attributes
+    ----------
+    playouts : int
+        The number of playouts run by the last call to get_move().
+
+    playouts_per_second : float
+        The playout throughput of the last call to get_move().
+    """
+
+    def __init__(self, exploration=math.sqrt(2), playout_policy=random_playout_move,
+                 timeout=10., seed=None):
+        self.exploration = exploration
+        self.playout_policy = playout_policy
+        self.time_left = None
+        self.TIMER_THRESHOLD = timeout
+        self.rng = random.Random(seed)
+        self.root = None
+        self.playouts = 0
+        self.playouts_per_second = 0.
+
+    def __getstate__(self):
+        """Leave the search tree behind when the player is pickled (e.g.,
+        sent to a worker process).
+        """
+        state = self.__dict__.copy()
+        state["root"] = None
+        state["time_left"] = None
+        return state
+
+    def get_move(self, game, time_left):
+        """Search for the best move from the available legal moves and return a
+        result before the time limit expires.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        time_left : callable
+            A function that returns the number of milliseconds left in the
+            current turn. Returning with any less than 0 ms remaining forfeits
+            the game.
+
+        Returns
+        -------
+        (int, int)
+            Board coordinates corresponding to a legal move; may return
+            (-1, -1) if there are no available legal moves.
+        """
+        self.time_left = time_left
+        board = BitBoard.from_board(game, shuffle=False)
+        root = self.reuse_root(board)
+        if not root.children and not root.untried:
+            return (-1, -1)
+
+        self.playouts = 0
+        start = timeit.default_timer()
+        while self.time_left() > self.TIMER_THRESHOLD:
+            self.iterate(root, board)
+            self.playouts += 1
+        elapsed = timeit.default_timer() - start
+        self.playouts_per_second = self.playouts / elapsed if elapsed > 0 else 0.
+
+        if not root.children:
+            return root.untried[0]
+        best_child = max(root.children, key=lambda child: child.visits)
+        # Keep the subtree of the move played for the next turn
+        best_child.parent = None
+        self.root = best_child
+        return best_child.move
+
+    def reuse_root(self, board):
+        """Return the node of the previous tree matching the position on the
+        board, or a new root if there is none.
+        """
+        key = board.hash()
+        if self.root is not None:
+            for child in self.root.children:
+                if child.key == key:
+                    child.parent = None
+                    self.root = child
+                    return child
+        self.root = TreeNode(None, board.inactive_player, key, board.get_legal_moves())
+        return self.root
+
+    def iterate(self, root, board):
+        """Run one selection, expansion, playout and backpropagation step
+        from the root, restoring the board afterwards.
+        """
+        node = root
+        depth = 0
+        try:
+            # Selection
+            while not node.untried and node.children:
+                node = node.select(self.exploration)
+                board.push_move(node.move)
+                depth += 1
+
+            # Expansion
+            if node.untried:
+                move = node.untried.pop(self.rng.randrange(len(node.untried)))
+                player = board.active_player
+                board.push_move(move)
+                depth += 1
+                child = TreeNode(move, player, board.hash(), board.get_legal_moves(), node)
+                node.children.append(child)
+                node = child
+
+            # Playout
+            moves = board.get_legal_moves()
+            while moves:
+                board.push_move(self.playout_policy(board, moves, self.rng))
+                depth += 1
+                moves = board.get_legal_moves()
+            winner = board.inactive_player
+        finally:
+            for _ in range(depth):
+                board.pop_move()
+
+        # Backpropagation
+        while node is not None:
+            node.visits += 1
+            if node.player == winner:
+                node.wins += 1
+            node = node.parent
+
+
 class CustomPlayer:
     """Game-playing agent to use in the optional player vs player Isolation
     competition.
@@ -52,7 +278,12 @@ class CustomPlayer:
     Parameters
     ----------
     data : string
-        The name of the search method to use in get_move().
+        The name of the search method to use in get_move(); only "mcts"
+        (the default) is available.
+
+    book : opening_book.OpeningBook (optional)
+        If given, positions found in the book are played from it without
+        searching.
 
     timeout : float (optional)
         Time remaining (in milliseconds) when search is aborted.  Note that
@@ -61,10 +292,14 @@ class CustomPlayer:
         is generally sufficient.
     """
 
-    def __init__(self, data=None, timeout=1.):
+    def __init__(self, data=None, timeout=1., book=None):
         self.score = custom_score
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        if data not in (None, "mcts"):
+            raise ValueError("Unknown search method: {}".format(data))
+        self.search = MCTSPlayer(timeout=timeout)
+        self.book = book
 
     def get_move(self, game, time_left):
         """Search for the best move from the available legal moves and return a
@@ -93,5 +328,9 @@ class CustomPlayer:
             Board coordinates corresponding to a legal move; may return
             (-1, -1) if there are no available legal moves.
         """
-        # OPTIONAL: Finish this function!
-        raise NotImplementedError
+        self.time_left = time_left
+        if self.book is not None:
+            book_move = self.book.lookup(game)
+            if book_move is not None:
+                return book_move
+        return self.search.get_move(game, time_left)
@@ -0,0 +1,183 @@
+"""This file contains an exact solver for Isolation endgames in which the two
+players can no longer interfere with each other, used by the search agents in
+game_agent.py.
+
+Once the cells each player can still reach (by a flood fill over knight moves
+from its location) are disjoint, every move a player makes only consumes
+cells of its own region, so the game is decided by the length of the longest
+knight path each player can walk in its region.  The player to move runs out
+of moves first, and loses, unless its path is strictly longer than the
+opponent's.
+
+Longest paths are found by depth-first search memoized on (start cell, free
+cells); the search has a node budget, as the problem is exponential in the
+size of the region, and positions over budget are left to the heuristic
+search.  Memo keys and values are packed into plain integers, which the
+garbage collector does not track, so a large memo does not lengthen
+collection pauses during the search.
+"""
+from isolation.geometry import get_geometry
+
+
+class BudgetExceeded(Exception):
+    """Raised when a longest path search runs out of nodes or time. """
+    pass
+
+
+class EndgameSolver:
+    """Detect partitioned positions and solve them exactly.
+
+    Parameters
+    ----------
+    max_nodes : int (optional)
+        The maximum number of new positions visited while solving one
+        region before giving up.
+
+    max_memo : int (optional)
+        The memo is cleared when it grows beyond this many entries.
+
+    Attributes
+    ----------
+    solved : int
+        The number of positions solved since the last reset.
+    """
+
+    def __init__(self, max_nodes=2000, max_memo=100000):
+        self.max_nodes = max_nodes
+        self.max_memo = max_memo
+        self.memo = {}
+        self.unsolved = set()
+        self.solved = 0
+        self._nodes = 0
+        self._shift = 0
+        self._time_left = None
+        self._threshold = 0.
+
+    def __getstate__(self):
+        """Leave the memo behind when the solver is pickled. """
+        state = self.__dict__.copy()
+        state["memo"] = {}
+        state["unsolved"] = set()
+        state["_time_left"] = None
+        return state
+
+    def new_search(self):
+        """Called once at the start of each move selection. """
+        self.solved = 0
+        if len(self.memo) > self.max_memo:
+            self.memo.clear()
+            self.unsolved.clear()
+
+    def solve(self, game, time_left=None, threshold=0.):
+        """Solve a position exactly if the players are separated.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The position to solve.
+
+        time_left : callable (optional)
+            If given, the search gives up when `time_left()` falls below
+            `threshold` milliseconds.
+
+        Returns
+        -------
+        (float, (int, int)) or None
+            The value of the position for the active player (+inf if it
+            wins, -inf if it loses) and the first move of its longest path
+            (None if it has no moves), or None if the regions of the players
+            overlap or the position could not be solved within the budget.
+        """
+        active = game.get_player_location(game.active_player)
+        inactive = game.get_player_location(game.inactive_player)
+        if active is None or inactive is None:
+            return None
+
+        geometry = get_geometry(game.width, game.height)
+        free = game.get_blank_mask()
+        active_idx = active[0] + active[1] * game.height
+        inactive_idx = inactive[0] + inactive[1] * game.height
+        active_region = self.region(geometry.knight_masks, free, active_idx)
+        inactive_region = self.region(geometry.knight_masks, free, inactive_idx)
+        if active_region & inactive_region:
+            return None
+
+        self._time_left = time_left
+        self._threshold = threshold
+        active_length, first = self.longest_path(geometry.knight_masks, active_region, active_idx)
+        if active_length is None:
+            return None
+        inactive_length, _ = self.longest_path(geometry.knight_masks, inactive_region,
+                                               inactive_idx)
+        if inactive_length is None:
+            return None
+
+        self.solved += 1
+        value = float("inf") if active_length > inactive_length else float("-inf")
+        return value, None if first is None else geometry.coords[first]
+
+    @staticmethod
+    def region(knight_masks, free, start):
+        """Return the mask of the free cells reachable from `start`. """
+        reached = 0
+        frontier = knight_masks[start] & free
+        while frontier:
+            reached |= frontier
+            expanded = 0
+            while frontier:
+                low = frontier & -frontier
+                expanded |= knight_masks[low.bit_length() - 1]
+                frontier ^= low
+            frontier = expanded & free & ~reached
+        return reached
+
+    def longest_path(self, knight_masks, free, start):
+        """Return the length of the longest knight path from `start` over
+        the free cells and the cell index of its first step (None if there
+        is no move), or (None, None) if the search exceeds its budget.
+        """
+        # Cell indices, and one more than them, fit in the low bits
+        self._shift = len(knight_masks).bit_length()
+        key = free << self._shift | start
+        if key in self.unsolved:
+            return None, None
+        self._nodes = 0
+        try:
+            result = self._longest(knight_masks, free, start)
+        except BudgetExceeded:
+            self.unsolved.add(key)
+            return None, None
+        first = result & ((1 << self._shift) - 1)
+        return result >> self._shift, first - 1 if first else None
+
+    def _longest(self, knight_masks, free, start):
+        """Return the length of the longest path from `start` shifted left by
+        the bits of a cell index, plus one more than the index of its first
+        step (0 if there is no move).
+        """
+        shift = self._shift
+        key = free << shift | start
+        result = self.memo.get(key)
+        if result is not None:
+            return result
+
+        self._nodes += 1
+        if self._nodes > self.max_nodes:
+            raise BudgetExceeded()
+        if (self._time_left is not None and not self._nodes & 0xff and
+                self._time_left() < self._threshold):
+            raise BudgetExceeded()
+
+        # No path can be longer than the number of free cells
+        bound = bin(free).count("1") << shift
+        best = 0
+        moves = knight_masks[start] & free
+        while moves and best < bound:
+            low = moves & -moves
+            idx = low.bit_length() - 1
+            moves ^= low
+            length = (self._longest(knight_masks, free ^ low, idx) >> shift) + 1
+            if length << shift > best:
+                best = length << shift | idx + 1
+        self.memo[key] = best
+        return best
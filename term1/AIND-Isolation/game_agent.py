@@ -2,7 +2,39 @@
 test your agent's strength against a set of known agents using tournament.py
 and include the results in your report.
 """
+import multiprocessing
+import os
 import random
+import time
+
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from endgame import EndgameSolver
+from isolation.geometry import get_geometry
+from move_ordering import KillerHistoryOrderer
+from time_manager import TimeManager
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+# Weights of a move in the inner, middle and outer layers of the board in
+# custom_score. Consider them as tuning parameters.
+CUSTOM_SCORE_WEIGHTS = (1.5, 1., 0.5)
+
+# Mixed into transposition table keys for searches made as the second player
+PLAYER_2_SALT = 0x5bd1e9955bd1e995
+
+# Half-width of the aspiration window around the previous iteration's score
+ASPIRATION_WINDOW = 1.
+
+# Width of the windows used to test whether a move beats the best one so far
+NULL_WINDOW = 1e-3
+
+# Scheduling priority of the ponder process, lowered so that pondering only
+# uses CPU time the game itself does not need
+PONDER_NICENESS = 19
+
+# Stand-ins for the players of positions sent to root search workers
+SEARCHER = "searcher"
+OPPONENT = "opponent"
 
 
 class SearchTimeout(Exception):
@@ -21,8 +53,8 @@ def get_game_info_helper(game, player):
         A tuple consisting of: number of moves the agent has, number of moves the opponent has,
         number of blanks on the board, coordinates of agent, and coordinates of opponent
     """
-    agent_moves = len(game.get_legal_moves(player))
-    opponent_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    agent_moves = game.mobility(player)
+    opponent_moves = game.mobility(game.get_opponent(player))
     blanks = len(game.get_blank_spaces())
     agent_y, agent_x = game.get_player_location(player)
     opponent_y, opponent_x = game.get_player_location(game.get_opponent(player))
@@ -71,63 +103,22 @@ def custom_score(game, player):
     float
         The heuristic value of the current game state to the specified player.
     """
-    if game.is_loser(player):
-        return float("-inf")
-
-    if game.is_winner(player):
-        return float("inf")
+    utility, agent_mobility, opp_mobility = game.outcome_and_mobility(player)
+    if utility:
+        return utility
 
-    board_outer_layer = []
-    board_inner_layer = []
-    board_middle_layer = []
-
-    center_w_low = int(game.width / 2) - 1
-    center_w_high = int(game.width / 2) + 1
-
-    center_h_low = int(game.height / 2) - 1
-    center_h_high = int(game.height / 2) + 1
-
-    # The below 3 calculations for layers can be done in the main file before playing game and cached,
-    # since we do not need to calculate these again and again.
-
-    # Cells in Outer layer
-    for w in range(game.width):
-        for h in range(game.height):
-            if w == 0 or w == game.width - 1 or h == 0 or h == game.height - 1:
-                board_outer_layer.append((w, h))
-
-    # Cells in Inner region/layer
-    for w in range(game.width):
-        for h in range(game.height):
-            if (w < center_w_high and w > center_w_low) and (h < center_h_high and h > center_h_low):
-                board_inner_layer.append((w, h))
-
-    # Cells in middle layer
-    for w in range(game.width):
-        for h in range(game.height):
-            if (w, h) not in board_outer_layer and (w, h) not in board_inner_layer:
-                board_middle_layer.append((w, h))
+    # The layer of every cell and the weight of each layer are precomputed
+    # once per board size (see isolation.geometry)
+    weights = get_geometry(game.width, game.height).layer_weights(CUSTOM_SCORE_WEIGHTS)
+    height = game.height
 
     agent_moves = game.get_legal_moves(player)
     opp_moves = game.get_legal_moves(game.get_opponent(player))
 
-    agent_score = 0
-    opp_score = 0
-
-    # These weights determine how much a move is worth in each layer. Consider them as tuning parameters.
-    weight_inner = 1.5
-    weight_middle = 1
-    weight_outer = 0.5
-
-    agent_score += weight_inner * len([m for m in agent_moves if m in board_inner_layer])
-    agent_score += weight_middle * len([m for m in agent_moves if m in board_middle_layer])
-    agent_score += weight_outer * len([m for m in agent_moves if m in board_outer_layer])
-
-    opp_score += weight_inner * len([m for m in opp_moves if m in board_inner_layer])
-    opp_score += weight_middle * len([m for m in opp_moves if m in board_middle_layer])
-    opp_score += weight_outer * len([m for m in opp_moves if m in board_outer_layer])
+    agent_score = sum(weights[r + c * height] for r, c in agent_moves)
+    opp_score = sum(weights[r + c * height] for r, c in opp_moves)
 
-    effective_score = float(agent_score - opp_score) + float(len(agent_moves) - len(opp_moves))
+    effective_score = float(agent_score - opp_score) + float(agent_mobility - opp_mobility)
 
     return effective_score
 
@@ -158,18 +149,16 @@ def custom_score_2(game, player):
         The heuristic value of the current game state to the specified player.
     """
 
-    if game.is_loser(player):
-        return float("-inf")
+    utility = game.utility(player)
+    if utility:
+        return utility
 
-    if game.is_winner(player):
-        return float("inf")
-
-    agent_moves, opponent_moves, blanks, agent_y, agent_x, opponent_y, opponent_x = get_game_info_helper(game, player)
-
-    w, h = game.width / 2., game.height / 2.
+    center_distance = get_geometry(game.width, game.height).center_distance
+    agent_y, agent_x = game.get_player_location(player)
+    opponent_y, opponent_x = game.get_player_location(game.get_opponent(player))
 
-    euclidean_agent = float((w - agent_y) ** 2 + (h - agent_x) ** 2)
-    euclidean_opponent = float((w - opponent_y) ** 2 + (h - opponent_x) ** 2)
+    euclidean_agent = center_distance[agent_y + agent_x * game.height]
+    euclidean_opponent = center_distance[opponent_y + opponent_x * game.height]
 
     return (euclidean_agent - euclidean_opponent)
 
@@ -200,13 +189,9 @@ def custom_score_3(game, player):
         The heuristic value of the current game state to the specified player.
     """
 
-    if game.is_loser(player):
-        return float("-inf")
-
-    if game.is_winner(player):
-        return float("inf")
-
-    agent_moves, opponent_moves, blanks, agent_y, agent_x, opponent_y, opponent_x = get_game_info_helper(game, player)
+    utility, agent_moves, opponent_moves = game.outcome_and_mobility(player)
+    if utility:
+        return utility
 
     # The more moves agent has compared to opponent, the higher the likelihood of wining from this board position.
     return (float(agent_moves) - float(opponent_moves))
@@ -246,14 +231,32 @@ class MinimaxPlayer(IsolationPlayer):
     """Game-playing agent that chooses a move using depth-limited minimax
     search. You must finish and test this player to make sure it properly uses
     minimax to return a good move before the search time limit expires.
+
+    Parameters
+    ----------
+    stats : search_stats.SearchStats (optional)
+        If given, a record of the nodes searched and time used is added to
+        the collector for every move.
+
+    Attributes
+    ----------
+    clock : time_manager.TimeManager
+        Reads the timer every few nodes instead of at every node.
     """
 
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=10., stats=None):
+        super().__init__(search_depth, score_fn, timeout)
+        self.stats = stats
+        self.nodes = 0
+        self.clock = TimeManager(timeout)
+
     def minimax_helper(self, game, depth):
 
         player = game.active_player
 
-        if self.time_left() < self.TIMER_THRESHOLD:
+        if self.clock.expired(self.time_left):
             raise SearchTimeout()
+        self.nodes += 1
 
         legal_moves = game.get_legal_moves()
 
@@ -264,7 +267,11 @@ class MinimaxPlayer(IsolationPlayer):
             return final_move
 
         for move in legal_moves:
-            score = self.minimax_min_value(game.forecast_move(move), depth - 1)
+            game.push_move(move)
+            try:
+                score = self.minimax_min_value(game, depth - 1)
+            finally:
+                game.pop_move()
             if score > final_score:
                 final_score = score
                 final_move = move
@@ -275,8 +282,9 @@ class MinimaxPlayer(IsolationPlayer):
 
         player = game.active_player
 
-        if self.time_left() < self.TIMER_THRESHOLD:
+        if self.clock.expired(self.time_left):
             raise SearchTimeout()
+        self.nodes += 1
 
         legal_moves = game.get_legal_moves()
 
@@ -286,7 +294,11 @@ class MinimaxPlayer(IsolationPlayer):
         final_score = float('+inf')
 
         for move in legal_moves:
-            score = self.minimax_max_value(game.forecast_move(move), depth - 1)
+            game.push_move(move)
+            try:
+                score = self.minimax_max_value(game, depth - 1)
+            finally:
+                game.pop_move()
             if score < final_score:
                 final_score = score
 
@@ -296,8 +308,9 @@ class MinimaxPlayer(IsolationPlayer):
 
         player = game.active_player
 
-        if self.time_left() < self.TIMER_THRESHOLD:
+        if self.clock.expired(self.time_left):
             raise SearchTimeout()
+        self.nodes += 1
 
         legal_moves = game.get_legal_moves()
 
@@ -307,7 +320,11 @@ class MinimaxPlayer(IsolationPlayer):
         final_score = float('-inf')
 
         for move in legal_moves:
-            score = self.minimax_min_value(game.forecast_move(move), depth - 1)
+            game.push_move(move)
+            try:
+                score = self.minimax_min_value(game, depth - 1)
+            finally:
+                game.pop_move()
             if score > final_score:
                 final_score = score
 
@@ -342,18 +359,28 @@ class MinimaxPlayer(IsolationPlayer):
             (-1, -1) if there are no available legal moves.
         """
         self.time_left = time_left
+        self.clock.start(time_left)
+        self.nodes = 0
+        if self.stats is not None:
+            self.stats.begin(time_left())
 
         # Initialize the best move so that this function returns something
         # in case the search fails due to timeout
         best_move = (-1, -1)
+        aborted = False
 
         try:
             # The try/except block will automatically catch the exception
             # raised when the timer is about to expire.
-            return self.minimax(game, self.search_depth)
+            best_move = self.minimax(game, self.search_depth)
+            if self.stats is not None:
+                self.stats.depth_done(self.search_depth, time_left())
 
         except SearchTimeout:
-            pass  # Handle any actions required after timeout as needed
+            aborted = True  # Handle any actions required after timeout as needed
+
+        if self.stats is not None:
+            self.stats.end(time_left(), self.nodes, aborted=aborted)
 
         # Return the best move from the last completed search iteration
         return best_move
@@ -408,92 +435,373 @@ class AlphaBetaPlayer(IsolationPlayer):
     """Game-playing agent that chooses a move using iterative deepening minimax
     search with alpha-beta pruning. You must finish and test this player to
     make sure it returns a good move before the search time limit expires.
+
+    Parameters
+    ----------
+    tt_size : int (optional)
+        The number of slots in the transposition table.
+
+    move_orderer : move_ordering.MoveOrderer (optional)
+        The strategy used to order moves at each node; defaults to a
+        `KillerHistoryOrderer`.
+
+    stats : search_stats.SearchStats (optional)
+        If given, a record of the depth reached, nodes searched, cutoffs,
+        transposition table hits and time used is added to the collector
+        for every move.
+
+    batch_eval : bool (optional)
+        If True, the children of nodes at the last ply of the search are
+        scored together by the NumPy version of `score_fn` (see
+        batch_eval.py). Requires NumPy and a heuristic listed in
+        `batch_eval.BATCH_SCORES`.
+
+    workers : int (optional)
+        If greater than 1, the root moves are split between this many
+        worker processes, each running its own iterative deepening search
+        until the time limit (see `parallel_search()`).
+
+    book : opening_book.OpeningBook (optional)
+        If given, positions found in the book are played from it without
+        searching.
+
+    endgame : bool (optional)
+        If True, positions in which the players can no longer reach each
+        other are solved exactly instead of searched (see endgame.py).
+
+    ponder : bool (optional)
+        If True, the player keeps searching in a background process while
+        the opponent thinks, on the position after the reply it expects,
+        and plays the result of that search if the reply is played (see
+        `start_ponder()`). This only gains time when a spare CPU core is
+        available.
+
+    selector : selective.UniformDepth (optional)
+        If given, the policy deciding how deep each child of a node is
+        searched, e.g., a `selective.SelectiveDepth` reducing moves ordered
+        late and extending forced lines. By default every child is searched
+        one ply shallower than its parent.
+
+    Attributes
+    ----------
+    clock : time_manager.TimeManager
+        Reads the timer every few nodes, and stops iterative deepening
+        before an iteration that is not expected to finish in time.
     """
 
-    def alphabeta_helper(self, game, depth, alpha, beta):
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=10., tt_size=2 ** 16,
+                 move_orderer=None, stats=None, batch_eval=False, workers=1, book=None,
+                 endgame=True, ponder=False, selector=None):
+        super().__init__(search_depth, score_fn, timeout)
+        self.book = book
+        self.endgame = EndgameSolver() if endgame else None
+        self.workers = workers
+        self.executor = None
+        self.ponder = ponder
+        self.ponder_process = None
+        self.ponder_conn = None
+        self.ponder_deadline = None
+        self.ponder_pending = False
+        self.ponder_key = None
+        self.ponder_hits = 0
+        self.root_score = None
+        self.batch_scorer = None
+        if batch_eval:
+            from batch_eval import BatchScorer
+            self.batch_scorer = BatchScorer(score_fn)
+        self.stats = stats
+        self.clock = TimeManager(timeout)
+        self.nodes = 0
+        self.tt_hits = 0
+        self.tt = TranspositionTable(tt_size)
+        self.tt_salt = 0
+        self.orderer = move_orderer if move_orderer is not None else KillerHistoryOrderer()
+        self.selector = selector
+        self.root_depth = 0
+
+    def __getstate__(self):
+        """Leave the search caches behind when the player is pickled (e.g.,
+        sent to a worker process); the copy starts with an empty table.
+        """
+        state = self.__dict__.copy()
+        state["tt"] = TranspositionTable(self.tt.size)
+        state["time_left"] = None
+        state["executor"] = None
+        state["ponder"] = False
+        state["ponder_process"] = None
+        state["ponder_conn"] = None
+        state["ponder_deadline"] = None
+        state["ponder_pending"] = False
+        return state
+
+    def worker_settings(self):
+        """Return the keyword arguments building, in a worker process of
+        the parallel search, a player searching like this one: its score
+        function and search settings, without the state of its searches.
+        """
+        return {
+            "score_fn": self.score,
+            "timeout": self.TIMER_THRESHOLD,
+            "tt_size": self.tt.size,
+            "move_orderer": type(self.orderer)(),
+            "batch_eval": self.batch_scorer is not None,
+            "endgame": self.endgame is not None,
+            "selector": self.selector,
+        }
+
+    def close(self):
+        """Shut down the worker processes of the parallel search and of
+        pondering, if any.
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.ponder_process is not None:
+            self.ponder_deadline.value = 0.
+            if self.ponder_pending:
+                self.ponder_conn.recv()
+            self.ponder_conn.send(None)
+            self.ponder_process.join()
+            self.ponder_conn.close()
+            self.ponder_process = self.ponder_conn = None
+            self.ponder_pending = False
+
+    def tt_lookup(self, entry, depth, alpha, beta):
+        """Narrow the (alpha, beta) window using a transposition table entry.
+
+        Returns a tuple (value, alpha, beta) where value is the stored value
+        if the entry is deep enough to cut off the search, and None otherwise.
+        """
+        tt_depth, bound, value, _ = entry
+        if tt_depth >= depth:
+            if bound == EXACT:
+                return value, alpha, beta
+            if bound == LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value, alpha, beta
+        return None, alpha, beta
+
+    def tt_save(self, key, depth, alpha, beta, value, move):
+        """Store a search result with the bound implied by the (alpha, beta)
+        window it was searched with. A proven win or loss is exact whatever
+        the window.
+        """
+        if abs(value) == float("inf"):
+            bound = EXACT
+        elif value <= alpha:
+            bound = UPPER
+        elif value >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.tt.store(key, depth, bound, value, move)
+
+    def solve_endgame(self, game):
+        """Solve the position exactly if the players are separated.
+
+        Returns a tuple (value, move) with the value for the player to move
+        and its best move, or None if the position cannot be solved (see
+        `endgame.EndgameSolver.solve()`).
+        """
+        if self.endgame is None:
+            return None
+        return self.endgame.solve(game, self.time_left, self.TIMER_THRESHOLD)
 
-        player = game.active_player
+    def batch_leaves(self, game, legal_moves):
+        """Score every child of a node one ply above the search horizon in a
+        single batch.
 
-        if self.time_left() < self.TIMER_THRESHOLD:
+        Returns a list with the score of each move in `legal_moves` for this
+        player, or None if batch evaluation is disabled or not possible for
+        this position.
+        """
+        if self.batch_scorer is None:
+            return None
+        values = self.batch_scorer(game, legal_moves, self)
+        if values is not None:
+            self.nodes += len(values)
+        return values
+
+    def alphabeta_helper(self, game, depth, alpha, beta, root_moves=None):
+
+        if self.clock.expired(self.time_left):
             raise SearchTimeout()
+        self.nodes += 1
 
-        legal_moves = game.get_legal_moves()
+        if root_moves is None:
+            legal_moves = game.get_legal_moves()
+        else:
+            legal_moves = list(root_moves)
 
-        final_move = (-1, -1)
-        final_score = float('-inf')
+        if not legal_moves:
+            self.root_score = float('-inf')
+            return (-1, -1)
 
         if depth == 0:
+            return (-1, -1)
+
+        # Try the best move of the previous iteration first
+        key = game.hash() ^ self.tt_salt
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            self.tt_hits += 1
+            tt_move = entry[3]
+
+        # A separated endgame is decided by the longest path of each player
+        solution = self.solve_endgame(game) if root_moves is None else None
+        if solution is not None and solution[1] is not None:
+            self.root_score, final_move = solution
+            self.tt.store(key, depth, EXACT, self.root_score, final_move)
             return final_move
 
-        for move in legal_moves:
-            score = self.alphabeta_min_value(game.forecast_move(move), depth - 1, float(alpha), float(beta))
+        legal_moves = self.orderer.order(legal_moves, 0, tt_move, 0)
+
+        # Play on with the first move rather than forfeit when every move
+        # loses
+        final_move = legal_moves[0]
+        final_score = float('-inf')
+        window = (alpha, beta)
+        for index, move in enumerate(legal_moves):
+            game.push_move(move)
+            try:
+                score = self.pvs_child(game, depth, alpha, beta, index, 1)
+            finally:
+                game.pop_move()
             if score > final_score:
                 final_score = score
                 final_move = move
 
             if final_score >= beta:
-                return final_move
+                self.orderer.cutoff(move, 0, depth, index, 0)
+                break
 
             alpha = max(alpha, final_score)
 
+        self.tt_save(key, depth, window[0], window[1], final_score, final_move)
+        self.root_score = final_score
         return final_move
 
-    def alphabeta_min_value(self, game, depth, alpha, beta):
-
-        player = game.active_player
-
-        if self.time_left() < self.TIMER_THRESHOLD:
-            raise SearchTimeout()
-
-        legal_moves = game.get_legal_moves()
-
-        if len(legal_moves) == 0:
-            return self.score(game, self)
+    def pvs_child(self, game, depth, alpha, beta, index, ply):
+        """Return the value, for the player to move at the parent, of the
+        child just pushed on the board, at distance `ply` from the root.
 
-        if depth == 0:
-            return self.score(game, self)
-
-        final_score = float('+inf')
-
-        for move in legal_moves:
-            score = self.alphabeta_max_value(game.forecast_move(move), depth - 1, float(alpha), float(beta))
-            if score < final_score:
-                final_score = score
+        The first child of a node is searched with the full window. Later
+        children are expected to be worse, so they are only tested with a
+        null window just above alpha, and searched again with the full window
+        if the test shows that they are better (principal variation search).
 
-            if final_score <= alpha:
-                return final_score
-            beta = min(beta, final_score)
-
-        return final_score
-
-    def alphabeta_max_value(self, game, depth, alpha, beta):
-
-        player = game.active_player
-
-        if self.time_left() < self.TIMER_THRESHOLD:
+        The selector, if any, may extend the child or reduce a later one;
+        a reduced child that beats alpha is searched again at full depth
+        (see `selective.UniformDepth.verify`).
+        """
+        child_depth = depth - 1
+        reduction = 0
+        full_window = index == 0 or alpha == float("-inf")
+        if self.selector is not None:
+            # Only moves tested with a null window can be reduced
+            child_depth, reduction = self.selector.child_depth(
+                game, depth, 0 if full_window else index, ply, self.root_depth)
+        if full_window:
+            return -self.negamax(game, child_depth, -beta, -alpha, ply)
+        score = -self.negamax(game, child_depth, -alpha - NULL_WINDOW, -alpha, ply)
+        if reduction and score > alpha:
+            child_depth += reduction
+            self.selector.re_searches += 1
+            if not self.selector.verify:
+                return -self.negamax(game, child_depth, -beta, -alpha, ply)
+            score = -self.negamax(game, child_depth, -alpha - NULL_WINDOW, -alpha, ply)
+        if alpha < score < beta:
+            score = -self.negamax(game, child_depth, -beta, -alpha, ply)
+        return score
+
+    def negamax(self, game, depth, alpha, beta, ply):
+        """Fail-soft alpha-beta search returning the value of the position
+        for the player to move, i.e., the score for this player at the nodes
+        where it is to move and the negated score at the others. `ply` is
+        the distance of the position from the root of the search.
+        """
+        if self.clock.expired(self.time_left):
             raise SearchTimeout()
+        self.nodes += 1
 
         legal_moves = game.get_legal_moves()
+        color = 1 if game.active_player == self else -1
 
-        if len(legal_moves) == 0:
-            return self.score(game, self)
-
-        if depth == 0:
-            return self.score(game, self)
-
+        if len(legal_moves) == 0 or depth == 0:
+            return color * self.score(game, self)
+
+        key = game.hash() ^ self.tt_salt
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            value, alpha, beta = self.tt_lookup(entry, depth, alpha, beta)
+            self.tt_hits += 1
+            if value is not None:
+                return value
+            tt_move = entry[3]
+
+        solution = self.solve_endgame(game)
+        if solution is not None:
+            self.tt.store(key, depth, EXACT, solution[0], solution[1])
+            return solution[0]
+
+        window = (alpha, beta)
+        final_move = None
         final_score = float('-inf')
 
-        for move in legal_moves:
-            score = self.alphabeta_min_value(game.forecast_move(move), depth - 1, float(alpha), float(beta))
+        values = self.batch_leaves(game, legal_moves) if depth == 1 else None
+        if values is not None:
+            for move, value in zip(legal_moves, values):
+                if color * value > final_score:
+                    final_score = color * value
+                    final_move = move
+            self.tt_save(key, depth, window[0], window[1], final_score, final_move)
+            return final_score
+
+        side = 0 if color == 1 else 1
+        legal_moves = self.orderer.order(legal_moves, ply, tt_move, side)
+        for index, move in enumerate(legal_moves):
+            game.push_move(move)
+            try:
+                score = self.pvs_child(game, depth, alpha, beta, index, ply + 1)
+            finally:
+                game.pop_move()
             if score > final_score:
                 final_score = score
+                final_move = move
 
             if final_score >= beta:
-                return final_score
+                self.orderer.cutoff(move, ply, depth, index, side)
+                break
             alpha = max(alpha, final_score)
 
+        self.tt_save(key, depth, window[0], window[1], final_score, final_move)
         return final_score
 
+    def aspiration_search(self, game, depth, root_moves=None):
+        """Search to the given depth with a narrow window centred on the
+        score of the previous iteration, widening the side of the window
+        that the search fails on until the score falls inside it.
+        """
+        previous = self.root_score
+        if depth == 1 or previous is None or abs(previous) == float("inf"):
+            return self.alphabeta(game, depth, root_moves=root_moves)
+
+        alpha = previous - ASPIRATION_WINDOW
+        beta = previous + ASPIRATION_WINDOW
+        while True:
+            move = self.alphabeta(game, depth, alpha, beta, root_moves)
+            if self.root_score <= alpha and alpha > float("-inf"):
+                alpha = float("-inf")
+            elif self.root_score >= beta and beta < float("inf"):
+                beta = float("inf")
+            else:
+                return move
+
     def get_move(self, game, time_left):
         """Search for the best move from the available legal moves and return a
         result before the time limit expires.
@@ -525,10 +833,54 @@ class AlphaBetaPlayer(IsolationPlayer):
             (-1, -1) if there are no available legal moves.
         """
         self.time_left = time_left
+        if not self.ponder:
+            return self.search(game, time_left)
+
+        turn = time_left()
+        if self.ponder_process is None:
+            # Start the process now, so that starting it is not charged to
+            # the time left after the search
+            self.ponder_deadline = multiprocessing.RawValue("d", 0.)
+            self.ponder_conn, child_conn = multiprocessing.Pipe()
+            self.ponder_process = multiprocessing.Process(
+                target=ponder_worker, args=(child_conn, self.ponder_deadline, self), daemon=True)
+            self.ponder_process.start()
+        move = self.ponder_result(game, time_left)
+        if move is None:
+            move = self.search(game, time_left)
+        # There is nothing to ponder after a lost game's last turn or a
+        # search that timed out before completing any iteration
+        if move != (-1, -1) and game.move_is_legal(move):
+            self.start_ponder(game, move, 2 * turn)
+        return move
+
+    def search(self, game, time_left):
+        """Choose a move from the opening book or by search, as described
+        in `get_move()`.
+        """
+        self.time_left = time_left
+        if self.book is not None:
+            book_move = self.book.lookup(game)
+            if book_move is not None:
+                return book_move
+        if self.workers > 1:
+            return self.parallel_search(game, time_left)
 
         # Initialize the best move so that this function returns something
         # in case the search fails due to timeout
         best_move = (-1, -1)
+        aborted = False
+        self.clock.start(time_left)
+        self.orderer.new_search()
+        if self.selector is not None:
+            self.selector.new_search()
+        if self.endgame is not None:
+            self.endgame.new_search()
+        self.nodes = self.tt_hits = 0
+        self.root_score = None
+        cutoffs = self.orderer.cutoffs
+        if self.stats is not None:
+            self.stats.begin(time_left())
 
         try:
             # The try/except block will automatically catch the exception
@@ -537,14 +889,222 @@ class AlphaBetaPlayer(IsolationPlayer):
             depth = 0
             while True:
                 depth += 1
-                best_move = self.alphabeta(game, depth)
+                best_move = self.aspiration_search(game, depth)
+                self.clock.iteration_done()
+                if self.stats is not None:
+                    self.stats.depth_done(depth, time_left())
+                # A proven win or loss cannot change at greater depths
+                if abs(self.root_score) == float("inf"):
+                    break
+                if not self.clock.can_start_next():
+                    break
         except SearchTimeout:
-            pass  # Handle any actions required after timeout as needed
+            aborted = True  # Handle any actions required after timeout as needed
+
+        if self.stats is not None:
+            self.stats.end(time_left(), self.nodes, self.orderer.cutoffs - cutoffs,
+                           self.tt_hits, aborted,
+                           self.selector.stats() if self.selector is not None else None)
 
         # Return the best move from the last completed search iteration
         return best_move
 
-    def alphabeta(self, game, depth, alpha=float("-inf"), beta=float("inf")):
+    def predict_reply(self, game):
+        """Return the move the opponent is expected to play in `game`: the
+        best move stored for the position by the last search, or else the
+        move leaving this player the lowest score.
+        """
+        entry = self.tt.probe(game.hash() ^ self.tt_salt)
+        if entry is not None and entry[3] is not None and game.move_is_legal(entry[3]):
+            return entry[3]
+        return min(game.get_legal_moves(),
+                   key=lambda move: self.score(game.forecast_move(move), self))
+
+    def start_ponder(self, game, move, limit):
+        """Start searching, in the ponder process, the position reached
+        when `move` is played in `game` and the opponent replies as
+        predicted by `predict_reply()`.
+
+        The search runs until the next call to get_move(), which stops it
+        if the opponent played another move, and otherwise lets it go on
+        until the time limit of that move (see `ponder_result()`). It is
+        stopped anyway after `limit` milliseconds, in case the game ends.
+        """
+        if self.ponder_pending:
+            if not self.ponder_conn.poll(self.clock.check_ms / 1000.):
+                # The previous search has not stopped yet
+                return
+            self.ponder_conn.recv()
+            self.ponder_pending = False
+        board = game.forecast_move(move)
+        if not board.get_legal_moves():
+            return
+        board.apply_move(self.predict_reply(board))
+        if not board.get_legal_moves():
+            return
+
+        self.ponder_key = board.hash()
+        board = board.replace_player(self, SEARCHER)
+        board = board.replace_player(board.get_opponent(SEARCHER), OPPONENT)
+        self.ponder_deadline.value = time.monotonic() + limit / 1000.
+        self.ponder_conn.send(board)
+        self.ponder_pending = True
+
+    def ponder_result(self, game, time_left):
+        """Collect the search started by `start_ponder()` for the previous
+        move.
+
+        If the opponent played the predicted reply, the search goes on until
+        TIMER_THRESHOLD milliseconds before the end of this move, and the
+        best move of its deepest completed iteration is returned. Otherwise
+        the search is stopped and None is returned.
+        """
+        if not self.ponder_pending:
+            return None
+        if game.hash() != self.ponder_key:
+            # Give the stopped search a moment to hand back the processor
+            # and its results (about a millisecond when it shares a core
+            # with the game), so that the next ponder can start after this
+            # move (see `start_ponder()`)
+            self.ponder_deadline.value = 0.
+            if self.ponder_conn.poll(self.TIMER_THRESHOLD / 2000.):
+                self.ponder_conn.recv()
+                self.ponder_pending = False
+            return None
+
+        if self.stats is not None:
+            self.stats.begin(time_left())
+        budget = time_left() - 2 * self.TIMER_THRESHOLD
+        self.ponder_deadline.value = time.monotonic() + budget / 1000.
+        if not self.ponder_conn.poll(max(0., (time_left() - self.TIMER_THRESHOLD) / 1000.)):
+            self.ponder_deadline.value = 0.
+            return None
+        results, nodes = self.ponder_conn.recv()
+        self.ponder_pending = False
+        if not results or results[-1][1] == (-1, -1):
+            return None
+
+        depth, move, self.root_score = results[-1]
+        self.ponder_hits += 1
+        if self.stats is not None:
+            self.stats.depth_done(depth, time_left())
+            self.stats.end(time_left(), nodes, aborted=abs(self.root_score) != float("inf"))
+        return move
+
+    def search_root_moves(self, game, time_left, root_moves):
+        """Run iterative deepening over a subset of the root moves until the
+        search is decided or the time runs out.
+
+        Returns
+        -------
+        list<(int, (int, int), float)>
+            The depth, best move and score of every completed iteration.
+        """
+        self.time_left = time_left
+        self.clock.start(time_left)
+        self.orderer.new_search()
+        if self.selector is not None:
+            self.selector.new_search()
+        if self.endgame is not None:
+            self.endgame.new_search()
+        self.nodes = self.tt_hits = 0
+        self.root_score = None
+        results = []
+        try:
+            depth = 0
+            while True:
+                depth += 1
+                move = self.aspiration_search(game, depth, root_moves)
+                results.append((depth, move, self.root_score))
+                self.clock.iteration_done()
+                if abs(self.root_score) == float("inf") or not self.clock.can_start_next():
+                    break
+        except SearchTimeout:
+            pass
+        return results
+
+    def parallel_search(self, game, time_left):
+        """Split the root moves between worker processes that each search
+        their share with iterative deepening until a shared deadline, then
+        pick the best move of the deepest iteration every worker completed.
+        Workers that proved a win or a loss for all their moves stopped
+        early; they are ranked by their proven value instead.
+
+        The workers cannot call `time_left`, so it is converted to a
+        deadline on the system-wide monotonic clock, set TIMER_THRESHOLD
+        milliseconds early to leave time for collecting the results. Each
+        worker process builds its player once, from `worker_settings()`, so
+        only the position is sent with every move.
+        """
+        legal_moves = game.get_legal_moves()
+        if not legal_moves:
+            return (-1, -1)
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers, initializer=init_search_worker,
+                                                initargs=(self.worker_settings(),))
+        if self.stats is not None:
+            self.stats.begin(time_left())
+
+        board = game.replace_player(self, SEARCHER)
+        board = board.replace_player(board.get_opponent(SEARCHER), OPPONENT)
+        budget = time_left() - 2 * self.TIMER_THRESHOLD
+        deadline = time.monotonic() + budget / 1000.
+        shares = [legal_moves[i::self.workers] for i in range(min(self.workers, len(legal_moves)))]
+        futures = [self.executor.submit(search_root_worker, board, share, deadline)
+                   for share in shares]
+        done, _ = wait(futures, timeout=max(0., (time_left() - self.TIMER_THRESHOLD) / 1000.))
+        finished = [future.result() for future in futures if future in done]
+        for future in futures:
+            future.cancel()
+
+        results = [worker_results for worker_results, _ in finished if worker_results]
+        nodes = sum(worker_nodes for _, worker_nodes in finished)
+        depth, best_move = self.merge_worker_results(results)
+        if best_move is None:
+            best_move = legal_moves[0]
+
+        if self.stats is not None:
+            if depth:
+                self.stats.depth_done(depth, time_left())
+            self.stats.end(time_left(), nodes, aborted=True)
+        return best_move
+
+    @staticmethod
+    def merge_worker_results(results):
+        """Pick the best move among the results of the parallel workers.
+
+        Scores are only comparable between iterations of equal depth, so the
+        best moves of the deepest iteration every worker completed are
+        compared. A worker that proved a win or a loss for all its moves
+        stopped early; its proven value is compared instead, and its depth
+        does not limit the others.
+
+        Parameters
+        ----------
+        results : list<list<(int, (int, int), float)>>
+            The non-empty results of `search_root_moves()` of every worker.
+
+        Returns
+        -------
+        (int, (int, int))
+            The depth of the compared iterations (0 if there are no
+            results), and the best move, or None if every move loses.
+        """
+        if not results:
+            return 0, None
+        proven = [abs(worker_results[-1][2]) == float("inf") for worker_results in results]
+        depth = min([worker_results[-1][0] for worker_results, decided in zip(results, proven)
+                     if not decided] or
+                    [max(worker_results[-1][0] for worker_results in results)])
+        best_move = None
+        best_score = float("-inf")
+        for worker_results, decided in zip(results, proven):
+            _, move, score = worker_results[-1 if decided else depth - 1]
+            if score > best_score and move != (-1, -1):
+                best_move, best_score = move, score
+        return depth, best_move
+
+    def alphabeta(self, game, depth, alpha=float("-inf"), beta=float("inf"), root_moves=None):
         """Implement depth-limited minimax search with alpha-beta pruning as
         described in the lectures.
 
@@ -572,6 +1132,9 @@ class AlphaBetaPlayer(IsolationPlayer):
         beta : float
             Beta limits the upper bound of search on maximizing layers
 
+        root_moves : list<(int, int)> (optional)
+            If given, only these moves are searched at the root
+
         Returns
         -------
         (int, int)
@@ -592,4 +1155,89 @@ class AlphaBetaPlayer(IsolationPlayer):
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
 
-        return self.alphabeta_helper(game, depth, alpha, beta)
+        # Stored values are scored from this player's point of view, so keep
+        # the entries made as player 1 apart from those made as player 2
+        self.tt_salt = PLAYER_2_SALT if game.move_count % 2 else 0
+        self.root_depth = depth
+
+        return self.alphabeta_helper(game, depth, alpha, beta, root_moves)
+
+
+def ponder_worker(conn, deadline, player):
+    """Main loop of the ponder process of a player.
+
+    Each position received on the connection is searched until the shared
+    deadline, and the results are sent back. The same copy of the player
+    searches every position, so its transposition table stays warm from
+    one move to the next and only the positions have to be sent. A plain
+    pipe is used rather than an executor, whose result handling thread
+    would compete with the game for the interpreter in the parent process.
+
+    Parameters
+    ----------
+    conn : `multiprocessing.connection.Connection`
+        Receives the positions to search, with the players replaced by
+        SEARCHER and OPPONENT, or None to stop the process. The results of
+        `AlphaBetaPlayer.search_root_moves()` and the number of nodes
+        visited are sent back for each position.
+
+    deadline : `multiprocessing.RawValue`
+        The `time.monotonic()` value at which the current search must stop.
+
+    player : AlphaBetaPlayer
+        A copy of the pondering player.
+    """
+    try:
+        os.nice(PONDER_NICENESS)
+    except (AttributeError, OSError):
+        pass
+    time_left = lambda: 1000. * (deadline.value - time.monotonic())
+    while True:
+        game = conn.recv()
+        if game is None:
+            break
+        game = game.replace_player(SEARCHER, player)
+        results = player.search_root_moves(game, time_left, None)
+        conn.send((results, player.nodes))
+
+
+# The player of a worker process of the parallel search
+_worker_player = None
+
+
+def init_search_worker(settings):
+    """Build the player of a worker process of the parallel search from the
+    keyword arguments given by `AlphaBetaPlayer.worker_settings()`. The same
+    player searches every move, so its transposition table stays warm.
+    """
+    global _worker_player
+    _worker_player = AlphaBetaPlayer(**settings)
+
+
+def search_root_worker(game, root_moves, deadline):
+    """Search a share of the root moves in a worker process set up by
+    `init_search_worker()`.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The root position, with the players replaced by SEARCHER and
+        OPPONENT.
+
+    root_moves : list<(int, int)>
+        The root moves assigned to this worker.
+
+    deadline : float
+        The `time.monotonic()` value at which the search must stop.
+
+    Returns
+    -------
+    (list, int)
+        The results of `AlphaBetaPlayer.search_root_moves()` and the number
+        of nodes visited.
+    """
+    player = _worker_player
+    game = game.replace_player(SEARCHER, player)
+    time_left = lambda: 1000. * (deadline - time.monotonic())
+    results = player.search_root_moves(game, time_left, root_moves)
+    return results, player.nodes
@@ -0,0 +1,135 @@
+"""
+This file contains lookup tables describing the fixed geometry of an
+Isolation board (cell coordinates, knight-move neighbours, and the positional
+terms used by the heuristics in game_agent.py and sample_players.py).  The
+tables only depend on the board dimensions, so they are computed once per
+(width, height) pair and shared by every board of that size.
+
+Cells are indexed in the same column-major order used by `isolation.Board`,
+i.e., the cell at (row, column) has index `row + column * height`.
+"""
+from functools import lru_cache
+
+# Knight move offsets (row, column), in the order used by Board.__get_moves
+DIRECTIONS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2),
+              (1, -2), (1, 2), (2, -1), (2, 1))
+
+# Board layers used by positional heuristics
+INNER = 0
+MIDDLE = 1
+OUTER = 2
+
+
+class Geometry(object):
+    """Precomputed per-cell tables for a board of the specified size.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns on the board.
+
+    height : int
+        The number of rows on the board.
+
+    Attributes
+    ----------
+    size : int
+        The number of cells on the board.
+
+    full_mask : int
+        A bitmask with one bit set for every cell on the board.
+
+    coords : tuple<(int, int)>
+        The (row, column) coordinate pair of each cell index.
+
+    knight_moves : tuple<tuple<int>>
+        The indices of the cells a knight can reach from each cell index.
+
+    knight_masks : tuple<int>
+        The cells in `knight_moves` encoded as a bitmask for each cell index.
+
+    layer : tuple<int>
+        INNER for the center cell, OUTER for cells on the edge of the board
+        and MIDDLE for every other cell index.
+
+    center_distance : tuple<float>
+        The squared euclidean distance from the center of the board,
+        (height / 2 - row)**2 + (width / 2 - column)**2, of each cell index.
+
+    symmetries : tuple<tuple<int>>
+        The symmetries of the board as permutations of the cell indices,
+        i.e., symmetries[t][idx] is the image of cell idx under transform t.
+        Transform 0 is the identity. Square boards have 8 symmetries
+        (rotations and reflections); other boards have 4.
+
+    inverse_symmetries : tuple<tuple<int>>
+        The inverse permutation of each transform in `symmetries`.
+    """
+
+    def __init__(self, width, height):
+        self.size = width * height
+        self.full_mask = (1 << self.size) - 1
+        self.coords = tuple((idx % height, idx // height)
+                            for idx in range(self.size))
+        self.knight_moves = tuple(
+            tuple((r + dr) + (c + dc) * height for dr, dc in DIRECTIONS
+                  if 0 <= r + dr < height and 0 <= c + dc < width)
+            for r, c in self.coords)
+        self.knight_masks = tuple(sum(1 << n for n in neighbours)
+                                  for neighbours in self.knight_moves)
+        self.layer = tuple(
+            INNER if (r, c) == (height // 2, width // 2) else
+            OUTER if r in (0, height - 1) or c in (0, width - 1) else
+            MIDDLE for r, c in self.coords)
+        self.center_distance = tuple(
+            float((height / 2. - r) ** 2 + (width / 2. - c) ** 2)
+            for r, c in self.coords)
+        self.symmetries = tuple(
+            tuple(r + c * height for r, c in (transform(r, c) for r, c in self.coords))
+            for transform in _transforms(width, height))
+        self.inverse_symmetries = tuple(
+            tuple(sorted(range(self.size), key=perm.__getitem__))
+            for perm in self.symmetries)
+        self._layer_weights = {}
+
+    def layer_weights(self, weights):
+        """Return the weight of each cell index for the given per-layer
+        weights.
+
+        Parameters
+        ----------
+        weights : (float, float, float)
+            The weight of cells in the inner, middle and outer layers.
+
+        Returns
+        -------
+        tuple<float>
+            The weight of the layer containing each cell index. The table is
+            cached, so repeated calls with the same weights are O(1).
+        """
+        table = self._layer_weights.get(weights)
+        if table is None:
+            table = tuple(weights[layer] for layer in self.layer)
+            self._layer_weights[weights] = table
+        return table
+
+
+def _transforms(width, height):
+    """Return the (row, column) mappings of the symmetries of the board. """
+    h, w = height - 1, width - 1
+    transforms = [lambda r, c: (r, c),
+                  lambda r, c: (r, w - c),
+                  lambda r, c: (h - r, c),
+                  lambda r, c: (h - r, w - c)]
+    if width == height:
+        transforms += [lambda r, c: (c, r),
+                       lambda r, c: (c, h - r),
+                       lambda r, c: (w - c, r),
+                       lambda r, c: (w - c, h - r)]
+    return transforms
+
+
+@lru_cache(maxsize=None)
+def get_geometry(width, height):
+    """Return the shared `Geometry` instance for a board of the given size. """
+    return Geometry(width, height)
@@ -8,9 +8,13 @@ remain compatible with the defaults provided, and none of your changes will
 be available to project reviewers.
 """
 import random
+import time
 import timeit
 from copy import copy
 
+from .geometry import get_geometry
+from .zobrist import get_zobrist_keys
+
 TIME_LIMIT_MILLIS = 150
 
 
@@ -33,11 +37,21 @@ class Board(object):
 
     height : int (optional)
         The number of rows that the board should have.
+
+    seed : int (optional)
+        Seed for a random number generator owned by the board (and shared by
+        its copies) that is used to shuffle legal moves. If None, the global
+        `random` module is used.
+
+    shuffle : bool (optional)
+        If False, legal moves are always returned in the same fixed order
+        instead of being shuffled, which makes move generation cheaper and
+        searches reproducible.
     """
     BLANK = 0
     NOT_MOVED = None
 
-    def __init__(self, player_1, player_2, width=7, height=7):
+    def __init__(self, player_1, player_2, width=7, height=7, seed=None, shuffle=True):
         self.width = width
         self.height = height
         self.move_count = 0
@@ -52,8 +66,91 @@ class Board(object):
         self._board_state[-1] = Board.NOT_MOVED
         self._board_state[-2] = Board.NOT_MOVED
 
+        self._shuffle = shuffle
+        self._rng = random.Random(seed) if seed is not None else None
+
+        # Zobrist key of the current position, updated on every move
+        self._zobrist = get_zobrist_keys(width, height)
+        self._hash = 0
+
+        # Undo records (cell index, previous location of the mover) for
+        # each move applied with push_move()
+        self._undo_stack = []
+
+        # Legal moves of player 1 and player 2 in the current position,
+        # generated on first use and discarded whenever the position changes
+        self._moves_cache = [None, None]
+
     def hash(self):
-        return str(self._board_state).__hash__()
+        return self._hash
+
+    def canonical_hash(self):
+        """Find the canonical representative of the current position among
+        its images under the symmetries of the board.
+
+        Symmetric positions have the same game value, and the best moves of
+        one are the images of the best moves of the other, so tables keyed
+        on the canonical key (opening books, transposition tables or
+        evaluation caches) can share one entry between up to 8 positions.
+
+        Returns
+        -------
+        (int, int)
+            The smallest Zobrist key among the images of the position, and
+            the index of the transform in `Geometry.symmetries` that maps
+            the position onto the image with that key. Moves are converted
+            between the two frames with `canonical_move()` and
+            `original_move()`.
+        """
+        symmetries = get_geometry(self.width, self.height).symmetries
+        return self._zobrist.canonical(symmetries, *self._position_indices())
+
+    def canonical_move(self, move, transform):
+        """Return the image of a move under a transform of the board, i.e.,
+        the move of the canonical position returned by `canonical_hash()`
+        that corresponds to `move` in the current position.
+        """
+        geometry = get_geometry(self.width, self.height)
+        return geometry.coords[geometry.symmetries[transform][move[0] + move[1] * self.height]]
+
+    def original_move(self, move, transform):
+        """Return the move of the current position that corresponds to a
+        move of its image under a transform of the board; the inverse of
+        `canonical_move()`.
+        """
+        geometry = get_geometry(self.width, self.height)
+        return geometry.coords[
+            geometry.inverse_symmetries[transform][move[0] + move[1] * self.height]]
+
+    def symmetric_copy(self, transform):
+        """Return a copy of the board with the position mapped by one of the
+        symmetries of the board.
+
+        Parameters
+        ----------
+        transform : int
+            The index of the transform in `Geometry.symmetries`, e.g., as
+            returned by `canonical_hash()`.
+
+        Returns
+        -------
+        isolation.Board
+            A board with the same players, initiative and move count, whose
+            blocked cells and player locations are the images of those of
+            this board.
+        """
+        perm = get_geometry(self.width, self.height).symmetries[transform]
+        new_board = self.copy()
+        state = self._board_state
+        new_state = new_board._board_state
+        for idx in range(self.width * self.height):
+            new_state[perm[idx]] = state[idx]
+        for slot in (-1, -2):
+            if state[slot] != Board.NOT_MOVED:
+                new_state[slot] = perm[state[slot]]
+        blocked, loc_1, loc_2, side = new_board._position_indices()
+        new_board._hash = self._zobrist.compute(blocked, loc_1, loc_2, side)
+        return new_board
 
     @property
     def active_player(self):
@@ -92,11 +189,14 @@ class Board(object):
 
     def copy(self):
         """ Return a deep copy of the current board. """
-        new_board = Board(self._player_1, self._player_2, width=self.width, height=self.height)
+        new_board = Board(self._player_1, self._player_2, width=self.width, height=self.height,
+                          shuffle=self._shuffle)
+        new_board._rng = self._rng
         new_board.move_count = self.move_count
         new_board._active_player = self._active_player
         new_board._inactive_player = self._inactive_player
         new_board._board_state = copy(self._board_state)
+        new_board._hash = self._hash
         return new_board
 
     def forecast_move(self, move):
@@ -118,6 +218,39 @@ class Board(object):
         new_board.apply_move(move)
         return new_board
 
+    def replace_player(self, player, substitute):
+        """Return a copy of the current game with one of the players replaced
+        by another object, e.g., to send the position to a worker process
+        without the (possibly unpicklable) player objects.
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        substitute : object
+            The object taking the place of `player` in the copy.
+
+        Returns
+        -------
+        isolation.Board
+            A copy of the board in which `substitute` holds the seat, the
+            location and the initiative (if any) of `player`.
+        """
+        new_board = self.copy()
+        if player == self._player_1:
+            new_board._player_1 = substitute
+        elif player == self._player_2:
+            new_board._player_2 = substitute
+        else:
+            raise RuntimeError(
+                "Invalid player in replace_player: {}".format(player))
+        if player == self._active_player:
+            new_board._active_player = substitute
+        else:
+            new_board._inactive_player = substitute
+        return new_board
+
     def move_is_legal(self, move):
         """Test whether a move is legal in the current game state.
 
@@ -142,6 +275,13 @@ class Board(object):
         return [(i, j) for j in range(self.width) for i in range(self.height)
                 if self._board_state[i + j * self.height] == Board.BLANK]
 
+    def get_blank_mask(self):
+        """Return the blank cells as an integer bitmask, with bit
+        `row + column * height` set for every blank cell.
+        """
+        return sum(1 << idx for idx in range(self.width * self.height)
+                   if self._board_state[idx] == Board.BLANK)
+
     def get_player_location(self, player):
         """Find the current location of the specified player on the board.
 
@@ -188,7 +328,50 @@ class Board(object):
         """
         if player is None:
             player = self.active_player
-        return self.__get_moves(self.get_player_location(player))
+        return list(self.__cached_moves(player))
+
+    def mobility(self, player=None):
+        """Return the number of legal moves for the specified player.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the number of legal moves for the active player.
+
+        Returns
+        -------
+        int
+            The length of the list `get_legal_moves(player)` would return.
+        """
+        if player is None:
+            player = self._active_player
+        return len(self.__cached_moves(player))
+
+    def outcome_and_mobility(self, player):
+        """Return the utility of the current game state and the number of
+        legal moves of both players, generating each player's moves at most
+        once.
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        -------
+        (float, int, int)
+            `utility(player)`, `mobility(player)` and the mobility of the
+            opponent of `player`.
+        """
+        own = self.mobility(player)
+        opp = self.mobility(self.get_opponent(player))
+        active = own if player == self._active_player else opp
+        if active:
+            return 0., own, opp
+        if player == self._active_player:
+            return float("-inf"), own, opp
+        return float("inf"), own, opp
 
     def apply_move(self, move):
         """Move the active player to a specified location.
@@ -201,19 +384,57 @@ class Board(object):
         """
         idx = move[0] + move[1] * self.height
         last_move_idx = int(self.active_player == self._player_2) + 1
+        self._hash ^= self._zobrist.move_key(last_move_idx - 1, idx,
+                                             self._board_state[-last_move_idx])
         self._board_state[-last_move_idx] = idx
         self._board_state[idx] = 1
         self._board_state[-3] ^= 1
         self._active_player, self._inactive_player = self._inactive_player, self._active_player
         self.move_count += 1
+        self._moves_cache = [None, None]
+
+    def push_move(self, move):
+        """Move the active player to a specified location in-place, recording
+        the information needed to take the move back with `pop_move()`.
+
+        Searching with push_move()/pop_move() pairs avoids allocating a new
+        board for every node, unlike `forecast_move()`.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        last_move_idx = int(self._active_player == self._player_2) + 1
+        self._undo_stack.append((move[0] + move[1] * self.height,
+                                 self._board_state[-last_move_idx]))
+        self.apply_move(move)
+
+    def pop_move(self):
+        """Undo the most recent move applied with `push_move()`, restoring
+        the board to the state it had before that move.
+        """
+        try:
+            idx, last_loc = self._undo_stack.pop()
+        except IndexError:
+            raise RuntimeError("pop_move() called without a matching push_move()")
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count -= 1
+        last_move_idx = int(self._active_player == self._player_2) + 1
+        self._board_state[-last_move_idx] = last_loc
+        self._board_state[idx] = Board.BLANK
+        self._board_state[-3] ^= 1
+        self._hash ^= self._zobrist.move_key(last_move_idx - 1, idx, last_loc)
+        self._moves_cache = [None, None]
 
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
-        return player == self._inactive_player and not self.get_legal_moves(self._active_player)
+        return player == self._inactive_player and not self.mobility(self._active_player)
 
     def is_loser(self, player):
         """ Test whether the specified player has lost the game. """
-        return player == self._active_player and not self.get_legal_moves(self._active_player)
+        return player == self._active_player and not self.mobility(self._active_player)
 
     def utility(self, player):
         """Returns the utility of the current game state from the perspective
@@ -237,7 +458,7 @@ class Board(object):
             a value of -inf if the player has lost, and a value of 0
             otherwise.
         """
-        if not self.get_legal_moves(self._active_player):
+        if not self.mobility(self._active_player):
 
             if player == self._inactive_player:
                 return float("inf")
@@ -247,6 +468,32 @@ class Board(object):
 
         return 0.
 
+    def _position_indices(self):
+        """Return the hashed features of the position: the list of blocked
+        cell indices, the cell index of each player (None if it has not
+        moved) and the side to move (0 for player 1, 1 for player 2).
+        """
+        state = self._board_state
+        blocked = [idx for idx in range(self.width * self.height) if state[idx] != Board.BLANK]
+        return blocked, state[-1], state[-2], state[-3]
+
+    def __cached_moves(self, player):
+        """Return the cached list of legal moves for the specified player,
+        generating it if needed. The list must not be modified.
+        """
+        if player == self._player_1:
+            slot = 0
+        elif player == self._player_2:
+            slot = 1
+        else:
+            raise RuntimeError(
+                "Invalid player in get_legal_moves: {}".format(player))
+        moves = self._moves_cache[slot]
+        if moves is None:
+            moves = self.__get_moves(self.get_player_location(player))
+            self._moves_cache[slot] = moves
+        return moves
+
     def __get_moves(self, loc):
         """Generate the list of possible moves for an L-shaped motion (like a
         knight in chess).
@@ -259,7 +506,8 @@ class Board(object):
                       (1, -2), (1, 2), (2, -1), (2, 1)]
         valid_moves = [(r + dr, c + dc) for dr, dc in directions
                        if self.move_is_legal((r + dr, c + dc))]
-        random.shuffle(valid_moves)
+        if self._shuffle:
+            (self._rng or random).shuffle(valid_moves)
         return valid_moves
 
     def print_board(self):
@@ -295,7 +543,7 @@ class Board(object):
 
         return out
 
-    def play(self, time_limit=TIME_LIMIT_MILLIS):
+    def play(self, time_limit=TIME_LIMIT_MILLIS, timings=None):
         """Execute a match between the players by alternately soliciting them
         to select a move and applying it in the game.
 
@@ -305,6 +553,13 @@ class Board(object):
             The maximum number of milliseconds to allow before timeout
             during each turn.
 
+        timings : list (optional)
+            If given, a (seat, wall, cpu) tuple is appended to it for every
+            call to get_move(): 0 if the player holding the initiative when
+            play() was called moved and 1 otherwise, and the wall-clock and
+            CPU milliseconds the call took. CPU time is that of the whole
+            process, so it includes any threads of the player.
+
         Returns
         ----------
         (player, list<[(int, int),]>, str)
@@ -313,6 +568,7 @@ class Board(object):
             (e.g., timeout or invalid move).
         """
         move_history = []
+        first_move = self.move_count
 
         time_millis = lambda: 1000 * timeit.default_timer()
 
@@ -321,10 +577,14 @@ class Board(object):
             legal_player_moves = self.get_legal_moves()
             game_copy = self.copy()
 
+            cpu_start = time.process_time() if timings is not None else 0.
             move_start = time_millis()
             time_left = lambda : time_limit - (time_millis() - move_start)
             curr_move = self._active_player.get_move(game_copy, time_left)
             move_end = time_left()
+            if timings is not None:
+                timings.append(((self.move_count - first_move) % 2, time_limit - move_end,
+                                1000 * (time.process_time() - cpu_start)))
 
             if curr_move is None:
                 curr_move = Board.NOT_MOVED
@@ -0,0 +1,334 @@
+"""
+This file contains the `SparseBoard` class, a drop-in replacement for
+`isolation.Board` intended for large boards (e.g., 15x15 or 25x25).
+
+Only the visited cells are stored, in a set, so the cost of copying a board
+grows with the number of moves played rather than with the area of the
+board.  Legal moves are read from the knight-move neighbour table of the
+player's cell (see `isolation.geometry`), and the number of blank cells is
+known without scanning the board, so every operation except listing the
+blank cells themselves (the first move of a player, `get_blank_spaces()` and
+`to_string()`) is independent of the board size.
+"""
+import random
+
+from .geometry import get_geometry
+from .isolation import Board
+from .zobrist import get_zobrist_keys
+
+
+class SparseBoard(Board):
+    """Implement a model for the game Isolation assuming each player moves like
+    a knight in chess, storing only the occupied cells.
+
+    SparseBoard exposes the same public interface as `isolation.Board`, and
+    the classes can be used interchangeably by players and by `play()`.
+    Unshuffled legal moves are returned in the same order as by `Board`.
+
+    Parameters
+    ----------
+    player_1 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    player_2 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    width : int (optional)
+        The number of columns that the board should have.
+
+    height : int (optional)
+        The number of rows that the board should have.
+
+    seed : int (optional)
+        Seed for a random number generator owned by the board (and shared by
+        its copies) that is used to shuffle legal moves. If None, the global
+        `random` module is used.
+
+    shuffle : bool (optional)
+        If False, legal moves are always returned in the same fixed order
+        instead of being shuffled.
+    """
+
+    def __init__(self, player_1, player_2, width=7, height=7, seed=None, shuffle=True):
+        self.width = width
+        self.height = height
+        self.move_count = 0
+        self._player_1 = player_1
+        self._player_2 = player_2
+        self._active_player = player_1
+        self._inactive_player = player_2
+        self._geometry = get_geometry(width, height)
+        self._zobrist = get_zobrist_keys(width, height)
+
+        # Cell indices visited by either player; _side is 0 when player 1
+        # holds the initiative and 1 otherwise
+        self._occupied = set()
+        self._side = 0
+        self._loc_1 = Board.NOT_MOVED
+        self._loc_2 = Board.NOT_MOVED
+        self._hash = 0
+        self._undo_stack = []
+        self._moves_cache = [None, None]
+        self._shuffle = shuffle
+        self._rng = random.Random(seed) if seed is not None else None
+
+    @classmethod
+    def from_board(cls, board, shuffle=None):
+        """Return a SparseBoard encoding the same game state as the input
+        board (see `BitBoard.from_board()`).
+        """
+        if shuffle is None:
+            shuffle = board._shuffle
+        new_board = cls(board._player_1, board._player_2,
+                        width=board.width, height=board.height, shuffle=shuffle)
+        new_board._rng = board._rng
+        blocked, loc_1, loc_2, side = board._position_indices()
+        new_board.move_count = board.move_count
+        new_board._active_player = board._active_player
+        new_board._inactive_player = board._inactive_player
+        new_board._occupied = set(blocked)
+        new_board._side = side
+        new_board._loc_1 = loc_1
+        new_board._loc_2 = loc_2
+        new_board._hash = board.hash()
+        return new_board
+
+    def hash(self):
+        return self._hash
+
+    def copy(self):
+        """ Return a deep copy of the current board. """
+        new_board = self.__class__.__new__(self.__class__)
+        new_board.width = self.width
+        new_board.height = self.height
+        new_board.move_count = self.move_count
+        new_board._player_1 = self._player_1
+        new_board._player_2 = self._player_2
+        new_board._active_player = self._active_player
+        new_board._inactive_player = self._inactive_player
+        new_board._geometry = self._geometry
+        new_board._zobrist = self._zobrist
+        new_board._occupied = set(self._occupied)
+        new_board._side = self._side
+        new_board._loc_1 = self._loc_1
+        new_board._loc_2 = self._loc_2
+        new_board._hash = self._hash
+        new_board._undo_stack = []
+        new_board._moves_cache = [None, None]
+        new_board._shuffle = self._shuffle
+        new_board._rng = self._rng
+        return new_board
+
+    def symmetric_copy(self, transform):
+        """Return a copy of the board with the position mapped by one of the
+        symmetries of the board (see `Board.symmetric_copy()`).
+        """
+        perm = self._geometry.symmetries[transform]
+        new_board = self.copy()
+        new_board._occupied = set(perm[idx] for idx in self._occupied)
+        if self._loc_1 != Board.NOT_MOVED:
+            new_board._loc_1 = perm[self._loc_1]
+        if self._loc_2 != Board.NOT_MOVED:
+            new_board._loc_2 = perm[self._loc_2]
+        new_board._hash = self._zobrist.compute(new_board._occupied, new_board._loc_1,
+                                                new_board._loc_2, self._side)
+        return new_board
+
+    def move_is_legal(self, move):
+        """Test whether a move is legal in the current game state.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        -------
+        bool
+            Returns True if the move is legal, False otherwise
+        """
+        return (0 <= move[0] < self.height and 0 <= move[1] < self.width and
+                move[0] + move[1] * self.height not in self._occupied)
+
+    def get_blank_spaces(self):
+        """Return a list of the locations that are still available on the board.
+        """
+        occupied = self._occupied
+        return [loc for idx, loc in enumerate(self._geometry.coords) if idx not in occupied]
+
+    def get_blank_mask(self):
+        """Return the blank cells as an integer bitmask. """
+        mask = self._geometry.full_mask
+        for idx in self._occupied:
+            mask ^= 1 << idx
+        return mask
+
+    def get_player_location(self, player):
+        """Find the current location of the specified player on the board.
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        -------
+        (int, int) or None
+            The coordinate pair (row, column) of the input player, or None
+            if the player has not moved.
+        """
+        idx = self.__location_index(player)
+        if idx == Board.NOT_MOVED:
+            return Board.NOT_MOVED
+        return self._geometry.coords[idx]
+
+    def get_legal_moves(self, player=None):
+        """Return the list of all legal moves for the specified player.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the legal moves for the active player on the board.
+
+        Returns
+        -------
+        list<(int, int)>
+            The list of coordinate pairs (row, column) of all legal moves
+            for the player constrained by the current game state.
+        """
+        if player is None:
+            player = self._active_player
+        slot = self.__slot(player)
+        moves = self._moves_cache[slot]
+        if moves is None:
+            idx = self._loc_2 if slot else self._loc_1
+            if idx == Board.NOT_MOVED:
+                moves = self.get_blank_spaces()
+            else:
+                coords = self._geometry.coords
+                occupied = self._occupied
+                moves = [coords[n] for n in self._geometry.knight_moves[idx]
+                         if n not in occupied]
+            if self._shuffle:
+                (self._rng or random).shuffle(moves)
+            self._moves_cache[slot] = moves
+        return list(moves)
+
+    def mobility(self, player=None):
+        """Return the number of legal moves for the specified player. The
+        first move of a player is counted without listing the blank cells.
+        """
+        if player is None:
+            player = self._active_player
+        idx = self.__location_index(player)
+        if idx == Board.NOT_MOVED:
+            return self._geometry.size - len(self._occupied)
+        occupied = self._occupied
+        return sum(1 for n in self._geometry.knight_moves[idx] if n not in occupied)
+
+    def apply_move(self, move):
+        """Move the active player to a specified location.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        idx = move[0] + move[1] * self.height
+        if self._side:
+            self._hash ^= self._zobrist.move_key(1, idx, self._loc_2)
+            self._loc_2 = idx
+        else:
+            self._hash ^= self._zobrist.move_key(0, idx, self._loc_1)
+            self._loc_1 = idx
+        self._occupied.add(idx)
+        self._side ^= 1
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count += 1
+        self._moves_cache = [None, None]
+
+    def push_move(self, move):
+        """Move the active player to a specified location in-place, recording
+        the information needed to take the move back with `pop_move()`.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        self._undo_stack.append((move[0] + move[1] * self.height,
+                                 self._loc_2 if self._side else self._loc_1))
+        self.apply_move(move)
+
+    def pop_move(self):
+        """Undo the most recent move applied with `push_move()`, restoring
+        the board to the state it had before that move.
+        """
+        try:
+            idx, last_loc = self._undo_stack.pop()
+        except IndexError:
+            raise RuntimeError("pop_move() called without a matching push_move()")
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count -= 1
+        self._side ^= 1
+        if self._side:
+            self._loc_2 = last_loc
+        else:
+            self._loc_1 = last_loc
+        self._occupied.discard(idx)
+        self._hash ^= self._zobrist.move_key(self._side, idx, last_loc)
+        self._moves_cache = [None, None]
+
+    def to_string(self, symbols=['1', '2']):
+        """Generate a string representation of the current game state, marking
+        the location of each player and indicating which cells have been
+        blocked, and which remain open.
+        """
+        col_margin = len(str(self.height - 1)) + 1
+        prefix = "{:<" + "{}".format(col_margin) + "}"
+        offset = " " * (col_margin + 3)
+        rows = [offset + '   '.join(map(str, range(self.width))) + '\n\r']
+        for i in range(self.height):
+            cells = []
+            for j in range(self.width):
+                idx = i + j * self.height
+                if idx not in self._occupied:
+                    cells.append(' ')
+                elif self._loc_1 == idx:
+                    cells.append(symbols[0])
+                elif self._loc_2 == idx:
+                    cells.append(symbols[1])
+                else:
+                    cells.append('-')
+            rows.append(prefix.format(i) + ' | ' + ' | '.join(cells) + ' | \n\r')
+        return ''.join(rows)
+
+    def _position_indices(self):
+        """Return the hashed features of the position (see
+        `Board._position_indices()`).
+        """
+        return sorted(self._occupied), self._loc_1, self._loc_2, self._side
+
+    def __location_index(self, player):
+        """Return the cell index of the specified player, or Board.NOT_MOVED
+        if the player has not moved.
+        """
+        if self.__slot(player):
+            return self._loc_2
+        return self._loc_1
+
+    def __slot(self, player):
+        """Return 0 for player 1 and 1 for player 2. """
+        if player == self._player_1:
+            return 0
+        elif player == self._player_2:
+            return 1
+        raise RuntimeError(
+            "`player` must be an object registered as a player in the "
+            "current game: {}".format(player))
@@ -0,0 +1,121 @@
+"""
+This file contains the random key tables used for Zobrist hashing of
+Isolation positions.  A position is identified by its blocked cells, the
+location of each player and which player holds the initiative; its Zobrist
+key is the XOR of one random key per feature, so the key can be updated
+incrementally as each move is applied or taken back.
+
+The keys are drawn from a fixed seed so that hashes are reproducible across
+runs and processes for boards of the same size.
+"""
+import random
+from functools import lru_cache
+
+SEED = 0x15014710
+
+
+class ZobristKeys(object):
+    """Random 64-bit keys for every hashed feature of a board of the
+    specified size.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns on the board.
+
+    height : int
+        The number of rows on the board.
+
+    Attributes
+    ----------
+    blocked : tuple<int>
+        The key XORed into the hash when each cell index becomes blocked.
+
+    location : (tuple<int>, tuple<int>)
+        The keys XORed into the hash while player 1 (location[0]) or
+        player 2 (location[1]) stands on each cell index.
+
+    side : int
+        The key XORed into the hash on every move to flip the initiative.
+    """
+
+    def __init__(self, width, height):
+        rng = random.Random(SEED ^ (width << 16) ^ height)
+        size = width * height
+        self.blocked = tuple(rng.getrandbits(64) for _ in range(size))
+        self.location = (tuple(rng.getrandbits(64) for _ in range(size)),
+                         tuple(rng.getrandbits(64) for _ in range(size)))
+        self.side = rng.getrandbits(64)
+
+    def move_key(self, side, idx, last_idx):
+        """Return the key difference of moving the player with the given
+        side (0 for player 1, 1 for player 2) from cell `last_idx` (None if
+        the player has not moved) to the free cell `idx`.  Applying the same
+        difference again takes the move back.
+        """
+        location = self.location[side]
+        key = self.blocked[idx] ^ location[idx] ^ self.side
+        if last_idx is not None:
+            key ^= location[last_idx]
+        return key
+
+    def compute(self, blocked, loc_1, loc_2, side):
+        """Compute the key of a position from scratch.
+
+        Parameters
+        ----------
+        blocked : iterable<int>
+            The indices of all blocked cells.
+
+        loc_1, loc_2 : int or None
+            The cell index of player 1 and player 2, or None if the player
+            has not moved.
+
+        side : int
+            0 if player 1 holds the initiative and 1 otherwise.
+        """
+        key = self.side if side else 0
+        for idx in blocked:
+            key ^= self.blocked[idx]
+        if loc_1 is not None:
+            key ^= self.location[0][loc_1]
+        if loc_2 is not None:
+            key ^= self.location[1][loc_2]
+        return key
+
+    def canonical(self, symmetries, blocked, loc_1, loc_2, side):
+        """Compute the keys of the symmetric images of a position and return
+        the smallest one.
+
+        Parameters
+        ----------
+        symmetries : sequence<tuple<int>>
+            The symmetries of the board as permutations of the cell indices
+            (see `Geometry.symmetries`).
+
+        blocked, loc_1, loc_2, side
+            The position, as in `compute()`.
+
+        Returns
+        -------
+        (int, int)
+            The smallest key among the images of the position and the index
+            of the first transform in `symmetries` that produces it.
+        """
+        blocked = list(blocked)
+        best = None
+        for transform, perm in enumerate(symmetries):
+            key = self.compute([perm[idx] for idx in blocked],
+                               None if loc_1 is None else perm[loc_1],
+                               None if loc_2 is None else perm[loc_2], side)
+            if best is None or key < best[0]:
+                best = (key, transform)
+        return best
+
+
+@lru_cache(maxsize=None)
+def get_zobrist_keys(width, height):
+    """Return the shared `ZobristKeys` instance for a board of the given
+    size.
+    """
+    return ZobristKeys(width, height)
@@ -0,0 +1,388 @@
+"""Play Isolation matches between agents running in separate processes.
+
+`isolation.Board.play()` calls the players in the process that owns the
+board, so an agent can stall, crash or corrupt the game of its opponent, and
+the time it takes is measured from inside the same interpreter.  The match
+server instead runs every agent as a subprocess, drives the board itself and
+talks to the agents over a line protocol on their standard input and output.
+Deadlines are enforced by the server on a monotonic clock: an agent that has
+not answered when its time is up loses the game and its process is restarted
+for the next one.  Matches run concurrently on an asyncio event loop.
+
+Protocol (one line per message, fields separated by spaces, moves given as
+cell indexes `row + column * height`):
+
+    server: game <width> <height> <seat>    a new game starts; the agent
+                                            moves first if seat is 0
+    agent:  ok
+    server: move <ms> [<cell> ...]          choose a move within <ms>
+                                            milliseconds; the cells are the
+                                            moves played since the agent's
+                                            last reply (the random opening
+                                            and the opponent's moves)
+    agent:  <cell>                          the chosen move, or -1 if none
+    server: quit                            the agent exits
+
+An agent answers a request it cannot handle with a line starting with
+`error`, which the server treats as a failure of the agent.
+
+Any program that speaks the protocol can play. The agents of selfplay.py and
+the competition agent are served by this module itself:
+
+    python match_server.py --serve AB_Improved
+
+and a server playing 20 games between every pair of agents, 4 matches at a
+time, is started with:
+
+    python match_server.py AB_Improved AB_Custom "Mine=./my_agent --fast" \\
+        --games 20 --concurrency 4 --log games.jsonl
+
+Concurrent matches share the processors of the machine, so an agent that
+searches until its deadline plays weaker when more matches run at once than
+there are cores for their agents.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import shlex
+import sys
+import time
+
+from isolation import BitBoard
+from selfplay import AGENTS as SELFPLAY_AGENTS
+from competition_agent import CustomPlayer
+
+TIME_LIMIT = 150  # number of milliseconds allowed for each move
+START_TIMEOUT = 30.  # number of seconds allowed to an agent to accept a game
+
+AGENTS = dict(SELFPLAY_AGENTS, Competition=lambda: CustomPlayer())
+
+# Stand-in for the remote opponent on the board of a served agent
+OPPONENT = "opponent"
+
+
+class AgentError(Exception):
+    """Raised when an agent process exits or breaks the protocol. """
+    pass
+
+
+class RemoteAgent:
+    """An agent running in a subprocess.
+
+    Parameters
+    ----------
+    name : str
+        The name of the agent in the results.
+
+    command : list<str>
+        The command starting the agent process.
+    """
+
+    def __init__(self, name, command):
+        self.name = name
+        self.command = command
+        self.process = None
+
+    async def start(self):
+        """Start the agent process if it is not running. """
+        if self.process is None:
+            self.process = await asyncio.create_subprocess_exec(
+                *self.command, stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE)
+
+    async def stop(self, kill=False):
+        """Stop the agent process, asking it to quit unless `kill` is set. """
+        process, self.process = self.process, None
+        if process is None:
+            return
+        if not kill and process.returncode is None:
+            try:
+                process.stdin.write(b"quit\n")
+                await process.stdin.drain()
+                await asyncio.wait_for(process.wait(), 1.)
+                return
+            except (asyncio.TimeoutError, ConnectionError):
+                pass
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+
+    async def request(self, line, timeout=None):
+        """Send a line to the agent and wait for its reply.
+
+        Returns
+        -------
+        (str, float)
+            The reply and the milliseconds elapsed from sending the line to
+            receiving the reply, measured on the monotonic clock.
+
+        Raises
+        ------
+        asyncio.TimeoutError
+            If no reply arrived within `timeout` seconds.
+
+        AgentError
+            If the agent process exited.
+        """
+        start = time.monotonic()
+        try:
+            self.process.stdin.write(line.encode("ascii") + b"\n")
+            await self.process.stdin.drain()
+        except ConnectionError:
+            raise AgentError("{} exited".format(self.name))
+        reply = await asyncio.wait_for(self.process.stdout.readline(), timeout)
+        elapsed = 1000. * (time.monotonic() - start)
+        if not reply:
+            raise AgentError("{} exited".format(self.name))
+        return reply.decode("ascii").strip(), elapsed
+
+
+async def play_game(agents, opening, time_limit=TIME_LIMIT, width=7, height=7):
+    """Play a game between two agent processes.
+
+    Parameters
+    ----------
+    agents : (RemoteAgent, RemoteAgent)
+        The first and the second player.
+
+    opening : list<int>
+        The cell indexes of the random moves opening the game.
+
+    Returns
+    -------
+    (int, str, list<int>)
+        0 if the first player won and 1 otherwise, the reason the game ended
+        (as reported by `isolation.Board.play()`), and the cell indexes of
+        the moves of the game. The process of an agent that timed out or
+        broke the protocol is stopped, and started again for its next game.
+    """
+    game = BitBoard(0, 1, width, height, shuffle=False)
+    moves = []
+    for seat, agent in enumerate(agents):
+        await agent.start()
+        try:
+            reply, _ = await agent.request("game {} {} {}".format(width, height, seat),
+                                           START_TIMEOUT)
+        except (asyncio.TimeoutError, AgentError):
+            reply = None
+        if reply != "ok":
+            await agent.stop(kill=True)
+            return 1 - seat, "forfeit", moves
+    for idx in opening:
+        game.apply_move((idx % height, idx // height))
+        moves.append(idx)
+
+    # Index into `moves` of the first move each agent has not been told about
+    told = [0, 0]
+    while True:
+        seat = game.active_player
+        agent = agents[seat]
+        legal_moves = game.get_legal_moves()
+        line = " ".join(["move", "{:g}".format(time_limit)] +
+                        [str(idx) for idx in moves[told[seat]:]])
+        try:
+            reply, elapsed = await agent.request(line, time_limit / 1000.)
+            idx = int(reply)
+        except asyncio.TimeoutError:
+            await agent.stop(kill=True)
+            return 1 - seat, "timeout", moves
+        except (AgentError, ValueError):
+            await agent.stop(kill=True)
+            return 1 - seat, "forfeit", moves
+        if elapsed > time_limit:
+            return 1 - seat, "timeout", moves
+
+        move = (idx % height, idx // height) if idx >= 0 else (-1, -1)
+        if move not in legal_moves:
+            return 1 - seat, "forfeit" if legal_moves else "illegal move", moves
+        told[seat] = len(moves) + 1
+        moves.append(idx)
+        game.apply_move(move)
+
+
+async def play_match(names, commands, games, rng, time_limit=TIME_LIMIT, width=7,
+                     height=7, log=None):
+    """Play pairs of games between two agents, each pair from the same
+    random opening with each agent moving first once.
+
+    Returns
+    -------
+    list<(str, str)>
+        The name of the winner and the reason the game ended, for every
+        game.
+    """
+    agents = [RemoteAgent(name, command) for name, command in zip(names, commands)]
+    results = []
+    try:
+        for number in range(games):
+            if number % 2 == 0:
+                opening = random_opening(rng, width, height)
+            seats = agents if number % 2 == 0 else agents[::-1]
+            winner, termination, moves = await play_game(seats, opening, time_limit,
+                                                         width, height)
+            results.append((seats[winner].name, termination))
+            if log is not None:
+                log.write(json.dumps({"players": [agent.name for agent in seats],
+                                      "winner": winner, "termination": termination,
+                                      "moves": moves}) + "\n")
+                log.flush()
+    finally:
+        for agent in agents:
+            await agent.stop()
+    return results
+
+
+def random_opening(rng, width=7, height=7):
+    """Return the cell indexes of a random move for each player. """
+    first = rng.randrange(width * height)
+    return [first, rng.choice([idx for idx in range(width * height) if idx != first])]
+
+
+async def run_tournament(agents, games, time_limit=TIME_LIMIT, concurrency=1, seed=None,
+                         width=7, height=7, log=None):
+    """Play a match between every pair of agents, running up to
+    `concurrency` matches at a time.
+
+    Parameters
+    ----------
+    agents : dict
+        Maps the name of each agent to the command starting its process.
+
+    games : int
+        The number of games of every match.
+
+    Returns
+    -------
+    dict
+        Maps every pair of agent names to the list of (winner, termination)
+        results of its games.
+    """
+    rng = random.Random(seed)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def match(pair):
+        match_rng = random.Random(rng.getrandbits(32))
+        async with semaphore:
+            return await play_match(pair, [agents[name] for name in pair], games, match_rng,
+                                    time_limit, width, height, log)
+
+    pairs = list(itertools.combinations(agents, 2))
+    results = await asyncio.gather(*(match(pair) for pair in pairs))
+    return dict(zip(pairs, results))
+
+
+def serve(player, stdin=None, stdout=None):
+    """Play games for the server as `player`, reading requests from `stdin`
+    and writing replies to `stdout` until told to quit.
+
+    The time allowed for a move is counted from the moment the request is
+    read, on the monotonic clock.
+    """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    game = None
+    for line in stdin:
+        fields = line.split()
+        if not fields:
+            continue
+        if fields[0] == "quit":
+            break
+        if fields[0] == "game":
+            width, height, seat = (int(field) for field in fields[1:4])
+            seats = (player, OPPONENT) if seat == 0 else (OPPONENT, player)
+            game = BitBoard(seats[0], seats[1], width, height)
+            reply = "ok"
+        elif fields[0] == "move" and game is None:
+            reply = "error no game in progress"
+        elif fields[0] == "move":
+            start = time.monotonic()
+            time_limit = float(fields[1])
+            time_left = lambda: time_limit - 1000. * (time.monotonic() - start)
+            height = game.height
+            for idx in map(int, fields[2:]):
+                game.apply_move((idx % height, idx // height))
+            move = player.get_move(game.copy(), time_left)
+            if move is None or not game.move_is_legal(move) or move == (-1, -1):
+                reply = "-1"
+            else:
+                game.apply_move(move)
+                reply = str(move[0] + move[1] * height)
+        else:
+            reply = "error unknown request {}".format(fields[0])
+        stdout.write(reply + "\n")
+        stdout.flush()
+
+
+def agent_command(spec):
+    """Return the name and the command of an agent given on the command
+    line, either as the name of a built-in agent or as `name=command`.
+    """
+    if "=" in spec:
+        name, command = spec.split("=", 1)
+        return name, shlex.split(command)
+    if spec not in AGENTS:
+        raise ValueError("Unknown agent {!r}; use one of {} or name=command".format(
+            spec, ", ".join(sorted(AGENTS))))
+    return spec, [sys.executable, os.path.abspath(__file__), "--serve", spec]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play Isolation matches between agent "
+                                                 "processes.")
+    parser.add_argument("agents", nargs="*",
+                        help="built-in agent names or name=command for other programs")
+    parser.add_argument("--serve", metavar="AGENT", choices=sorted(AGENTS),
+                        help="play as a built-in agent over standard input and output")
+    parser.add_argument("--games", type=int, default=10,
+                        help="number of games between every pair of agents")
+    parser.add_argument("--time-limit", type=float, default=TIME_LIMIT,
+                        help="milliseconds allowed for each move")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="number of matches played at a time")
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--log", metavar="FILE", default=None,
+                        help="write every game as a JSON line to FILE")
+    args = parser.parse_args()
+
+    if args.serve:
+        # Anything the agent prints must not reach the server
+        stdout, sys.stdout = sys.stdout, sys.stderr
+        serve(AGENTS[args.serve](), sys.stdin, stdout)
+        return
+
+    if len(args.agents) < 2:
+        parser.error("at least two agents are needed")
+    try:
+        agents = dict(agent_command(spec) for spec in args.agents)
+    except ValueError as e:
+        parser.error(str(e))
+    log = open(args.log, "a") if args.log else None
+    try:
+        results = asyncio.run(run_tournament(agents, args.games, args.time_limit,
+                                             args.concurrency, args.seed, args.width,
+                                             args.height, log))
+    finally:
+        if log is not None:
+            log.close()
+
+    print("\n{:^13}{:^13}{:^9}{:^9}{:^10}{:^10}".format(
+        "Agent", "Opponent", "Won", "Lost", "Timeouts", "Forfeits"))
+    for (name_a, name_b), games in results.items():
+        won = sum(winner == name_a for winner, _ in games)
+        # Timeouts and forfeits are counted against the loser of the game
+        timeouts = [sum(winner != name and termination == "timeout"
+                        for winner, termination in games) for name in (name_a, name_b)]
+        forfeits = [sum(winner != name and termination == "forfeit"
+                        for winner, termination in games) for name in (name_a, name_b)]
+        print("{:^13}{:^13}{:^9}{:^9}{:^10}{:^10}".format(
+            name_a, name_b, won, len(games) - won, "{} / {}".format(*timeouts),
+            "{} / {}".format(*forfeits)))
+
+
+if __name__ == "__main__":
+    main()
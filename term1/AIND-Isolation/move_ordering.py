@@ -0,0 +1,170 @@
+"""This file contains the move ordering strategies used by the alpha-beta
+search in game_agent.py.  Alpha-beta prunes the most when the best move at
+each node is searched first, so these classes sort the legal moves of a node
+using what the search has learned so far, and keep track of how often the
+first move searched was good enough to cause a cutoff.
+
+A move orderer is any object with the `new_search()`, `order()` and
+`cutoff()` methods of `MoveOrderer`, so alternative strategies can be passed
+to `AlphaBetaPlayer` directly.
+"""
+
+
+class MoveOrderer:
+    """Search the transposition table (principal variation) move first and
+    leave the remaining moves in the order produced by the board.
+
+    Attributes
+    ----------
+    nodes : int
+        The number of interior nodes whose moves have been ordered.
+
+    cutoffs : int
+        The number of those nodes that failed high or low before all of
+        their moves were searched.
+
+    first_move_cutoffs : int
+        The number of cutoffs caused by the first move searched.
+    """
+
+    def __init__(self):
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset the cutoff statistics. """
+        self.nodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def stats(self):
+        """Return the cutoff statistics collected since the last reset.
+
+        Returns
+        -------
+        dict
+            The node and cutoff counters, the fraction of nodes that were
+            cut off (cutoff_rate) and the fraction of cutoffs caused by the
+            first move searched (first_move_rate).
+        """
+        return {
+            "nodes": self.nodes,
+            "cutoffs": self.cutoffs,
+            "first_move_cutoffs": self.first_move_cutoffs,
+            "cutoff_rate": self.cutoffs / self.nodes if self.nodes else 0.,
+            "first_move_rate": (self.first_move_cutoffs / self.cutoffs
+                                if self.cutoffs else 0.),
+        }
+
+    def new_search(self):
+        """Called once at the start of each move selection. """
+        pass
+
+    def order(self, moves, ply, tt_move=None, side=0):
+        """Return the moves of a node in the order they should be searched.
+
+        Parameters
+        ----------
+        moves : list<(int, int)>
+            The legal moves of the node.
+
+        ply : int
+            The distance of the node from the root of the search.
+
+        tt_move : (int, int) (optional)
+            The best move stored for the node in the transposition table,
+            i.e., the principal variation move of the previous iteration.
+
+        side : int (optional)
+            0 if the searching player is to move at the node, 1 otherwise.
+
+        Returns
+        -------
+        list<(int, int)>
+            The input moves, reordered.
+        """
+        self.nodes += 1
+        if tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+        return moves
+
+    def cutoff(self, move, ply, depth, index, side=0):
+        """Record that a move caused a beta (or alpha) cutoff.
+
+        Parameters
+        ----------
+        move : (int, int)
+            The move that caused the cutoff.
+
+        ply : int
+            The distance of the node from the root of the search.
+
+        depth : int
+            The remaining search depth at the node.
+
+        index : int
+            The position of the move in the ordered move list.
+
+        side : int (optional)
+            0 if the searching player is to move at the node, 1 otherwise.
+        """
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+
+
+class KillerHistoryOrderer(MoveOrderer):
+    """Search the transposition table move first, then the killer moves of
+    the current ply, then the remaining moves by history heuristic score.
+
+    Killer moves are the most recent moves that caused a cutoff at the same
+    ply in a sibling subtree; the history table accumulates depth^2 for every
+    move that causes a cutoff anywhere in the tree.
+
+    Parameters
+    ----------
+    num_killers : int (optional)
+        The number of killer moves remembered per ply.
+    """
+
+    def __init__(self, num_killers=2):
+        super().__init__()
+        self.num_killers = num_killers
+        self.killers = []
+        self.history = ({}, {})
+
+    def new_search(self):
+        """Forget the killer moves of the previous move selection and halve
+        the history scores so that recent cutoffs dominate.
+        """
+        self.killers = []
+        for table in self.history:
+            for move in table:
+                table[move] //= 2
+
+    def order(self, moves, ply, tt_move=None, side=0):
+        self.nodes += 1
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history[side]
+
+        def priority(move):
+            if move == tt_move:
+                return (2, 0)
+            if move in killers:
+                return (1, -killers.index(move))
+            return (0, history.get(move, 0))
+
+        return sorted(moves, key=priority, reverse=True)
+
+    def cutoff(self, move, ply, depth, index, side=0):
+        super().cutoff(move, ply, depth, index, side)
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if move in killers:
+            killers.remove(move)
+        killers.insert(0, move)
+        del killers[self.num_killers:]
+
+        history = self.history[side]
+        history[move] = history.get(move, 0) + depth * depth
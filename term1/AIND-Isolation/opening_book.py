@@ -0,0 +1,214 @@
+"""Build and consult opening books for the search agents in game_agent.py
+and competition_agent.py.
+
+The first moves of a game are the most expensive to search: until a player
+has moved, every blank cell is a legal move.  The book builder searches every
+position of the first few plies once, offline and to a fixed depth, and
+stores the best move of each.  Positions are reduced by the symmetries of the
+board (see `isolation.geometry`): each one is stored once under the smallest
+Zobrist key among its symmetric images, with the best move expressed in that
+same frame, so a book holds up to 8 times fewer entries than the positions it
+covers.
+
+Books are saved as a small header followed by fixed-size records:
+
+    header : magic (8 bytes), width, height, plies (1 byte each), count (4)
+    record : canonical key (8 bytes), move cell index (1), search depth (1)
+
+On boards with more than 255 cells, the move cell index takes two bytes.
+
+Usage:
+
+    python opening_book.py --plies 2 --depth 5 --output book.bin
+"""
+import argparse
+import struct
+
+from concurrent.futures import ProcessPoolExecutor
+
+from isolation import BitBoard
+from isolation.geometry import get_geometry
+from game_agent import AlphaBetaPlayer, custom_score, custom_score_2, custom_score_3
+from sample_players import improved_score
+from selfplay import cell_format
+
+MAGIC = b"ISOBOOK1"
+HEADER = struct.Struct("<8sBBBI")
+RECORDS = {"B": struct.Struct("<QBB"), "H": struct.Struct("<QHB")}
+
+HEURISTICS = {
+    "custom_score": custom_score,
+    "custom_score_2": custom_score_2,
+    "custom_score_3": custom_score_3,
+    "improved_score": improved_score,
+}
+
+
+class OpeningBook:
+    """Best moves of the canonical positions of the first plies of a game.
+
+    Parameters
+    ----------
+    width, height : int (optional)
+        The size of the board the book was built for.
+
+    plies : int (optional)
+        The book covers the positions with fewer than this many moves
+        played.
+    """
+
+    def __init__(self, width=7, height=7, plies=0):
+        self.width = width
+        self.height = height
+        self.plies = plies
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, game, move, depth):
+        """Record the best move of a position, found by a search of the
+        given depth.
+        """
+        key, transform = game.canonical_hash()
+        move = game.canonical_move(move, transform)
+        self.entries[key] = (move[0] + move[1] * self.height, depth)
+
+    def lookup(self, game):
+        """Return the book move for the position, or None if the position is
+        not in the book.
+        """
+        if (game.move_count >= self.plies or game.width != self.width or
+                game.height != self.height):
+            return None
+        key, transform = game.canonical_hash()
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        move = game.original_move(get_geometry(self.width, self.height).coords[entry[0]],
+                                  transform)
+        return move if game.move_is_legal(move) else None
+
+    def save(self, path):
+        """Write the book to a file. """
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, self.width, self.height, self.plies,
+                                len(self.entries)))
+            record = RECORDS[cell_format(self.width, self.height)]
+            for key in sorted(self.entries):
+                f.write(record.pack(key, *self.entries[key]))
+
+    @classmethod
+    def load(cls, path):
+        """Read a book written by `save()`.
+
+        Raises
+        ------
+        ValueError
+            If the file is not an opening book.
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            raise ValueError("Not an opening book: {}".format(path))
+        magic, width, height, plies, count = HEADER.unpack_from(data)
+        record = RECORDS[cell_format(width, height)]
+        if magic != MAGIC or len(data) != HEADER.size + count * record.size:
+            raise ValueError("Not an opening book: {}".format(path))
+        book = cls(width, height, plies)
+        for key, idx, depth in record.iter_unpack(data[HEADER.size:]):
+            book.entries[key] = (idx, depth)
+        return book
+
+
+def opening_positions(plies, width=7, height=7):
+    """Return the move sequences reaching one representative of every
+    canonical position with fewer than `plies` moves played.
+    """
+    positions = []
+    seen = set()
+    frontier = [()]
+    for _ in range(plies):
+        next_frontier = []
+        for moves in frontier:
+            game = replay(moves, "Player1", "Player2", width, height)
+            key = game.canonical_hash()[0]
+            if key in seen:
+                continue
+            seen.add(key)
+            positions.append(moves)
+            next_frontier.extend(moves + (move,) for move in game.get_legal_moves())
+        frontier = next_frontier
+    return positions
+
+
+def replay(moves, player_1, player_2, width=7, height=7):
+    """Return an unshuffled BitBoard with the moves applied. """
+    game = BitBoard(player_1, player_2, width, height, shuffle=False)
+    for move in moves:
+        game.apply_move(move)
+    return game
+
+
+def search_position(moves, depth, score_fn, width=7, height=7):
+    """Search the position reached by a move sequence to a fixed depth.
+
+    Returns
+    -------
+    (tuple, (int, int))
+        The move sequence and the best move found.
+    """
+    player = AlphaBetaPlayer(score_fn=score_fn)
+    seats = (player, "Opponent") if len(moves) % 2 == 0 else ("Opponent", player)
+    game = replay(moves, seats[0], seats[1], width, height)
+    player.time_left = lambda: float("inf")
+    best_move = (-1, -1)
+    for iteration in range(1, depth + 1):
+        best_move = player.alphabeta(game, iteration)
+    if best_move == (-1, -1):
+        best_move = game.get_legal_moves()[0]
+    return moves, best_move
+
+
+def build_book(plies, depth, score_fn=custom_score, width=7, height=7, executor=None):
+    """Search every canonical position of the first `plies` plies and
+    return the resulting book. If an executor is given, the positions are
+    searched in its worker processes.
+    """
+    positions = opening_positions(plies, width, height)
+    args = (positions, [depth] * len(positions), [score_fn] * len(positions),
+            [width] * len(positions), [height] * len(positions))
+    results = executor.map(search_position, *args) if executor else map(search_position, *args)
+    book = OpeningBook(width, height, plies)
+    for moves, best_move in results:
+        book.add(replay(moves, "Player1", "Player2", width, height), best_move, depth)
+    return book
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an Isolation opening book.")
+    parser.add_argument("--plies", type=int, default=2,
+                        help="cover the positions with fewer moves played")
+    parser.add_argument("--depth", type=int, default=5,
+                        help="search depth for every book position")
+    parser.add_argument("--heuristic", choices=sorted(HEURISTICS), default="custom_score")
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    parser.add_argument("--processes", type=int, default=1,
+                        help="search positions in this many worker processes")
+    parser.add_argument("--output", default="opening_book.bin")
+    args = parser.parse_args()
+
+    score_fn = HEURISTICS[args.heuristic]
+    if args.processes > 1:
+        with ProcessPoolExecutor(args.processes) as executor:
+            book = build_book(args.plies, args.depth, score_fn, args.width,
+                              args.height, executor)
+    else:
+        book = build_book(args.plies, args.depth, score_fn, args.width, args.height)
+    book.save(args.output)
+    print("Wrote {} positions to {}".format(len(book), args.output))
+
+
+if __name__ == "__main__":
+    main()
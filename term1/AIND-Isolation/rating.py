@@ -0,0 +1,154 @@
+"""This file contains the statistics used by the rating mode of
+tournament.py: a Bradley-Terry model fitted to round-robin results and
+reported on the Elo scale with bootstrap confidence intervals, and a
+sequential probability ratio test (SPRT) that decides when a pairing has
+played enough games.
+
+Isolation games cannot be drawn, so every game is a win for one of the two
+players and the results of a pairing are binomial.
+"""
+import math
+import random
+
+
+def elo_to_probability(elo):
+    """Return the expected score of a player rated `elo` points above its
+    opponent.
+    """
+    return 1. / (1. + 10. ** (-elo / 400.))
+
+
+def sprt(wins, losses, elo0=-50., elo1=50., alpha=0.05, beta=0.05):
+    """Sequential probability ratio test between two Elo hypotheses.
+
+    Parameters
+    ----------
+    wins, losses : int
+        The number of games won and lost by the first player of the pairing.
+
+    elo0, elo1 : float (optional)
+        The Elo difference under the null (H0) and alternative (H1)
+        hypotheses.
+
+    alpha, beta : float (optional)
+        The probability of accepting H1 when H0 is true, and of accepting
+        H0 when H1 is true.
+
+    Returns
+    -------
+    (float, str or None)
+        The log-likelihood ratio of the results, and "H0" or "H1" if the
+        corresponding hypothesis is accepted, or None if more games are
+        needed.
+    """
+    p0 = elo_to_probability(elo0)
+    p1 = elo_to_probability(elo1)
+    llr = wins * math.log(p1 / p0) + losses * math.log((1 - p1) / (1 - p0))
+    if llr >= math.log((1 - beta) / alpha):
+        return llr, "H1"
+    if llr <= math.log(beta / (1 - alpha)):
+        return llr, "H0"
+    return llr, None
+
+
+def fit_bradley_terry(names, results, iterations=1000, tolerance=1e-9, prior=1.):
+    """Fit Bradley-Terry strengths to pairwise results.
+
+    The model is fitted with the minorization-maximization algorithm of
+    Hunter (2004), adding `prior` virtual games split evenly between the
+    players of every pairing so that undefeated or winless players still
+    have finite ratings.
+
+    Parameters
+    ----------
+    names : list<str>
+        The players being rated.
+
+    results : dict
+        Maps a pair of names (a, b) to the number of games a won against b.
+
+    Returns
+    -------
+    dict
+        The rating of each player on the Elo scale, centred on 0.
+    """
+    wins = {name: 0. for name in names}
+    games = {}
+    for (a, b), won in results.items():
+        wins[a] += won
+        games[(a, b)] = games.get((a, b), 0.) + won
+        games[(b, a)] = games.get((b, a), 0.) + won
+    for a, b in list(games):
+        if prior and a < b:
+            games[(a, b)] += prior
+            games[(b, a)] += prior
+            wins[a] += prior / 2.
+            wins[b] += prior / 2.
+
+    opponents = {name: [b for (a, b) in games if a == name] for name in names}
+    gamma = {name: 1. for name in names}
+    for _ in range(iterations):
+        new_gamma = {}
+        for name in names:
+            denominator = sum(games[(name, b)] / (gamma[name] + gamma[b])
+                              for b in opponents[name])
+            new_gamma[name] = wins[name] / denominator if denominator else 1.
+        scale = math.exp(sum(math.log(g) for g in new_gamma.values()) / len(names))
+        new_gamma = {name: g / scale for name, g in new_gamma.items()}
+        change = max(abs(new_gamma[name] - gamma[name]) for name in names)
+        gamma = new_gamma
+        if change < tolerance:
+            break
+
+    return {name: 400. * math.log10(g) for name, g in gamma.items()}
+
+
+def bootstrap_intervals(names, results, totals, samples=200, confidence=0.95, seed=None):
+    """Estimate confidence intervals for Bradley-Terry ratings by
+    resampling the results of every pairing.
+
+    Parameters
+    ----------
+    names : list<str>
+        The players being rated.
+
+    results : dict
+        Maps a pair of names (a, b) to the number of games a won against b.
+
+    totals : dict
+        Maps each pairing (a, b) with a < b to the number of games played.
+
+    samples : int (optional)
+        The number of bootstrap resamples.
+
+    confidence : float (optional)
+        The coverage of the returned intervals.
+
+    seed : int (optional)
+        Seed for the resampling, so that intervals are reproducible.
+
+    Returns
+    -------
+    dict
+        Maps each player to a (low, high) Elo interval.
+    """
+    rng = random.Random(seed)
+    ratings = {name: [] for name in names}
+    for _ in range(samples):
+        sample = {}
+        for (a, b), n in totals.items():
+            p = results.get((a, b), 0) / n if n else 0.5
+            won = sum(rng.random() < p for _ in range(n))
+            sample[(a, b)] = won
+            sample[(b, a)] = n - won
+        for name, elo in fit_bradley_terry(names, sample).items():
+            ratings[name].append(elo)
+
+    tail = (1. - confidence) / 2.
+    intervals = {}
+    for name, values in ratings.items():
+        values.sort()
+        low = values[int(tail * (len(values) - 1))]
+        high = values[int(math.ceil((1. - tail) * (len(values) - 1)))]
+        intervals[name] = (low, high)
+    return intervals
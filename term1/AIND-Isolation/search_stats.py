@@ -0,0 +1,188 @@
+"""This file contains an opt-in statistics collector for the search agents
+in game_agent.py.  A `SearchStats` instance passed to `MinimaxPlayer` or
+`AlphaBetaPlayer` records one entry per call to get_move() describing how
+deep the search got, how many nodes it visited and how the time was spent,
+so heuristic changes can be judged by speed as well as by strength.
+
+`MoveTimes` gathers the time every agent takes per move over many games (see
+`isolation.Board.play()`), and the time its searches take to complete each
+depth, so that TIMER_THRESHOLD can be set from the tail of the distribution
+rather than guessed.
+"""
+import math
+
+from collections import defaultdict
+
+
+def percentile(values, q):
+    """Return the q-th percentile (0 < q <= 100) of a non-empty list of
+    values by the nearest-rank method, i.e., the smallest value that is
+    greater than or equal to q percent of the values.
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100. * len(ordered)) - 1)]
+
+
+class SearchStats:
+    """Per-move search statistics.
+
+    Attributes
+    ----------
+    moves : list<dict>
+        One record per move searched since the last reset, with keys:
+
+        depth : int
+            The deepest iteration that completed (0 if none did).
+        depth_times : list<float>
+            The milliseconds elapsed when each depth completed.
+        nodes : int
+            The number of nodes visited.
+        nps : float
+            Nodes visited per second.
+        cutoffs : int
+            The number of alpha-beta cutoffs.
+        tt_hits : int
+            The number of transposition table probes that found an entry.
+        elapsed : float
+            The milliseconds spent in get_move().
+        time_left_at_abort : float or None
+            The milliseconds left on the clock when the search was aborted
+            by the timer, or None if it completed.
+
+        Records of searches using a selective depth policy (see
+        `selective.py`) also have the counters of the policy:
+
+        reductions : int
+            The number of moves searched with a reduced depth.
+        re_searches : int
+            The number of reduced moves searched again at full depth.
+        extensions : int
+            The number of moves searched with an extended depth.
+    """
+
+    def __init__(self):
+        self.moves = []
+        self._start = 0.
+        self._record = None
+
+    def reset(self):
+        """Forget all the records collected so far. """
+        self.moves = []
+
+    def begin(self, time_left):
+        """Start the record of a new move, given the milliseconds left. """
+        self._start = time_left
+        self._record = {"depth": 0, "depth_times": []}
+
+    def depth_done(self, depth, time_left):
+        """Record that an iteration to the given depth has completed. """
+        self._record["depth"] = depth
+        self._record["depth_times"].append(round(self._start - time_left, 3))
+
+    def end(self, time_left, nodes, cutoffs=0, tt_hits=0, aborted=False, selective=None):
+        """Complete the record of the current move and store it. """
+        elapsed = self._start - time_left
+        self._record.update({
+            "nodes": nodes,
+            "nps": round(1000. * nodes / elapsed, 1) if elapsed > 0 else 0.,
+            "cutoffs": cutoffs,
+            "tt_hits": tt_hits,
+            "elapsed": round(elapsed, 3),
+            "time_left_at_abort": round(time_left, 3) if aborted else None,
+        })
+        if selective is not None:
+            self._record.update(selective)
+        self.moves.append(self._record)
+        self._record = None
+
+
+class MoveTimes:
+    """Per-agent distributions of the time spent on each move.
+
+    Parameters
+    ----------
+    time_limit : float
+        The milliseconds allowed for each move.
+
+    margin : float (optional)
+        Moves that leave fewer than this many milliseconds on the clock
+        are counted as close calls.
+
+    Attributes
+    ----------
+    wall, cpu : dict
+        Map the name of every agent to the list of wall-clock and CPU
+        milliseconds of each of its moves.
+
+    depth_times : dict
+        Maps the name of every agent to a dict mapping each search depth to
+        the list of milliseconds it took to complete that depth, from the
+        `SearchStats` records of the agent.
+    """
+
+    PERCENTILES = (50, 95, 99)
+
+    def __init__(self, time_limit, margin=5.):
+        self.time_limit = time_limit
+        self.margin = margin
+        self.wall = defaultdict(list)
+        self.cpu = defaultdict(list)
+        self.depth_times = defaultdict(lambda: defaultdict(list))
+
+    def add(self, name, timings, move_stats=None):
+        """Record the moves of an agent in a game.
+
+        Parameters
+        ----------
+        timings : list<(float, float)>
+            The wall-clock and CPU milliseconds of each move.
+
+        move_stats : list<dict> (optional)
+            The `SearchStats` records of the moves.
+        """
+        for wall, cpu in timings:
+            self.wall[name].append(wall)
+            self.cpu[name].append(cpu)
+        for record in move_stats or ():
+            # The depth times are those of the last iterations of the search
+            # (all of them with iterative deepening)
+            first = record["depth"] - len(record["depth_times"]) + 1
+            for depth, elapsed in enumerate(record["depth_times"], first):
+                self.depth_times[name][depth].append(elapsed)
+
+    def summary(self, name):
+        """Return the number of moves of an agent, the percentiles in
+        `PERCENTILES` of its wall-clock and CPU times, its slowest move and
+        the number of close calls.
+        """
+        wall = self.wall[name]
+        return {
+            "moves": len(wall),
+            "wall": [percentile(wall, q) for q in self.PERCENTILES],
+            "cpu": [percentile(self.cpu[name], q) for q in self.PERCENTILES],
+            "max": max(wall),
+            "close_calls": sum(self.time_limit - t < self.margin for t in wall),
+        }
+
+    def report(self):
+        """Return the per-agent latency tables as text. """
+        header = "/".join("p{}".format(q) for q in self.PERCENTILES)
+        lines = ["{:^13}{:^8}{:^20}{:^20}{:^8}{:^7}".format(
+            "Agent", "Moves", "Wall " + header, "CPU " + header, "Max", "Close")]
+        for name in sorted(self.wall):
+            summary = self.summary(name)
+            lines.append("{:^13}{:^8}{:^20}{:^20}{:^8.1f}{:^7}".format(
+                name, summary["moves"], "/".join("{:.1f}".format(t) for t in summary["wall"]),
+                "/".join("{:.1f}".format(t) for t in summary["cpu"]), summary["max"],
+                summary["close_calls"]))
+        if self.depth_times:
+            lines.append("")
+            lines.append("{:^13}{:^7}{:^8}{:^20}".format(
+                "Agent", "Depth", "Moves", "Done at " + header))
+            for name in sorted(self.depth_times):
+                for depth, times in sorted(self.depth_times[name].items()):
+                    lines.append("{:^13}{:^7}{:^8}{:^20}".format(
+                        name, depth, len(times),
+                        "/".join("{:.1f}".format(percentile(times, q))
+                                 for q in self.PERCENTILES)))
+        return "\n".join(lines)
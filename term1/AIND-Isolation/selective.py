@@ -0,0 +1,251 @@
+"""This file contains the selective search policies of the alpha-beta search
+in game_agent.py.  A uniform-depth search spends as many nodes on a move
+ordered last as on the principal variation, and as few on a forced line as
+on a quiet one.  A policy decides, for every child of a node, how deep to
+search it:
+
+- late move reductions: moves ordered late at a node rarely turn out to be
+  the best, so they are searched one ply shallower, with a null window.  A
+  reduced move that beats alpha anyway is verified at full depth;
+- mobility extensions: a player left with one or two moves is in a forced
+  line, where the game is often decided within a few plies, so the position
+  is searched one ply deeper.  Only positions with a single legal move are
+  extended by default: extending at two moves more than doubles the nodes
+  of a fixed-depth search, which costs more plies than it gains at fixed
+  time.
+
+A policy is any object with the `new_search()` and `child_depth()` methods
+and the `verify` attribute of `UniformDepth`, so alternative policies can be
+passed to `AlphaBetaPlayer` directly.
+
+The module can also be run to count the nodes a policy saves on searches to
+a fixed depth, and how often it changes the move chosen:
+
+    python selective.py --positions 40 --depth 6
+"""
+import argparse
+import random
+import timeit
+
+from isolation import BitBoard
+from game_agent import AlphaBetaPlayer, custom_score
+
+
+class UniformDepth:
+    """Search every child one ply shallower than its parent.
+
+    Attributes
+    ----------
+    verify : bool
+        If True, a reduced move whose null-window search beats alpha is
+        searched again with a null window at full depth before it is given
+        a full-window search, so the costly search is only made for moves
+        that still beat alpha without the reduction. If False, such moves
+        go straight to the full-window, full-depth search.
+
+    reductions : int
+        The number of moves searched with a reduced depth since the last
+        call to `new_search()`.
+
+    re_searches : int
+        The number of reduced moves that had to be searched again at full
+        depth.
+
+    extensions : int
+        The number of moves searched with an extended depth.
+    """
+
+    verify = True
+
+    def __init__(self):
+        self.new_search()
+
+    def new_search(self):
+        """Called once at the start of each move selection. """
+        self.reductions = 0
+        self.re_searches = 0
+        self.extensions = 0
+
+    def child_depth(self, game, depth, index, ply, root_depth):
+        """Return the depth to search a child to, and the number of plies
+        it was reduced by.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The position after the move, with the player to move at the
+            child holding the initiative.
+
+        depth : int
+            The remaining search depth at the parent.
+
+        index : int
+            The position of the move in the ordered moves of the parent, or
+            0 if the move is searched with the full window (e.g., when no
+            move has raised alpha yet); such moves must not be reduced.
+
+        ply : int
+            The distance of the child from the root of the search.
+
+        root_depth : int
+            The depth of the current iteration.
+
+        Returns
+        -------
+        (int, int)
+            The depth of the child search and the reduction applied (0 if
+            the child is not reduced).
+        """
+        return depth - 1, 0
+
+    def stats(self):
+        """Return the counters as a dict. """
+        return {
+            "reductions": self.reductions,
+            "re_searches": self.re_searches,
+            "extensions": self.extensions,
+        }
+
+
+class SelectiveDepth(UniformDepth):
+    """Reduce moves ordered late and extend positions with low mobility.
+
+    Parameters
+    ----------
+    reduce_after : int (optional)
+        Moves at this position or later in the ordered moves of a node are
+        reduced; the earlier ones (the transposition table move and the
+        killer moves, with the default orderer) are not.
+
+    reduction : int (optional)
+        The number of plies a late move is reduced by.
+
+    min_reduce_depth : int (optional)
+        Moves are only reduced at nodes with at least this remaining depth,
+        so that a reduced move is never searched to depth 0 directly.
+
+    extend_mobility : int (optional)
+        Positions in which the player to move has this many legal moves or
+        fewer (but at least one) are extended by one ply.
+
+    max_extension_ply : float (optional)
+        Positions are only extended within this multiple of the iteration
+        depth from the root, which bounds the depth of forced lines.
+
+    verify : bool (optional)
+        See `UniformDepth.verify`.
+    """
+
+    def __init__(self, reduce_after=3, reduction=1, min_reduce_depth=3, extend_mobility=1,
+                 max_extension_ply=1.5, verify=True):
+        super().__init__()
+        self.reduce_after = reduce_after
+        self.reduction = reduction
+        self.min_reduce_depth = min_reduce_depth
+        self.extend_mobility = extend_mobility
+        self.max_extension_ply = max_extension_ply
+        self.verify = verify
+
+    def child_depth(self, game, depth, index, ply, root_depth):
+        if ply < self.max_extension_ply * root_depth and depth > 1:
+            if 0 < game.mobility() <= self.extend_mobility:
+                self.extensions += 1
+                return depth, 0
+        if index >= self.reduce_after and depth >= self.min_reduce_depth:
+            reduction = min(self.reduction, depth - 2)
+            self.reductions += 1
+            return depth - 1 - reduction, reduction
+        return depth - 1, 0
+
+
+def search_nodes(positions, depth, make_player):
+    """Search every position to a fixed depth with a fresh player.
+
+    Returns
+    -------
+    (list<(int, int)>, int, float, dict)
+        The move chosen in each position, the total number of nodes
+        visited, the seconds taken and the totals of the policy counters.
+    """
+    moves = []
+    nodes = 0
+    counters = {}
+    start = timeit.default_timer()
+    for moves_played in positions:
+        player = make_player()
+        game = BitBoard(player, "Opponent", shuffle=False)
+        if len(moves_played) % 2:
+            game = BitBoard("Opponent", player, shuffle=False)
+        for move in moves_played:
+            game.apply_move(move)
+        player.time_left = lambda: float("inf")
+        move = (-1, -1)
+        for iteration in range(1, depth + 1):
+            move = player.alphabeta(game, iteration)
+            if abs(player.root_score) == float("inf"):
+                break
+        # The node count of a player runs over all the iterations of a move
+        nodes += player.nodes
+        moves.append(move)
+        if player.selector is not None:
+            for name, value in player.selector.stats().items():
+                counters[name] = counters.get(name, 0) + value
+    return moves, nodes, timeit.default_timer() - start, counters
+
+
+def random_positions(count, plies, seed=None):
+    """Return the moves of `count` random games played for `plies` plies
+    (or until the player to move would have no moves).
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        game = BitBoard("Player1", "Player2", shuffle=False)
+        moves = []
+        for _ in range(plies):
+            legal_moves = game.get_legal_moves()
+            if not legal_moves:
+                break
+            move = rng.choice(legal_moves)
+            moves.append(move)
+            game.apply_move(move)
+        if game.get_legal_moves():
+            positions.append(moves)
+    return positions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count the nodes saved by selective search.")
+    parser.add_argument("--positions", type=int, default=40,
+                        help="number of random positions searched")
+    parser.add_argument("--plies", type=int, default=8,
+                        help="number of random moves played to reach each position")
+    parser.add_argument("--depth", type=int, default=6, help="iterative deepening depth")
+    parser.add_argument("--reduce-after", type=int, default=3)
+    parser.add_argument("--reduction", type=int, default=1)
+    parser.add_argument("--extend-mobility", type=int, default=1,
+                        help="extend positions with at most this many legal moves (0 for none)")
+    parser.add_argument("--no-verify", action="store_true",
+                        help="skip the null-window verification of reduced moves")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    positions = random_positions(args.positions, args.plies, args.seed)
+    uniform = search_nodes(positions, args.depth,
+                           lambda: AlphaBetaPlayer(score_fn=custom_score, endgame=False))
+    selective = search_nodes(positions, args.depth, lambda: AlphaBetaPlayer(
+        score_fn=custom_score, endgame=False, selector=SelectiveDepth(
+            args.reduce_after, args.reduction, extend_mobility=args.extend_mobility,
+            verify=not args.no_verify)))
+
+    print("{:^12}{:^12}{:^10}".format("Search", "Nodes", "Seconds"))
+    for name, (_, nodes, seconds, _) in (("uniform", uniform), ("selective", selective)):
+        print("{:^12}{:^12}{:^10.2f}".format(name, nodes, seconds))
+    print("Nodes saved: {:.1f}%".format(100. * (1 - selective[1] / uniform[1])))
+    print("Same move chosen: {} of {}".format(
+        sum(a == b for a, b in zip(uniform[0], selective[0])), len(positions)))
+    print(", ".join("{}: {}".format(name, value) for name, value in sorted(selective[3].items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""Generate games between the agents of sample_players.py and game_agent.py
+and store them in a compact binary format, as training data for heuristic
+tuning and opening books.
+
+Games are saved as a small header followed by fixed-size records, so that a
+file can be memory-mapped and any record read at a known offset without
+parsing the ones before it:
+
+    header : magic (8 bytes), width, height (1 byte each), padding (2)
+    record : number of moves (1 byte), winner (1), termination (1), then
+             the cell index (see `isolation.geometry`) of every move, one
+             byte each, padded with 0xff to width * height moves
+
+On boards with more than 255 cells, the number of moves and the cell indexes
+take two bytes each (little-endian), and moves are padded with 0xffff.
+
+The winner is 0 if the player that moved first won the game and 1
+otherwise. The moves include the random opening moves of the game.
+
+Usage:
+
+    python selfplay.py --games 100000 --agents AB_Improved AB_Custom \\
+        --depth 3 --processes 4 --output games.bin
+"""
+import argparse
+import mmap
+import os
+import random
+import struct
+import timeit
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from isolation import BitBoard
+from sample_players import (RandomPlayer, GreedyPlayer, open_move_score, improved_score,
+                            center_score)
+from game_agent import (MinimaxPlayer, AlphaBetaPlayer, custom_score, custom_score_2,
+                        custom_score_3)
+
+MAGIC = b"ISOGAME1"
+HEADER = struct.Struct("<8sBBxx")
+PADDING = {"B": 0xff, "H": 0xffff}
+
+# Termination codes stored in the records. A game that ends normally is
+# reported as an illegal move by `isolation.Board.play()`, since the loser
+# returns (-1, -1) when it has no legal moves.
+TERMINATIONS = ("illegal move", "timeout", "forfeit")
+
+AGENTS = {
+    "Random": lambda: RandomPlayer(),
+    "Greedy_Open": lambda: GreedyPlayer(score_fn=open_move_score),
+    "Greedy_Improved": lambda: GreedyPlayer(score_fn=improved_score),
+    "MM_Open": lambda: MinimaxPlayer(score_fn=open_move_score),
+    "MM_Center": lambda: MinimaxPlayer(score_fn=center_score),
+    "MM_Improved": lambda: MinimaxPlayer(score_fn=improved_score),
+    "AB_Open": lambda: AlphaBetaPlayer(score_fn=open_move_score),
+    "AB_Center": lambda: AlphaBetaPlayer(score_fn=center_score),
+    "AB_Improved": lambda: AlphaBetaPlayer(score_fn=improved_score),
+    "AB_Custom": lambda: AlphaBetaPlayer(score_fn=custom_score),
+    "AB_Custom_2": lambda: AlphaBetaPlayer(score_fn=custom_score_2),
+    "AB_Custom_3": lambda: AlphaBetaPlayer(score_fn=custom_score_3),
+}
+
+GameRecord = namedtuple("GameRecord", ["moves", "winner", "termination"])
+
+
+def cell_format(width, height):
+    """Return the `struct` format character of the cell indexes and of the
+    number of moves in the records for a board size.
+    """
+    return "B" if width * height <= 0xff else "H"
+
+
+def record_struct(width, height):
+    """Return the `struct.Struct` of the records for a board size. """
+    return struct.Struct("<{0}BB{1}{0}".format(cell_format(width, height), width * height))
+
+
+def encode_game(moves, winner, termination, width=7, height=7):
+    """Pack a game into a record.
+
+    Parameters
+    ----------
+    moves : list<int>
+        The cell index of every move of the game.
+
+    winner : int
+        0 if the player that moved first won, 1 otherwise.
+
+    termination : str
+        One of `TERMINATIONS`.
+    """
+    padding = [PADDING[cell_format(width, height)]] * (width * height - len(moves))
+    return record_struct(width, height).pack(len(moves), winner,
+                                             TERMINATIONS.index(termination),
+                                             *(list(moves) + padding))
+
+
+def fixed_depth_move(player, game, depth):
+    """Return the move of a player searching to a fixed depth, regardless of
+    time. Players that do not search choose their move as usual.
+    """
+    player.time_left = lambda: float("inf")
+    if isinstance(player, AlphaBetaPlayer):
+        move = (-1, -1)
+        for iteration in range(1, depth + 1):
+            move = player.alphabeta(game, iteration)
+            if abs(player.root_score) == float("inf"):
+                break
+        return move
+    if isinstance(player, MinimaxPlayer):
+        return player.minimax(game, depth)
+    return player.get_move(game, player.time_left)
+
+
+def play_game(game, moves, time_limit=150, depth=None):
+    """Play a game to the end as `isolation.Board.play()` does, recording
+    the moves as cell indexes.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The position to play from.
+
+    moves : list<int>
+        The cell indexes of the moves played to reach the position; the
+        moves of the game are appended to it.
+
+    time_limit : numeric (optional)
+        The maximum number of milliseconds allowed for each move.
+
+    depth : int (optional)
+        If given, the search agents search to this fixed depth instead, and
+        the time limit is not applied.
+
+    Returns
+    -------
+    (list<int>, int, str)
+        The moves of the game, 0 if the player that moved first won or 1
+        otherwise, and the reason the game ended.
+    """
+    height = game.height
+    while True:
+        legal_moves = game.get_legal_moves()
+        player = game.active_player
+        loser = game.move_count % 2
+        if depth is None:
+            move_start = timeit.default_timer()
+            time_left = lambda: time_limit - 1000 * (timeit.default_timer() - move_start)
+            move = player.get_move(game.copy(), time_left)
+            if time_left() < 0:
+                return moves, 1 - loser, "timeout"
+        else:
+            move = fixed_depth_move(player, game.copy(), depth)
+        if move not in legal_moves:
+            return moves, 1 - loser, "forfeit" if legal_moves else "illegal move"
+        moves.append(move[0] + move[1] * height)
+        game.apply_move(move)
+
+
+def play_batch(agents, count, seed, time_limit=150, depth=None, opening=2, width=7,
+               height=7):
+    """Play a batch of games between randomly drawn agents, each opened with
+    random moves.
+
+    This function runs in worker processes, so every batch draws from its
+    own reproducible random stream given by `seed`.
+
+    Returns
+    -------
+    bytes
+        The records of the games.
+    """
+    rng = random.Random(seed)
+    random.seed(seed)
+    # Two instances of each agent, so that an agent can play itself
+    players = {name: (AGENTS[name](), AGENTS[name]()) for name in set(agents)}
+    records = []
+    for _ in range(count):
+        player_1 = players[rng.choice(agents)][0]
+        player_2 = players[rng.choice(agents)][1]
+        game = BitBoard(player_1, player_2, width, height, seed=rng.getrandbits(32))
+        moves = []
+        for _ in range(opening):
+            legal_moves = game.get_legal_moves()
+            if not legal_moves:
+                break
+            move = rng.choice(legal_moves)
+            moves.append(move[0] + move[1] * height)
+            game.apply_move(move)
+        moves, winner, termination = play_game(game, moves, time_limit, depth)
+        records.append(encode_game(moves, winner, termination, width, height))
+    return b"".join(records)
+
+
+def open_games(path, width=7, height=7):
+    """Open a game file for appending records, writing the header if the
+    file is new.
+
+    Raises
+    ------
+    ValueError
+        If the file exists and is not a game file for the given board size.
+    """
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with GameRecords(path) as records:
+            if (records.width, records.height) != (width, height):
+                raise ValueError("{} holds games on a {}x{} board".format(
+                    path, records.width, records.height))
+        return open(path, "ab")
+    f = open(path, "wb")
+    f.write(HEADER.pack(MAGIC, width, height))
+    return f
+
+
+def generate(path, games, agents, time_limit=150, depth=None, opening=2, width=7,
+             height=7, seed=None, batch=100, executor=None):
+    """Play games and append their records to a file, in worker processes
+    if an executor is given.
+
+    Returns
+    -------
+    int
+        The number of games written.
+    """
+    rng = random.Random(seed)
+    counts = [min(batch, games - start) for start in range(0, games, batch)]
+    args = (counts, [rng.getrandbits(32) for _ in counts])
+    constants = (time_limit, depth, opening, width, height)
+    args += tuple([value] * len(counts) for value in constants)
+    agents = [list(agents)] * len(counts)
+    results = (executor.map(play_batch, agents, *args) if executor
+               else map(play_batch, agents, *args))
+    written = 0
+    with open_games(path, width, height) as f:
+        for count, records in zip(counts, results):
+            f.write(records)
+            written += count
+    return written
+
+
+class GameRecords(object):
+    """Read-only, memory-mapped view of a game file written by `generate()`.
+
+    Records are read from the map when they are accessed, so files larger
+    than memory can be scanned, and any record is found in constant time.
+
+    Parameters
+    ----------
+    path : str
+        The game file to open.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a game file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError("Not a game file: {}".format(path))
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise ValueError("Not a game file: {}".format(path))
+        magic, self.width, self.height = HEADER.unpack_from(self._map)
+        self._record = record_struct(self.width, self.height)
+        if magic != MAGIC or (len(self._map) - HEADER.size) % self._record.size:
+            self.close()
+            raise ValueError("Not a game file: {}".format(path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return (len(self._map) - HEADER.size) // self._record.size
+
+    def __getitem__(self, index):
+        """Return the `GameRecord` of a game, with its moves as (row, column)
+        tuples.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("game index out of range")
+        fields = self._record.unpack_from(self._map, HEADER.size + index * self._record.size)
+        length, winner, termination = fields[:3]
+        moves = [(idx % self.height, idx // self.height) for idx in fields[3:3 + length]]
+        return GameRecord(moves, winner, TERMINATIONS[termination])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self):
+        """Release the map and the file. """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def as_array(self):
+        """Return the records as a NumPy structured array mapped on the file,
+        with fields length, winner, termination and moves (the padded cell
+        indexes). Requires NumPy.
+        """
+        import numpy as np
+        cell = np.uint8 if cell_format(self.width, self.height) == "B" else np.dtype("<u2")
+        dtype = np.dtype([("length", cell), ("winner", np.uint8),
+                          ("termination", np.uint8),
+                          ("moves", cell, (self.width * self.height,))])
+        return np.memmap(self.path, dtype=dtype, mode="r", offset=HEADER.size,
+                         shape=(len(self),))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate Isolation games.")
+    parser.add_argument("--games", type=int, default=1000, help="number of games to play")
+    parser.add_argument("--agents", nargs="+", choices=sorted(AGENTS), default=["AB_Improved"],
+                        help="agents drawn at random for each seat of every game")
+    parser.add_argument("--time-limit", type=float, default=150,
+                        help="milliseconds allowed for each move")
+    parser.add_argument("--depth", type=int, default=None,
+                        help="search to this fixed depth instead of using a time limit")
+    parser.add_argument("--opening", type=int, default=2,
+                        help="number of random moves opening every game")
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--batch", type=int, default=100,
+                        help="number of games played by a worker at a time")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="number of worker processes (0 uses every CPU)")
+    parser.add_argument("--output", default="games.bin",
+                        help="game file, appended to if it exists")
+    args = parser.parse_args()
+
+    start = timeit.default_timer()
+    executor = None
+    if args.processes != 1:
+        executor = ProcessPoolExecutor(args.processes or os.cpu_count())
+    try:
+        written = generate(args.output, args.games, args.agents, args.time_limit,
+                           args.depth, args.opening, args.width, args.height, args.seed,
+                           args.batch, executor)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    elapsed = timeit.default_timer() - start
+    print("Wrote {} games to {} in {:.1f}s ({:.1f} games/s)".format(
+        written, args.output, elapsed, written / elapsed))
+
+
+if __name__ == "__main__":
+    main()
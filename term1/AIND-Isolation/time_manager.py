@@ -0,0 +1,166 @@
+"""This file contains the clock used by the search agents in game_agent.py.
+
+Reading the clock at every node of the search is a measurable share of the
+time spent in a node, so `TimeManager` only reads it every `interval` nodes.
+The interval is recalibrated at every reading from the node rate measured
+since the previous one, so that readings stay about `check_ms` milliseconds
+apart whatever the speed of the heuristic and of the board representation,
+and it drops back to a reading per node as the deadline gets close.
+
+The manager also times the iterations of iterative deepening and predicts
+the time of the next one from the growth between the last two, so the search
+does not start an iteration it cannot finish: an unfinished iteration is
+thrown away, so the time it would take is better left on the clock.
+
+Node rates and iteration times are measured on a clock of their own rather
+than from the differences between readings of `time_left`, so they stay
+right when the deadline behind `time_left` is moved during a search (as in
+pondering, see `game_agent.AlphaBetaPlayer.ponder_result()`).
+"""
+import timeit
+
+
+class TimeManager:
+    """Decide when a search must stop.
+
+    Parameters
+    ----------
+    threshold : float
+        The search stops when fewer than this many milliseconds are left.
+
+    check_ms : float (optional)
+        The target time in milliseconds between two readings of the clock.
+
+    max_interval : int (optional)
+        The maximum number of nodes between two readings of the clock.
+
+    max_growth : float (optional)
+        The largest ratio assumed between the times of two consecutive
+        iterations when predicting the time of the next one.
+
+    confidence : float (optional)
+        An iteration is skipped only if this fraction of its predicted time
+        exceeds the time left; predictions are often off by a factor of two
+        either way, and skipping an iteration that would have completed
+        costs a ply of search.
+
+    timer : callable (optional)
+        Returns the current time in seconds, for measuring elapsed times.
+
+    Attributes
+    ----------
+    interval : int
+        The current number of nodes between two readings of the clock.
+
+    checks : int
+        The number of times the clock was read since the last `start()`.
+
+    iteration_times : list<float>
+        The milliseconds spent in each iteration since the last `start()`.
+    """
+
+    def __init__(self, threshold, check_ms=0.5, max_interval=4096, max_growth=16.,
+                 confidence=0.5, timer=timeit.default_timer):
+        self.threshold = threshold
+        self.check_ms = check_ms
+        self.max_interval = max_interval
+        self.max_growth = max_growth
+        self.confidence = confidence
+        self.timer = timer
+        self.interval = 1
+        self.countdown = 0
+        self.checks = 0
+        self.iteration_times = []
+        self._time_left = None
+        self._last = None
+        self._iteration_start = None
+
+    def __getstate__(self):
+        """Leave the clock behind when the manager is pickled. """
+        state = self.__dict__.copy()
+        state["_time_left"] = None
+        state["_last"] = None
+        return state
+
+    def start(self, time_left):
+        """Start timing a new move.
+
+        The interval calibrated during the previous move is kept, as the
+        node rate changes little from one move to the next.
+        """
+        self._time_left = time_left
+        self._last = self._iteration_start = 1000. * self.timer()
+        self.countdown = self.interval
+        self.checks = 0
+        self.iteration_times = []
+
+    def expired(self, time_left):
+        """Called once per search node; return True if the search must stop.
+
+        Parameters
+        ----------
+        time_left : callable
+            The clock of the current move. A clock other than the one given
+            to `start()` is read at once, and the interval is not calibrated
+            against it.
+        """
+        self.countdown -= 1
+        if self.countdown > 0 and time_left is self._time_left:
+            return False
+        return self.check(time_left)
+
+    def check(self, time_left):
+        """Read the clock, return True if the search must stop, and
+        recalibrate the interval until the next reading.
+        """
+        remaining = time_left()
+        self.checks += 1
+        slack = remaining - self.threshold
+        if slack < 0:
+            return True
+
+        now = 1000. * self.timer()
+        interval = self.interval
+        if time_left is self._time_left and self._last is not None:
+            elapsed = now - self._last
+            if elapsed > 0:
+                # Nodes per millisecond times the milliseconds between checks
+                rate = self.interval / elapsed
+                interval = min(int(rate * min(self.check_ms, slack / 2)), 2 * self.interval)
+            else:
+                interval = 2 * self.interval
+        else:
+            interval = 1
+        if slack < 2 * self.check_ms:
+            interval = 1
+
+        self._time_left = time_left
+        self._last = now
+        self.interval = self.countdown = max(1, min(interval, self.max_interval))
+        return False
+
+    def iteration_done(self):
+        """Record that an iteration of iterative deepening has completed. """
+        now = 1000. * self.timer()
+        self.iteration_times.append(now - self._iteration_start)
+        self._iteration_start = now
+
+    def predict_next(self):
+        """Return the predicted milliseconds needed for the next iteration,
+        or 0 if there are too few iterations to tell.
+
+        The time of the last iteration is multiplied by its average growth
+        over the last two iterations, which smooths out the alternation
+        between odd and even depths of alpha-beta search.
+        """
+        times = self.iteration_times
+        if len(times) < 2 or min(times[-3:]) <= 0:
+            return 0.
+        growth = (times[-1] / times[-3]) ** 0.5 if len(times) > 2 else times[-1] / times[-2]
+        return times[-1] * min(max(growth, 1.), self.max_growth)
+
+    def can_start_next(self):
+        """Return False if the next iteration is not expected to complete
+        before the search has to stop.
+        """
+        return self._time_left() - self.threshold > self.confidence * self.predict_next()
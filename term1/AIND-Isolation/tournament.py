@@ -11,17 +11,23 @@ players, and the players play each match twice -- once as the first player and
 once as the second player.  Randomizing the openings and switching the player
 order corrects for imbalances due to both starting position and initiative.
 """
+import argparse
 import itertools
+import json
+import os
 import random
 import warnings
 
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 
-from isolation import Board
+from isolation import BitBoard
 from sample_players import (RandomPlayer, open_move_score,
                             improved_score, center_score)
 from game_agent import (MinimaxPlayer, AlphaBetaPlayer, custom_score,
                         custom_score_2, custom_score_3)
+from rating import bootstrap_intervals, fit_bradley_terry, sprt
+from search_stats import MoveTimes, SearchStats
 
 NUM_MATCHES = 5  # number of matches against each opponent
 TIME_LIMIT = 150  # number of milliseconds before timeout
@@ -37,48 +43,192 @@ game_agent.py.
 Agent = namedtuple("Agent", ["player", "name"])
 
 
-def play_round(cpu_agent, test_agents, win_counts, num_matches):
+def play_game(game, time_limit=TIME_LIMIT, seed=None):
+    """Play a single game to completion and report the outcome.
+
+    This function runs in worker processes when the tournament is played in
+    parallel, so it identifies the winner by position rather than returning
+    the (copied) player object.
+
+    Parameters
+    ----------
+    game : isolation.Board
+        A board with the opening moves already applied.
+
+    time_limit : numeric (optional)
+        The maximum number of milliseconds allowed for each move.
+
+    seed : int (optional)
+        If given, seed the global random number generator (used e.g. by
+        RandomPlayer) before playing so that every game -- and every worker
+        process -- draws from its own reproducible stream.
+
+    Returns
+    -------
+    (int, str, list, list)
+        0 if the player holding the initiative at the start of the game won,
+        1 otherwise, the reason the game ended, for each player the per-move
+        search statistics it collected during the game (None for players
+        without a stats collector), and for each player the wall-clock and
+        CPU milliseconds of each of its moves.
+    """
+    if seed is not None:
+        random.seed(seed)
+    players = (game.active_player, game.inactive_player)
+    collectors = [getattr(player, "stats", None) for player in players]
+    for stats in collectors:
+        if stats is not None:
+            stats.reset()
+    timings = []
+    winner, _, termination = game.play(time_limit=time_limit, timings=timings)
+    move_stats = [stats.moves if stats is not None else None for stats in collectors]
+    move_times = [[(round(wall, 3), round(cpu, 3)) for seat, wall, cpu in timings
+                   if seat == idx] for idx in (0, 1)]
+    return int(winner is players[1]), termination, move_stats, move_times
+
+
+def apply_opening(games, rng):
+    """Initialize all games with the same random move and response. """
+    for _ in range(2):
+        move = rng.choice(games[0].get_legal_moves())
+        for game in games:
+            game.apply_move(move)
+
+
+def play_games(games, rng, seeded=False, executor=None, log=None):
+    """Play a list of games, in worker processes if an executor is given.
+
+    Every game is given its own seed drawn from `rng` when the run is seeded
+    or played in parallel, so that worker processes never share a random
+    stream. If a `GameLog` is given, the search statistics and the move
+    times of each game are written to it.
+
+    Returns
+    -------
+    list<(object, str)>
+        The winning player object and the termination reason of each game.
+    """
+    players = [(game.active_player, game.inactive_player) for game in games]
+    if seeded or executor is not None:
+        game_seeds = [rng.getrandbits(32) for _ in games]
+    else:
+        game_seeds = [None] * len(games)
+    if executor is None:
+        results = [play_game(game, TIME_LIMIT, game_seed)
+                   for game, game_seed in zip(games, game_seeds)]
+    else:
+        results = executor.map(play_game, games, [TIME_LIMIT] * len(games),
+                               game_seeds)
+    outcomes = []
+    for pair, (winner_idx, termination, move_stats, move_times) in zip(players, results):
+        outcomes.append((pair[winner_idx], termination))
+        if log is not None:
+            log.write(pair, pair[winner_idx], termination, move_stats, move_times)
+    return outcomes
+
+
+def play_round(cpu_agent, test_agents, win_counts, num_matches, seed=None,
+               executor=None, log=None):
     """Compare the test agents to the cpu agent in "fair" matches.
 
     "Fair" matches use random starting locations and force the agents to
     play as both first and second player to control for advantages resulting
     from choosing better opening moves or having first initiative to move.
+
+    If a seed is given, the openings and the move order of every board are
+    drawn from a generator with that seed so that the round is reproducible.
+    If an executor is given, the games are played in its worker processes.
     """
+    rng = random.Random(seed) if seed is not None else random
     timeout_count = 0
     forfeit_count = 0
+    games = []
     for _ in range(num_matches):
 
-        games = sum([[Board(cpu_agent.player, agent.player),
-                      Board(agent.player, cpu_agent.player)]
-                    for agent in test_agents], [])
+        board_seed = rng.getrandbits(32) if seed is not None else None
+        match = sum([[BitBoard(cpu_agent.player, agent.player, seed=board_seed),
+                      BitBoard(agent.player, cpu_agent.player, seed=board_seed)]
+                     for agent in test_agents], [])
 
-        # initialize all games with a random move and response
-        for _ in range(2):
-            move = random.choice(games[0].get_legal_moves())
-            for game in games:
-                game.apply_move(move)
+        apply_opening(match, rng)
+        games.extend(match)
 
-        # play all games and tally the results
-        for game in games:
-            winner, _, termination = game.play(time_limit=TIME_LIMIT)
-            win_counts[winner] += 1
+    # play all games and tally the results
+    results = play_games(games, rng, seed is not None, executor, log)
+    for winner, termination in results:
+        win_counts[winner] += 1
 
         if termination == "timeout":
             timeout_count += 1
-        elif winner not in test_agents and termination == "forfeit":
+        elif winner == cpu_agent.player and termination == "forfeit":
             forfeit_count += 1
 
     return timeout_count, forfeit_count
 
 
+class GameLog:
+    """Write the search statistics of every game as JSON lines, one line per
+    agent per game, for agents created with a `SearchStats` collector, and
+    gather the move times of every agent.
+
+    Parameters
+    ----------
+    stream : file-like object or None
+        The stream the JSON lines are written to, if any.
+
+    agents : list<Agent>
+        The agents playing the games. Agents sharing a name are told apart
+        by a suffix ("AB_Improved#2") in the records and the move times.
+
+    times : `search_stats.MoveTimes` (optional)
+        If given, the move times and search depth times of every agent are
+        added to it.
+    """
+
+    def __init__(self, stream, agents, times=None):
+        self.stream = stream
+        self.names = {}
+        counts = {}
+        for agent in agents:
+            counts[agent.name] = counts.get(agent.name, 0) + 1
+            self.names[agent.player] = (agent.name if counts[agent.name] == 1 else
+                                        "{}#{}".format(agent.name, counts[agent.name]))
+        self.times = times
+        self.games = 0
+
+    def write(self, players, winner, termination, move_stats, move_times=None):
+        self.games += 1
+        for seat, (player, moves) in enumerate(zip(players, move_stats)):
+            if self.times is not None and move_times is not None:
+                self.times.add(self.names[player], move_times[seat], moves)
+            if moves is None or self.stream is None:
+                continue
+            record = {
+                "game": self.games,
+                "agent": self.names[player],
+                "opponent": self.names[players[1 - seat]],
+                "seat": seat,
+                "won": winner is player,
+                "termination": termination,
+                "moves": moves,
+            }
+            if move_times is not None:
+                record["times"] = move_times[seat]
+            self.stream.write(json.dumps(record) + "\n")
+        if self.stream is not None:
+            self.stream.flush()
+
+
 def update(total_wins, wins):
     for player in total_wins:
         total_wins[player] += wins[player]
     return total_wins
 
 
-def play_matches(cpu_agents, test_agents, num_matches):
+def play_matches(cpu_agents, test_agents, num_matches, seed=None, executor=None,
+                 log=None):
     """Play matches between the test agent and each cpu_agent individually. """
+    rng = random.Random(seed) if seed is not None else None
     total_wins = {agent.player: 0 for agent in test_agents}
     total_timeouts = 0.
     total_forfeits = 0.
@@ -99,7 +249,9 @@ def play_matches(cpu_agents, test_agents, num_matches):
 
         print("{!s:^9}{:^13}".format(idx + 1, agent.name), end="", flush=True)
 
-        counts = play_round(agent, test_agents, wins, num_matches)
+        round_seed = rng.getrandbits(32) if rng is not None else None
+        counts = play_round(agent, test_agents, wins, num_matches, round_seed,
+                            executor, log)
         total_timeouts += counts[0]
         total_forfeits += counts[1]
         total_wins = update(total_wins, wins)
@@ -126,33 +278,160 @@ def play_matches(cpu_agents, test_agents, num_matches):
                "legal moves available to play.\n").format(total_forfeits))
 
 
+def play_ratings(agents, max_games, seed=None, executor=None, batch=1,
+                 elo_margin=50., error_rate=0.05, log=None):
+    """Rate a collection of agents in a round-robin tournament.
+
+    Every pairing plays pairs of "fair" games (the same random opening with
+    each agent moving first once) in batches of `batch` pairs until an SPRT
+    between "the first agent is `elo_margin` Elo stronger" and "... weaker"
+    is decided or `max_games` games have been played.  Bradley-Terry
+    ratings with bootstrap confidence intervals are then fitted to all the
+    results.
+    """
+    rng = random.Random(seed)
+    results = {}
+    totals = {}
+    decisions = {}
+    pending = list(itertools.combinations(agents, 2))
+
+    print("\n{:^13}{:^13}{:^9}{:^9}{:^9}{:^10}".format(
+        "Agent", "Opponent", "Won", "Lost", "LLR", "SPRT"))
+    while pending:
+        games = []
+        for agent_a, agent_b in pending:
+            for _ in range(batch):
+                board_seed = rng.getrandbits(32)
+                pair = [BitBoard(agent_a.player, agent_b.player, seed=board_seed),
+                        BitBoard(agent_b.player, agent_a.player, seed=board_seed)]
+                apply_opening(pair, rng)
+                games.extend(pair)
+
+        outcomes = iter(play_games(games, rng, True, executor, log))
+        still_pending = []
+        for agent_a, agent_b in pending:
+            key = (agent_a.name, agent_b.name)
+            for _ in range(2 * batch):
+                winner, _ = next(outcomes)
+                if winner is agent_a.player:
+                    results[key] = results.get(key, 0) + 1
+                else:
+                    results[key[::-1]] = results.get(key[::-1], 0) + 1
+                totals[key] = totals.get(key, 0) + 1
+
+            won = results.get(key, 0)
+            llr, decision = sprt(won, totals[key] - won, -elo_margin, elo_margin,
+                                 error_rate, error_rate)
+            if decision is None and totals[key] < max_games:
+                still_pending.append((agent_a, agent_b))
+                continue
+            decisions[key] = decision
+            print("{:^13}{:^13}{:^9}{:^9}{:^9.2f}{:^10}".format(
+                agent_a.name, agent_b.name, won, totals[key] - won, llr,
+                {"H1": "stronger", "H0": "weaker"}.get(decision, "-")), flush=True)
+        pending = still_pending
+
+    names = [agent.name for agent in agents]
+    ratings = fit_bradley_terry(names, results)
+    intervals = bootstrap_intervals(names, results, totals, seed=seed)
+
+    played = {name: 0 for name in names}
+    for (a, b), n in totals.items():
+        played[a] += n
+        played[b] += n
+
+    print("-" * 74)
+    print("{:^13}{:^9}{:^21}{:^9}".format("Agent", "Elo", "95% CI", "Games"))
+    for name in sorted(names, key=ratings.get, reverse=True):
+        print("{:^13}{:^+9.0f}{:^21}{:^9}".format(
+            name, ratings[name],
+            "[{:+.0f}, {:+.0f}]".format(*intervals[name]), played[name]))
+    return ratings, intervals, decisions
+
+
 def main():
 
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("-s", "--seed", type=int, default=None,
+                        help="seed the openings and move generation so that " +
+                        "the tournament is reproducible")
+    parser.add_argument("-n", "--num-matches", type=int, default=NUM_MATCHES,
+                        help="number of matches against each opponent")
+    parser.add_argument("-p", "--processes", type=int, default=1,
+                        help="number of worker processes used to play games " +
+                        "in parallel (0 uses every CPU)")
+    parser.add_argument("-r", "--rating", action="store_true",
+                        help="rate every agent in a round-robin with " +
+                        "Bradley-Terry Elo ratings and SPRT early stopping")
+    parser.add_argument("--max-games", type=int, default=200,
+                        help="maximum number of games per pairing in " +
+                        "rating mode")
+    parser.add_argument("--elo-margin", type=float, default=50.,
+                        help="Elo difference tested by the SPRT in rating mode")
+    parser.add_argument("--stats", metavar="FILE", default=None,
+                        help="write per-move search statistics of every " +
+                        "game to FILE as JSON lines")
+    parser.add_argument("--latency", action="store_true",
+                        help="report percentiles of the time every agent " +
+                        "takes per move and per search depth")
+    args = parser.parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    # Give every search agent its own statistics collector if requested
+    stats = SearchStats if args.stats or args.latency else lambda: None
+
     # Define two agents to compare -- these agents will play from the same
     # starting position against the same adversaries in the tournament
     test_agents = [
-        Agent(AlphaBetaPlayer(score_fn=improved_score), "AB_Improved"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score), "AB_Custom"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score_2), "AB_Custom_2"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score_3), "AB_Custom_3")
+        Agent(AlphaBetaPlayer(score_fn=improved_score, stats=stats()), "AB_Improved"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score, stats=stats()), "AB_Custom"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score_2, stats=stats()), "AB_Custom_2"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score_3, stats=stats()), "AB_Custom_3")
     ]
 
     # Define a collection of agents to compete against the test agents
     cpu_agents = [
          Agent(RandomPlayer(), "Random"),
-         Agent(MinimaxPlayer(score_fn=open_move_score), "MM_Open"),
-         Agent(MinimaxPlayer(score_fn=center_score), "MM_Center"),
-         Agent(MinimaxPlayer(score_fn=improved_score), "MM_Improved"),
-         Agent(AlphaBetaPlayer(score_fn=open_move_score), "AB_Open"),
-         Agent(AlphaBetaPlayer(score_fn=center_score), "AB_Center"),
-         Agent(AlphaBetaPlayer(score_fn=improved_score), "AB_Improved")
+         Agent(MinimaxPlayer(score_fn=open_move_score, stats=stats()), "MM_Open"),
+         Agent(MinimaxPlayer(score_fn=center_score, stats=stats()), "MM_Center"),
+         Agent(MinimaxPlayer(score_fn=improved_score, stats=stats()), "MM_Improved"),
+         Agent(AlphaBetaPlayer(score_fn=open_move_score, stats=stats()), "AB_Open"),
+         Agent(AlphaBetaPlayer(score_fn=center_score, stats=stats()), "AB_Center"),
+         Agent(AlphaBetaPlayer(score_fn=improved_score, stats=stats()), "AB_Improved")
     ]
 
     print(DESCRIPTION)
     print("{:^74}".format("*************************"))
     print("{:^74}".format("Playing Matches"))
     print("{:^74}".format("*************************"))
-    play_matches(cpu_agents, test_agents, NUM_MATCHES)
+    executor = None
+    if args.processes != 1:
+        executor = ProcessPoolExecutor(args.processes or os.cpu_count())
+    stats_file = open(args.stats, "w") if args.stats else None
+    times = MoveTimes(TIME_LIMIT) if args.latency else None
+    log = None
+    if stats_file is not None or times is not None:
+        log = GameLog(stats_file, test_agents + cpu_agents, times)
+    try:
+        if args.rating:
+            names = {agent.name for agent in test_agents}
+            agents = test_agents + [a for a in cpu_agents if a.name not in names]
+            play_ratings(agents, args.max_games, args.seed, executor,
+                         batch=args.processes or os.cpu_count(),
+                         elo_margin=args.elo_margin, log=log)
+        else:
+            play_matches(cpu_agents, test_agents, args.num_matches, args.seed,
+                         executor, log)
+        if times is not None:
+            print("\nMove times in milliseconds (close calls leave less than {:g} ms)\n"
+                  .format(times.margin))
+            print(times.report())
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if stats_file is not None:
+            stats_file.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,77 @@
+"""This file contains a fixed-size transposition table used by the search
+agents in game_agent.py to reuse the results of previously searched
+positions, both across iterative deepening depths and across different move
+orders that reach the same position.
+"""
+
+# Bound types describing how a stored value relates to the true minimax value
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class TranspositionTable:
+    """Bounded table of search results indexed by Zobrist key.
+
+    Each slot holds a single entry; a new entry for a different position
+    always replaces the old one, while an entry for the same position is
+    only replaced by a search of at least the same depth.
+
+    Parameters
+    ----------
+    size : int (optional)
+        The number of slots in the table.
+    """
+
+    def __init__(self, size=2 ** 16):
+        self.size = size
+        self.clear()
+
+    def clear(self):
+        """Remove every entry from the table. """
+        self._slots = [None] * self.size
+
+    def probe(self, key):
+        """Look up the entry stored for a position.
+
+        Parameters
+        ----------
+        key : int
+            The hash of the position (see `isolation.Board.hash()`).
+
+        Returns
+        -------
+        (int, int, float, (int, int)) or None
+            A tuple (depth, bound, value, best move) for the position, or
+            None if the position is not in the table.
+        """
+        entry = self._slots[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry[1:]
+        return None
+
+    def store(self, key, depth, bound, value, move):
+        """Record the result of searching a position.
+
+        Parameters
+        ----------
+        key : int
+            The hash of the position (see `isolation.Board.hash()`).
+
+        depth : int
+            The remaining search depth below the position.
+
+        bound : int
+            EXACT, LOWER or UPPER, depending on whether the search returned
+            the minimax value itself or failed high or low.
+
+        value : float
+            The value returned by the search.
+
+        move : (int, int)
+            The best move found from the position, or None.
+        """
+        slot = key % self.size
+        entry = self._slots[slot]
+        if entry is None or entry[0] != key or depth >= entry[1]:
+            self._slots[slot] = (key, depth, bound, value, move)
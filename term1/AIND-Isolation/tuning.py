@@ -0,0 +1,289 @@
+"""Tune the layer weights of `game_agent.custom_score` on stored games.
+
+The score of custom_score is linear in its weights: every legal move of a
+player counts its layer weight plus one for mobility, so the score is
+
+    sum over layers l of (weight_l + 1) * (own_l - opp_l)
+
+where own_l and opp_l are the numbers of legal moves of each player into
+layer l.  The tuner fits these coefficients by logistic regression of the
+game results on the position features (own_l - opp_l), in the manner of
+Texel tuning: the probability that the player to move goes on to win is
+modelled as sigmoid(K * score + tempo).
+
+The scale of a heuristic does not change the moves chosen by minimax, so K
+is first fitted with the current weights and then held fixed while the
+coefficients are fitted; the tuned weights come out on the scale of the
+current ones.  The tempo term absorbs the advantage of having the move and
+is not part of the emitted constants.
+
+Positions are read from game files written by selfplay.py.  Every position
+reduces to three small integers, so the workers return the number of
+positions and wins for each distinct feature vector, and the fit runs on
+these counts.  Games are assigned to the training or the validation set and
+positions are sampled with random streams seeded per chunk of games, so a
+seeded run gives the same result for any number of processes.
+
+Usage:
+
+    python tuning.py games.bin --processes 4 --seed 1
+"""
+import argparse
+import math
+import os
+import random
+
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from isolation.geometry import get_geometry
+from game_agent import CUSTOM_SCORE_WEIGHTS
+from selfplay import GameRecords
+
+LAYERS = 3
+
+
+def game_features(moves, winner, width, height, skip=2):
+    """Yield the features of every position of a game, and whether the
+    player to move in it won.
+
+    Parameters
+    ----------
+    moves : list<(int, int)>
+        The moves of the game.
+
+    winner : int
+        0 if the player that moved first won, 1 otherwise.
+
+    skip : int (optional)
+        The number of opening moves whose positions are not used (at least
+        the two placement moves).
+
+    Yields
+    ------
+    ((int, int, int), bool)
+        The difference between the numbers of legal moves of the player to
+        move and of its opponent into each layer, and True if the player to
+        move won. Positions in which a player has no legal move are skipped.
+    """
+    geometry = get_geometry(width, height)
+    layer_masks = [0] * LAYERS
+    for idx, layer in enumerate(geometry.layer):
+        layer_masks[layer] |= 1 << idx
+    cells = [r + c * height for r, c in moves]
+    free = geometry.full_mask
+    for ply, idx in enumerate(cells):
+        if ply >= max(skip, 2):
+            own = geometry.knight_masks[cells[ply - 2]] & free
+            opp = geometry.knight_masks[cells[ply - 1]] & free
+            if own and opp:
+                features = tuple(bin(own & mask).count("1") - bin(opp & mask).count("1")
+                                 for mask in layer_masks)
+                yield features, ply % 2 == winner
+        free &= ~(1 << idx)
+
+
+def count_features(path, start, stop, seed, skip=2, sample=1., validation=0.1):
+    """Count the positions and wins of each feature vector over a chunk of
+    the games in a file.
+
+    This function runs in worker processes. Games are assigned to the
+    validation set with probability `validation`, and positions are kept
+    with probability `sample`, by a random stream seeded with `seed` and
+    the chunk.
+
+    Returns
+    -------
+    (dict, dict)
+        For the training and the validation positions, a dict mapping each
+        feature vector to a list [wins, positions].
+    """
+    rng = random.Random("{}:{}".format(seed, start))
+    counts = (defaultdict(lambda: [0, 0]), defaultdict(lambda: [0, 0]))
+    with GameRecords(path) as records:
+        for index in range(start, stop):
+            record = records[index]
+            table = counts[rng.random() < validation]
+            for features, won in game_features(record.moves, record.winner, records.width,
+                                               records.height, skip):
+                if sample < 1. and rng.random() >= sample:
+                    continue
+                entry = table[features]
+                entry[0] += won
+                entry[1] += 1
+    return tuple(dict(table) for table in counts)
+
+
+def merge_counts(tables):
+    """Sum a sequence of feature count tables into a list of
+    (features, wins, positions) tuples, sorted by features.
+    """
+    total = defaultdict(lambda: [0, 0])
+    for table in tables:
+        for features, (wins, positions) in table.items():
+            entry = total[features]
+            entry[0] += wins
+            entry[1] += positions
+    return sorted((features, wins, positions) for features, (wins, positions) in total.items())
+
+
+def sigmoid(x):
+    """Numerically stable logistic function. """
+    if x >= 0:
+        return 1. / (1. + math.exp(-x))
+    z = math.exp(x)
+    return z / (1. + z)
+
+
+def log_loss(data, coefficients, scale=1.):
+    """Return the mean cross-entropy of the predictions of the model with
+    the given coefficients, the last of which is the tempo term.
+    """
+    total = 0.
+    positions = 0
+    for features, wins, count in data:
+        x = scale * sum(c * f for c, f in zip(coefficients, features)) + coefficients[-1]
+        # log(sigmoid(x)) and log(1 - sigmoid(x)), computed without overflow
+        log_p = -math.log1p(math.exp(-x)) if x > 0 else x - math.log1p(math.exp(x))
+        log_q = log_p - x
+        total -= wins * log_p + (count - wins) * log_q
+        positions += count
+    return total / positions if positions else 0.
+
+
+def solve(matrix, vector):
+    """Solve a small linear system by Gaussian elimination with partial
+    pivoting.
+    """
+    n = len(vector)
+    rows = [list(row) + [value] for row, value in zip(matrix, vector)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        if rows[col][col] == 0:
+            raise ValueError("Singular system")
+        for r in range(col + 1, n):
+            factor = rows[r][col] / rows[col][col]
+            for c in range(col, n + 1):
+                rows[r][c] -= factor * rows[col][c]
+    solution = [0.] * n
+    for r in reversed(range(n)):
+        solution[r] = (rows[r][n] - sum(rows[r][c] * solution[c]
+                                        for c in range(r + 1, n))) / rows[r][r]
+    return solution
+
+
+def fit_logistic(rows, iterations=50, tolerance=1e-10, ridge=1e-9):
+    """Fit a logistic regression by Newton's method.
+
+    Parameters
+    ----------
+    rows : list<(list<float>, int, int)>
+        The inputs of each distinct row, with its numbers of wins and of
+        positions.
+
+    Returns
+    -------
+    list<float>
+        The coefficient of each input.
+    """
+    n = len(rows[0][0])
+    theta = [0.] * n
+    for _ in range(iterations):
+        gradient = [0.] * n
+        hessian = [[0.] * n for _ in range(n)]
+        for inputs, wins, count in rows:
+            p = sigmoid(sum(t * x for t, x in zip(theta, inputs)))
+            residual = count * p - wins
+            weight = count * p * (1. - p)
+            for i in range(n):
+                gradient[i] += residual * inputs[i]
+                for j in range(i + 1):
+                    hessian[i][j] += weight * inputs[i] * inputs[j]
+        for i in range(n):
+            hessian[i][i] += ridge
+            for j in range(i):
+                hessian[j][i] = hessian[i][j]
+        step = solve(hessian, gradient)
+        theta = [t - s for t, s in zip(theta, step)]
+        if max(abs(s) for s in step) < tolerance:
+            break
+    return theta
+
+
+def tune(data, weights=CUSTOM_SCORE_WEIGHTS):
+    """Fit the custom_score layer weights to the position counts.
+
+    Parameters
+    ----------
+    data : list<((int, int, int), int, int)>
+        Feature vectors with their numbers of wins and of positions (see
+        `merge_counts()`).
+
+    weights : (float, float, float) (optional)
+        The current weights, which set the scale of the tuned ones.
+
+    Returns
+    -------
+    ((float, float, float), float, list<float>, list<float>)
+        The tuned weights, the scale K, and the model coefficients (three
+        layer coefficients and the tempo term) of the current and of the
+        tuned weights.
+    """
+    current = [w + 1. for w in weights]
+    scale, tempo = fit_logistic([([sum(c * f for c, f in zip(current, features)), 1.],
+                                  wins, count) for features, wins, count in data])
+    coefficients = fit_logistic([([scale * f for f in features] + [1.], wins, count)
+                                 for features, wins, count in data])
+    tuned = tuple(round(c - 1., 3) for c in coefficients[:LAYERS])
+    return tuned, scale, current + [tempo], coefficients
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the custom_score weights.")
+    parser.add_argument("games", nargs="+", help="game files written by selfplay.py")
+    parser.add_argument("--skip", type=int, default=4,
+                        help="number of opening moves whose positions are not used")
+    parser.add_argument("--sample", type=float, default=1.,
+                        help="fraction of the positions used")
+    parser.add_argument("--validation", type=float, default=0.1,
+                        help="fraction of the games held out to validate the fit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk", type=int, default=1000,
+                        help="number of games counted by a worker at a time")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="number of worker processes (0 uses every CPU)")
+    args = parser.parse_args()
+
+    jobs = []
+    for path in args.games:
+        with GameRecords(path) as records:
+            count = len(records)
+        jobs.extend((path, start, min(start + args.chunk, count))
+                    for start in range(0, count, args.chunk))
+    paths, starts, stops = zip(*jobs) if jobs else ((), (), ())
+    constants = (args.seed, args.skip, args.sample, args.validation)
+    extra = tuple([value] * len(jobs) for value in constants)
+    if args.processes == 1:
+        results = list(map(count_features, paths, starts, stops, *extra))
+    else:
+        with ProcessPoolExecutor(args.processes or os.cpu_count()) as executor:
+            results = list(executor.map(count_features, paths, starts, stops, *extra))
+    train = merge_counts(table for table, _ in results)
+    valid = merge_counts(table for _, table in results)
+    if not train:
+        parser.error("no positions to tune on")
+
+    tuned, scale, before, after = tune(train)
+    print("Positions: {} training, {} validation".format(
+        sum(count for _, _, count in train), sum(count for _, _, count in valid)))
+    print("Scale K: {:.4f}".format(scale))
+    for name, data in (("training", train), ("validation", valid)):
+        if data:
+            print("Log loss ({}): {:.5f} -> {:.5f}".format(
+                name, log_loss(data, before, scale), log_loss(data, after, scale)))
+    print("CUSTOM_SCORE_WEIGHTS = ({}, {}, {})".format(*tuned))
+
+
+if __name__ == "__main__":
+    main()